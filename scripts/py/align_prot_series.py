@@ -0,0 +1,150 @@
+# Filename: align_prot_series.py
+"""Summary: sequence alignment of the series of two or more protocols, instead of their alignment by position (the
+k-th recon of a main scan with the k-th), so that one recon inserted in a protocol does not shift all the later ones.
+Each series is summarized by its kind and its signature (e.g., range name, series description, kernel, slice width and
+thickness), and the series of the protocols are matched by dynamic programming, in their order, at the lowest cost:
+matching two series of the same kind costs the fraction of their signature parameters which differ, between 0 and 1,
+a series without counterpart costs gap_cost. The protocols are aligned one after the other to the series aligned so
+far, so that N protocols cost N - 1 pairwise alignments.
+The aligned series are in the format of diff_prot_pair.align_prot_list(), so that they drive both the diff
+(diff_prot_pair() and diff_prot_list()) and the layout of the Excel file (convert_prot_list_to_xlsx()).
+
+
+"""
+
+from diff_prot_pair import get_series_kind_Siemens
+from diff_prot_pair import index_series_by_kind
+
+# parameters identifying a series, those found in a series are compared
+default_signature_para_tuple = ("Range",
+                                "Series Description",
+                                "Kernel",
+                                "Slice Width (mm)",
+                                "Slice Thickness (mm)")
+
+# cost of a series without counterpart: two series of the same kind cost at most 1 to match, less than both without
+# counterpart, so they are matched unless leaving them out lets the other series match better
+default_gap_cost = 1.0
+
+def get_series_signature(se, signature_para_tuple=default_signature_para_tuple):
+    """:returns: tuple of the values of the signature parameters of the series, None where not found"""
+
+    return tuple(se.get(para) for para in signature_para_tuple)
+
+def get_series_match_cost(signature1, signature2):
+    """Cost of matching two series of the same kind.
+
+    :param signature1: signature of series 1, from get_series_signature()
+    :param signature2: signature of series 2, from get_series_signature()
+    :returns: fraction of the signature parameters found in either series whose values differ, between 0 and 1; 0 if
+    neither series has any
+
+    """
+
+    compared_count = 0
+    differ_count = 0
+    for value1, value2 in zip(signature1, signature2):
+        if value1 is None and value2 is None:
+            continue
+        compared_count += 1
+        if value1 != value2:
+            differ_count += 1
+
+    return differ_count / compared_count if compared_count else 0.0
+
+def align_series_sequence(key_list1, key_list2, gap_cost=default_gap_cost):
+    """Align two sequences of series by dynamic programming, keeping their order.
+
+    :param key_list1: list of (series kind, signature) of the series of sequence 1
+    :param key_list2: list of (series kind, signature) of the series of sequence 2
+    :param gap_cost: cost of a series without counterpart
+    :returns: list of (index in key_list1 or None, index in key_list2 or None), the aligned pairs in their order; the
+    series only found in sequence 1 go before those only found in sequence 2 at the same place
+
+    """
+
+    m = len(key_list1)
+    n = len(key_list2)
+
+    # cost_list[i][j]: lowest cost of aligning the first i series of sequence 1 with the first j series of sequence 2
+    cost_list = [[0.0] * (n + 1) for i in range(m + 1)]
+    for i in range(1, m + 1):
+        cost_list[i][0] = i * gap_cost
+    for j in range(1, n + 1):
+        cost_list[0][j] = j * gap_cost
+
+    for i in range(1, m + 1):
+        series_kind1, signature1 = key_list1[i - 1]
+        for j in range(1, n + 1):
+            series_kind2, signature2 = key_list2[j - 1]
+            cost = min(cost_list[i - 1][j], cost_list[i][j - 1]) + gap_cost
+            if series_kind1 == series_kind2:
+                cost = min(cost, cost_list[i - 1][j - 1] + get_series_match_cost(signature1, signature2))
+            cost_list[i][j] = cost
+
+    # trace back from the end, preferring the matches, then the series of sequence 2 without counterpart, so that
+    # those of sequence 1 come first in the forward order
+    aligned_pair_list = []
+    i = m
+    j = n
+    while i > 0 or j > 0:
+        if (i > 0 and j > 0 and key_list1[i - 1][0] == key_list2[j - 1][0]
+                and cost_list[i][j] == cost_list[i - 1][j - 1] + get_series_match_cost(key_list1[i - 1][1], key_list2[j - 1][1])):
+            i -= 1
+            j -= 1
+            aligned_pair_list.append((i, j))
+        elif j > 0 and cost_list[i][j] == cost_list[i][j - 1] + gap_cost:
+            j -= 1
+            aligned_pair_list.append((None, j))
+        else:
+            i -= 1
+            aligned_pair_list.append((i, None))
+    aligned_pair_list.reverse()
+
+    return aligned_pair_list
+
+def align_prot_list_by_sequence(prot_se_list_list,
+                                get_series_kind=get_series_kind_Siemens,
+                                signature_para_tuple=default_signature_para_tuple,
+                                gap_cost=default_gap_cost):
+    """Align the series of N protocols by sequence alignment, each protocol being aligned to the series aligned so far,
+    a series aligned so far being represented by its first protocol having it.
+
+    :param prot_se_list_list: list of the N protocols, each a list of dict, each dict being a scan or recon series
+    :param get_series_kind: function, e.g., diff_prot_pair.get_series_kind_Siemens()
+    :param signature_para_tuple: parameters identifying a series
+    :param gap_cost: cost of a series without counterpart
+    :returns: list of (series kind, series index, list of the N indexes of the series in their protocol, None where a
+    protocol does not have it), as from diff_prot_pair.align_prot_list(), in the order of the protocols, the series
+    index being the rank of the aligned series among the aligned series of its kind (see
+    diff_prot_pair.index_series_by_kind()), so that it is unique, also for the series only found in a later protocol
+
+    """
+
+    aligned_series_list = []
+    # (series kind, signature) of each aligned series
+    aligned_key_list = []
+
+    for prot_num, prot_se_list in enumerate(prot_se_list_list):
+        series_key_dict = {i: series_key for (series_key, i) in index_series_by_kind(prot_se_list, get_series_kind).items()}
+        key_list = [(series_key_dict[i][0], get_series_signature(se, signature_para_tuple)) for i, se in enumerate(prot_se_list)]
+
+        next_aligned_series_list = []
+        next_aligned_key_list = []
+        for (k, i) in align_series_sequence(aligned_key_list, key_list, gap_cost):
+            if k is None:
+                series_kind, series_index = series_key_dict[i]
+                next_aligned_series_list.append((series_kind, series_index, [None] * prot_num + [i]))
+                next_aligned_key_list.append(key_list[i])
+            else:
+                series_kind, series_index, se_index_list = aligned_series_list[k]
+                next_aligned_series_list.append((series_kind, series_index, se_index_list + [i]))
+                next_aligned_key_list.append(aligned_key_list[k])
+        aligned_series_list = next_aligned_series_list
+        aligned_key_list = next_aligned_key_list
+
+    # the series index of each protocol may be taken by another series of the first one, e.g., an inserted recon: the
+    # aligned series are indexed again, as one protocol
+    series_key_dict = {k: series_key for (series_key, k) in index_series_by_kind(aligned_series_list, lambda aligned_series: aligned_series[0]).items()}
+
+    return [series_key_dict[k] + (se_index_list,) for k, (series_kind, series_index, se_index_list) in enumerate(aligned_series_list)]
@@ -0,0 +1,137 @@
+# Filename: benchmark_xml_backend_Siemens.py
+"""Summary: benchmark the xml backends (lxml vs. xml.etree.ElementTree) for the parsing of Siemens Force protocol files,
+on a synthetic corpus generated from the lookup tables
+
+
+"""
+
+import os
+import random
+import tempfile
+import time
+from get_para_from_indiv_prot_xml import lxml_etree
+from get_para_from_indiv_prot_xml import get_xml_module
+from get_para_from_indiv_prot_xml import build_entry_index_Siemens_Force
+from get_para_from_indiv_prot_xml import get_para_dict_from_indiv_prot_xml_Siemens_Force
+from lookup_tbl_registry import load_lookup_tbl
+from lookup_tbl_registry import get_extraction_plan_Siemens_Force
+
+def write_synthetic_prot_xml_Siemens_Force(output_path,
+                                           para_tag_list,
+                                           seed,
+                                           main_scan_num=2,
+                                           recon_num=5,
+                                           filler_node_num=40):
+    """Write a synthetic individual protocol file with the Siemens Force structure: 1 topogram, 1 premonitoring,
+    1 monitoring and main_scan_num main scans, each with recon_num recons (plus the first RT recon), and a bolus node.
+
+    :param output_path: path of the protocol file to write
+    :param para_tag_list: tags of the parameters to write in every scan/recon/bolus node, e.g., from the lookup tables
+    :param seed: seed of the random parameter values
+    :param main_scan_num: number of main scans
+    :param recon_num: number of recons per main scan, not counting the first RT recon
+    :param filler_node_num: number of nodes not in the lookup tables, per scan/recon node
+    :returns: N/A
+
+    """
+
+    rng = random.Random(seed)
+
+    def node_str(tag, attrib_str, range_name=None):
+        child_list = ['<Filler%d><Value>%d</Value></Filler%d>' % (k, rng.randint(0, 999), k) for k in range(filler_node_num)]
+        if range_name is not None:
+            child_list.append('<RangeName>"%s"</RangeName>' % range_name)
+        for para_tag in para_tag_list:
+            if para_tag != 'RangeName':
+                child_list.append('<%s>%s</%s>' % (para_tag, rng.choice(['%d' % rng.randint(0, 500), '%.2f' % rng.random(), '"Br40"']), para_tag))
+        return '<%s%s>%s</%s>' % (tag, attrib_str, ''.join(child_list), tag)
+
+    entry_list = []
+    range_name_list = ['Topogram', 'PreMonitoring', 'Monitoring'] + ['Abdomen %d' % k for k in range(main_scan_num)]
+    for i, range_name in enumerate(range_name_list):
+        recon_str = ''.join([node_str('MlModeReconType', ' ReconJob="%d"' % j) for j in range(recon_num + 1 if i >= 3 else 1)])
+        entry_list.append('<MlModeEntryType EntryNo="%d" ModeScans="1">%s%s</MlModeEntryType>' % (i + 1,
+                                                                                                 node_str('MlModeScanType', ' ModeScan="A"', range_name),
+                                                                                                 recon_str))
+
+    with open(output_path, 'w') as fp:
+        fp.write('<?xml version="1.0" encoding="UTF-8"?>\n<MlProtocol><MlModeEntryList>%s</MlModeEntryList><MlBolusList>%s</MlBolusList></MlProtocol>'
+                 % (''.join(entry_list), node_str('MlBolusType', '')))
+
+def extract_prot_dict_list_Siemens_Force(indiv_prot_xml_path, extraction_plan_dict, xml_backend):
+    """Parse one protocol file and extract the parameters of all of its series, the same way as
+    convert_protocol_from_indiv_prot_xml_to_json() (without writing the json file).
+
+    :param indiv_prot_xml_path: path to the individual protocol file
+    :param extraction_plan_dict: {"topo"/"monitoring_scan"/"scan"/"recon": extraction plan}
+    :param xml_backend: "lxml" or "etree"
+    :returns: list of dict, one per series
+
+    """
+
+    prot_xml_tree = get_xml_module(xml_backend).parse(indiv_prot_xml_path)
+    prot_xml_index = build_entry_index_Siemens_Force(prot_xml_tree)
+    prot_dict_list = []
+
+    for i, entry_xml in enumerate(prot_xml_index["entry_list"]):
+        entry_node_id_value = str(i+1)
+        range_name = entry_xml.findtext(".//MlModeScanType/RangeName")
+        if 'topogram' in range_name.lower():
+            plan = extraction_plan_dict["topo"]
+        elif 'monitoring' in range_name.lower():
+            plan = extraction_plan_dict["monitoring_scan"]
+        else:
+            plan = extraction_plan_dict["scan"]
+        prot_dict_list.append(get_para_dict_from_indiv_prot_xml_Siemens_Force(prot_xml_index,
+                                                                              plan,
+                                                                              entry_node_id_value=entry_node_id_value))
+        if plan is extraction_plan_dict["scan"]:
+            for j in range(1, len(entry_xml.findall("./MlModeReconType"))):
+                prot_dict_list.append(get_para_dict_from_indiv_prot_xml_Siemens_Force(prot_xml_index,
+                                                                                      extraction_plan_dict["recon"],
+                                                                                      entry_node_id_value=entry_node_id_value,
+                                                                                      sub_node_id_value=str(j)))
+    return prot_dict_list
+
+############## USER INPUT DATA BELOW #################################################################
+prot_file_num = 5000
+lookup_tbl_folder = "./para_lookup_tbl/Siemens/"
+######################################################################################################
+
+extraction_plan_dict = {}
+para_tag_set = set()
+for tbl_name in ["topo", "monitoring_scan", "scan", "recon"]:
+    lookup_tbl_obj = load_lookup_tbl(lookup_tbl_folder + tbl_name + "_lookup_tbl.json")
+    extraction_plan_dict[tbl_name] = get_extraction_plan_Siemens_Force(lookup_tbl_obj)
+    para_tag_set.update(para_dict["para_xpath"][3:] for (func_name, para_dict) in lookup_tbl_obj["lookup_tbl"].values())
+
+xml_backend_list = ["etree"]
+if lxml_etree is not None:
+    xml_backend_list.append("lxml")
+else:
+    print("lxml is not installed, benchmarking the etree backend only")
+
+with tempfile.TemporaryDirectory() as corpus_folder:
+
+    print("writing", prot_file_num, "synthetic protocol files to", corpus_folder)
+    prot_path_list = []
+    for k in range(prot_file_num):
+        prot_path = os.path.join(corpus_folder, "PROT_%05d.Adult" % k)
+        write_synthetic_prot_xml_Siemens_Force(prot_path, sorted(para_tag_set), seed=k)
+        prot_path_list.append(prot_path)
+
+    elapsed_time_dict = {}
+    result_dict = {}
+    for xml_backend in xml_backend_list:
+        start_time = time.perf_counter()
+        result_dict[xml_backend] = [extract_prot_dict_list_Siemens_Force(prot_path, extraction_plan_dict, xml_backend)
+                                    for prot_path in prot_path_list]
+        elapsed_time_dict[xml_backend] = time.perf_counter() - start_time
+        print("%-6s backend: %8.2f s for %d files (%.2f ms/file)" % (xml_backend,
+                                                                     elapsed_time_dict[xml_backend],
+                                                                     prot_file_num,
+                                                                     1000 * elapsed_time_dict[xml_backend] / prot_file_num))
+
+    if "lxml" in elapsed_time_dict:
+        assert result_dict["lxml"] == result_dict["etree"]
+        print("speedup of lxml over etree: %.2fx" % (elapsed_time_dict["etree"] / elapsed_time_dict["lxml"]))
@@ -0,0 +1,158 @@
+# Filename: cache_prot_dict_list.py
+"""Summary: persistent on-disk cache of the parsing results of individual protocol files (the list of per-series
+dicts), keyed by the content hash of the protocol file and the hash of the lookup tables used to parse it, so that the
+protocol files which did not change between two exports are not parsed again
+
+
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+# default size bound of the cache folder, in bytes
+default_max_cache_size = 512 * 1024 * 1024
+
+# version of the cached results, to be increased when a change to the parsing code changes them, so that the results
+# of the older code are no longer found; 2: typed values, see normalize_para_value.py
+prot_cache_version = 2
+
+def get_file_hash(file_path):
+    """Hash the content of a file, e.g., an individual protocol file.
+
+    :param file_path: path to the file
+    :returns: hex string of the sha256 of the file content
+
+    """
+
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+def get_lookup_tbl_hash(lookup_tbl_obj_list, parser_name):
+    """Hash the lookup tables of a converter, together with the name of the parser, as the same lookup tables give
+    different series lists with different converters (e.g., the bolus series of the cardiac one).
+    Any change to a lookup table (or to prot_cache_version) gives a new hash, so the results parsed with the old table
+    are no longer found.
+
+    :param lookup_tbl_obj_list: lookup table objects of the converter, from lookup_tbl_registry.load_lookup_tbl(), in
+    its parameter order
+    :param parser_name: name of the parser, e.g., "Siemens_Force", "Siemens_Force_C", "Siemens_Force_DE", "GE_Optima"
+    :returns: hex string of the sha256 of the cache version, the parser name and the lookup table hashes
+
+    """
+
+    lookup_tbl_hash = hashlib.sha256((str(prot_cache_version) + ":" + parser_name).encode())
+    for lookup_tbl_obj in lookup_tbl_obj_list:
+        lookup_tbl_hash.update(("\0" + lookup_tbl_obj["hash"]).encode())
+    return lookup_tbl_hash.hexdigest()
+
+def get_prot_cache_path(cache_folder, lookup_tbl_hash, indiv_prot_xml_path, indiv_prot_xml_hash=None):
+    """Get the path of the cached parsing result of an individual protocol file: one sub-folder per lookup table hash,
+    one json file per protocol file content hash. The protocol file is read, but not parsed, unless its hash is given.
+
+    :param cache_folder: path to the cache folder
+    :param lookup_tbl_hash: hash of the lookup tables, from get_lookup_tbl_hash()
+    :param indiv_prot_xml_path: path to the individual protocol file
+    :param indiv_prot_xml_hash: optional, content hash of the protocol file from get_file_hash(), e.g., already
+    computed by the caller, so that the file is not read again
+    :returns: path to the json file of the cached result, which may not exist yet
+
+    """
+
+    if indiv_prot_xml_hash is None:
+        indiv_prot_xml_hash = get_file_hash(indiv_prot_xml_path)
+
+    return os.path.join(cache_folder, lookup_tbl_hash[:16], indiv_prot_xml_hash + ".json")
+
+def load_prot_dict_list_from_cache(prot_cache_path):
+    """Load a cached parsing result, and mark it as recently used for the eviction.
+
+    :param prot_cache_path: path from get_prot_cache_path()
+    :returns: list of dict, each dict being a scan or recon series, or None if it is not in the cache (or unreadable)
+
+    """
+
+    try:
+        with open(prot_cache_path, 'r') as fp:
+            prot_dict_list = json.load(fp)
+        os.utime(prot_cache_path)
+    except (OSError, ValueError):
+        return None
+
+    return prot_dict_list
+
+def store_prot_dict_list_to_cache(prot_cache_path, prot_dict_list):
+    """Store a parsing result in the cache. The json file is written aside and then renamed, so that an interrupted
+    run never leaves a partial result behind.
+
+    :param prot_cache_path: path from get_prot_cache_path()
+    :param prot_dict_list: list of dict, each dict being a scan or recon series
+    :returns: N/A
+
+    """
+
+    os.makedirs(os.path.dirname(prot_cache_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(prot_cache_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as fp:
+            json.dump(prot_dict_list, fp)
+        os.replace(tmp_path, prot_cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def invalidate_prot_dict_cache(cache_folder, keep_lookup_tbl_hash_list=()):
+    """Remove the cached results of all the lookup tables but the current ones, e.g., after a lookup table was edited.
+
+    :param cache_folder: path to the cache folder
+    :param keep_lookup_tbl_hash_list: hashes of the lookup tables in use, from get_lookup_tbl_hash(), whose results
+    are kept; everything is removed if empty
+    :returns: number of lookup table sub-folders removed
+
+    """
+
+    if not os.path.isdir(cache_folder):
+        return 0
+
+    keep_folder_set = {lookup_tbl_hash[:16] for lookup_tbl_hash in keep_lookup_tbl_hash_list}
+    removed_count = 0
+    for folder_name in os.listdir(cache_folder):
+        folder_path = os.path.join(cache_folder, folder_name)
+        if os.path.isdir(folder_path) and folder_name not in keep_folder_set:
+            shutil.rmtree(folder_path)
+            removed_count += 1
+    return removed_count
+
+def evict_prot_dict_cache(cache_folder, max_cache_size=default_max_cache_size):
+    """Bound the size of the cache folder, by removing the least recently used results first.
+
+    :param cache_folder: path to the cache folder
+    :param max_cache_size: size bound of the cache folder, in bytes
+    :returns: number of cached results removed
+
+    """
+
+    if not os.path.isdir(cache_folder):
+        return 0
+
+    cache_file_list = []
+    for dirpath, dirnames, filenames in os.walk(cache_folder):
+        for filename in filenames:
+            if filename.endswith(".json"):
+                file_stat = os.stat(os.path.join(dirpath, filename))
+                cache_file_list.append((file_stat.st_mtime, file_stat.st_size, os.path.join(dirpath, filename)))
+
+    cache_size = sum(file_size for (mtime, file_size, file_path) in cache_file_list)
+    removed_count = 0
+    for mtime, file_size, file_path in sorted(cache_file_list):
+        if cache_size <= max_cache_size:
+            break
+        os.remove(file_path)
+        cache_size -= file_size
+        removed_count += 1
+    return removed_count
@@ -0,0 +1,229 @@
+# Filename: convert_prot_list_to_xlsx.py
+"""Summary: N-way Excel file of the same protocol on several scanners or in several snapshots, one value column per
+protocol, instead of the two columns (B, C) of the pairwise Excel writers. The series of the N protocols are aligned
+once, by position (see diff_prot_pair.align_prot_list()) or by sequence alignment (see align_prot_series.py), and
+each parameter row is written once for all the protocols; the values
+which differ from the first protocol are highlighted, with the first protocol's.
+
+
+"""
+
+import re
+import xlsxwriter
+from diff_prot_pair import align_prot_list
+from diff_prot_pair import diff_prot_list
+from diff_prot_pair import get_changed_cell_set
+from diff_prot_pair import get_series_kind_Siemens
+from diff_prot_pair import store_prot_list_change_list_csv
+from diff_prot_pair import default_exclusion_para_set
+from align_prot_series import align_prot_list_by_sequence
+from index_prot_snapshot import build_prot_snapshot_index
+
+# banner and colors of each section, as in the pairwise Excel writers
+section_banner_dict = {"topo": "Localizer",
+                       "premonitoring": "PreMonitoring Scan",
+                       "bolus": "Contrast",
+                       "monitoring": "Monitoring Scan",
+                       "scan": "Main Scan",
+                       "recon": "Recon No."}
+
+section_color_dict = {"topo": '#f4f5f7',
+                      "premonitoring": '#e6fcef',
+                      "bolus": '#80d7c7',
+                      "monitoring": '#e6fcef',
+                      "scan": '#fefae7',
+                      "recon": '#e9fcff'}
+
+# parameters not shown, as in the pairwise Excel writers
+default_exclusion_para_set_xlsx = default_exclusion_para_set | {'Window-1 Center',
+                                                                'Window-1 Width',
+                                                                'Window-2 Center',
+                                                                'Window-2 Width',
+                                                                'Syngo TaskflowIdCode',
+                                                                'Syngo TaskflowProcessingIdCode',
+                                                                'Syngo TaskflowProcessingIdMeaning',
+                                                                'Comment1',
+                                                                'Comment2'}
+
+def convert_prot_list_to_xlsx(target_prot_name_list,
+                              prot_se_list_list,
+                              output_xlsx_path,
+                              get_series_kind=get_series_kind_Siemens,
+                              exclusion_para_set=default_exclusion_para_set_xlsx,
+                              prot_change_list=None,
+                              aligned_series_list=None):
+    """Write the N-way Excel file of N protocols: column A for the parameters, then one column per protocol.
+
+    :param target_prot_name_list: names of the N protocols, e.g., of the scanners or snapshots, for the title row
+    :param prot_se_list_list: list of the N protocols, each a list of dict, each dict being a scan or recon series, as
+    returned by the json converters
+    :param output_xlsx_path: path of the output Excel file to save to
+    :param get_series_kind: function, e.g., diff_prot_pair.get_series_kind_Siemens() or get_series_kind_GE()
+    :param exclusion_para_set: parameters not shown
+    :param prot_change_list: optional, the change records of the N protocols from diff_prot_pair.diff_prot_list() (or
+    of a pair from diff_prot_pair.diff_prot_pair()), on the same aligned series; the protocols are diffed here if None
+    :param aligned_series_list: optional, the aligned series of the N protocols, from diff_prot_pair.align_prot_list()
+    or align_prot_series.align_prot_list_by_sequence(), which decide the rows; aligned by position if None
+    :returns: list of the change records
+
+    """
+
+    if aligned_series_list is None:
+        aligned_series_list = align_prot_list(prot_se_list_list, get_series_kind)
+    if prot_change_list is None:
+        prot_change_list = diff_prot_list(prot_se_list_list, get_series_kind, aligned_series_list=aligned_series_list)
+    changed_cell_set = get_changed_cell_set(prot_change_list)
+
+    prot_num = len(prot_se_list_list)
+
+    workbook = xlsxwriter.Workbook(output_xlsx_path)
+    ws = workbook.add_worksheet()
+
+    title_format = workbook.add_format({'bold': 1,
+                                        'border': 1,
+                                        'align': 'center',
+                                        'valign': 'vcenter',
+                                        'text_wrap': 1,
+                                        'fg_color': '#fefae7'})
+
+    banner_format = workbook.add_format({'bold': 1,
+                                         'border': 1,
+                                         'align': 'left',
+                                         'valign': 'vcenter',
+                                         'fg_color': '#5e9cfb'})
+
+    emphasis_property_dict = {'font_color': '#9c0006',
+                              'bold': 1}
+
+    # {series kind: (parameter title format, cell format, cell format of the changed parameters)}
+    section_format_dict = {}
+    for series_kind, fg_color in section_color_dict.items():
+        cell_property_dict = {'border': 1, 'align': 'center', 'valign': 'vcenter', 'fg_color': fg_color}
+        section_format_dict[series_kind] = (workbook.add_format({'border': 1, 'align': 'left', 'valign': 'vcenter', 'fg_color': fg_color}),
+                                            workbook.add_format(cell_property_dict),
+                                            workbook.add_format(dict(cell_property_dict, **emphasis_property_dict)))
+
+    dose_format = workbook.add_format({'border': 1,
+                                       'align': 'center',
+                                       'valign': 'vcenter',
+                                       'fg_color': '#fdebe6',
+                                       })
+
+    dose_para_title_format = workbook.add_format({'border': 1,
+                                                  'align': 'left',
+                                                  'valign': 'vcenter',
+                                                  'fg_color': '#fdebe6'})
+
+    # rows and columns from 0: row 0 for the titles, column 0 for the parameters, column n+1 for the protocol n
+    ws.write(0, 0, "Protocol Name", title_format)
+    for n, target_prot_name in enumerate(target_prot_name_list):
+        ws.write(0, n+1, target_prot_name, title_format)
+    ws.set_row(0, 30)
+
+    row = 0
+    for (series_kind, series_index, se_index_list) in aligned_series_list:
+        se_list = [prot_se_list[se_index] if se_index is not None else None for (prot_se_list, se_index) in zip(prot_se_list_list, se_index_list)]
+
+        banner_str = section_banner_dict[series_kind]
+        if series_kind == "recon":
+            # the ReconJob of the first protocol having the recon (Siemens), or its rank under its main scan
+            se = next(se for se in se_list if se is not None)
+            banner_str += str(se['ReconJob']) if 'ReconJob' in se else " " + str(series_index[1])
+        row += 1
+        if prot_num > 1:
+            ws.merge_range(row, 0, row, prot_num, banner_str, banner_format)
+        else:
+            ws.write(row, 0, banner_str, banner_format)
+
+        title_cell_format, cell_format, changed_cell_format = section_format_dict[series_kind]
+
+        # the parameters of all the protocols, in their first order
+        para_key_dict = {}
+        for se in se_list:
+            if se is not None:
+                para_key_dict.update(dict.fromkeys(se.keys()))
+
+        for para in para_key_dict:
+            if para in exclusion_para_set:
+                continue
+            row += 1
+            ws.write(row, 0, para, title_cell_format)
+            for n, se in enumerate(se_list):
+                if se is None or para not in se:
+                    continue
+                ws.write(row, n+1, se[para], changed_cell_format if (n, se_index_list[n], para) in changed_cell_set else cell_format)
+
+    row += 1
+    if prot_num > 1:
+        ws.merge_range(row, 0, row, prot_num, 'Dose Info', banner_format)
+    else:
+        ws.write(row, 0, 'Dose Info', banner_format)
+
+    for dose_para in ['CTDIvol (mGy)', 'DLP (mGy*cm)', 'Eff. Dose (mSv)', 'Dose Notification (CTDIv)', 'Dose Notification (DLP)']:
+        row += 1
+        ws.write(row, 0, dose_para, dose_para_title_format)
+        for n in range(prot_num):
+            ws.write(row, n+1, '', dose_format)
+
+    ws.set_column(0, 0, 40)
+    ws.set_column(1, prot_num, 60 if prot_num <= 2 else 30)
+
+    workbook.close()
+
+    return prot_change_list
+
+if __name__ == "__main__":
+
+    ############## USER INPUT DATA BELOW #################################################################
+    # the snapshots (or the exports of the scanners) to compare, in their order in the Excel files, the first one being
+    # the reference of the highlighted differences
+    target_prot_name_list = ['UserProtocols_2020-06',
+                             'UserProtocols_2021-06',
+                             'UserProtocols_2022-02-09']
+    protocol_file_folder = "./Siemens_Force"
+    output_path = "\\output_path_Nway\\"
+    # persistent parsing cache, see cache_prot_dict_list.py
+    prot_cache_path = "\\prot_cache\\"
+    # alignment of the series: "position" (the k-th recon of a main scan with the k-th) or "sequence" (by their range,
+    # series description, kernel and slice width/thickness, see align_prot_series.py)
+    series_align_method = "sequence"
+    # optional, csv file of the differing parameters of all the protocols, e.g., "\\prot_change_list_Nway.csv"; None
+    # for no file
+    prot_change_csv_path = None
+    ######################################################################################################
+
+    # imported here, as the BeforeAfter module imports this one
+    from convert_protocol_from_indiv_prot_xml_to_json_xlsx_ANALYZE_BeforeAfter_GenCardioDE import parse_prot_pair_BeforeAfter
+
+    prot_cache_folder = protocol_file_folder + prot_cache_path
+
+    # index each snapshot once, and compare the protocols found in all of them
+    prot_snapshot_index_list = [build_prot_snapshot_index(protocol_file_folder + "\\" + target_prot_name, suffix_list=['.Adult', '.Child'])
+                                for target_prot_name in target_prot_name_list]
+    common_prot_rel_path_set = set(prot_snapshot_index_list[0]).intersection(*prot_snapshot_index_list[1:])
+
+    all_prot_change_list = []
+    for prot_rel_path in sorted(common_prot_rel_path_set):
+        common_prot_name = prot_rel_path.split('\\')[0] + prot_rel_path.split('\\')[1].replace('.', '')
+        xlsx_path = re.sub('_\.', '.', protocol_file_folder + output_path + common_prot_name + '.xlsx')
+        try:
+            prot_se_list_list = parse_prot_pair_BeforeAfter(prot_rel_path,
+                                                            target_prot_name_list,
+                                                            [prot_snapshot_index[prot_rel_path]["path"] for prot_snapshot_index in prot_snapshot_index_list],
+                                                            prot_cache_folder=prot_cache_folder)
+            aligned_series_list = None
+            if series_align_method == "sequence":
+                aligned_series_list = align_prot_list_by_sequence(prot_se_list_list)
+            prot_change_list = convert_prot_list_to_xlsx(target_prot_name_list, prot_se_list_list, xlsx_path, aligned_series_list=aligned_series_list)
+        except Exception as e:
+            print("\nFailed:", prot_rel_path, e)
+            continue
+        for prot_change in prot_change_list:
+            prot_change["prot_rel_path"] = prot_rel_path
+        all_prot_change_list += prot_change_list
+
+    print("\nCompared", len(common_prot_rel_path_set), "protocols across", len(target_prot_name_list), "snapshots,",
+          len(all_prot_change_list), "differing parameters")
+
+    if prot_change_csv_path is not None:
+        store_prot_list_change_list_csv(all_prot_change_list, target_prot_name_list, protocol_file_folder + prot_change_csv_path)
@@ -8,14 +8,36 @@
 # Last-Updated: Mon Jul 25 22:43:31 2022 (-14400 Eastern Daylight Time)
 # Update #:
 
-import xml.etree.ElementTree as ET
-import pandas as pd
 import xlsxwriter
 import re
-import glob
-from get_para_from_indiv_prot_xml import get_para_from_indiv_prot_xml_Siemens_Force
-import json
-import os
+from get_para_from_indiv_prot_xml import get_xml_module
+from get_para_from_indiv_prot_xml import iterparse_entry_xml_Siemens_Force
+from get_para_from_indiv_prot_xml import build_entry_index_Siemens_Force
+from get_para_from_indiv_prot_xml import get_keep_tag_set_Siemens_Force
+from get_para_from_indiv_prot_xml import get_para_dict_from_indiv_prot_xml_Siemens_Force
+from cache_prot_dict_list import get_lookup_tbl_hash
+from cache_prot_dict_list import get_file_hash
+from cache_prot_dict_list import get_prot_cache_path
+from cache_prot_dict_list import load_prot_dict_list_from_cache
+from cache_prot_dict_list import store_prot_dict_list_to_cache
+from store_prot_pair_dict_list import store_prot_pair_dict_list
+from store_prot_pair_dict_list import load_prot_pair_dict_list
+from series_record import SeriesRecord
+from lookup_tbl_registry import load_lookup_tbl
+from lookup_tbl_registry import get_extraction_plan_Siemens_Force
+from cache_prot_dict_list import evict_prot_dict_cache
+from index_prot_snapshot import build_prot_snapshot_index
+from prot_catalog import open_prot_catalog
+from prot_catalog import update_snapshot_prot_catalog
+from prot_run_manifest import get_run_id
+from prot_run_manifest import load_prot_run_manifest
+from prot_run_manifest import store_prot_run_manifest
+from prot_run_manifest import get_prot_run_entry
+from prot_run_manifest import is_prot_run_current
+import traceback
+import concurrent.futures
+import functools
+import time
 from os import listdir
 from os.path import isfile, join
 import numpy as np
@@ -23,23 +45,13 @@ from convert_protocol_from_indiv_prot_xml_to_json_xlsx_Cardiac_funconly import c
 from convert_protocol_from_indiv_prot_xml_to_json_xlsx_Cardiac_funconly import convert_protocol_from_json_to_xlsx_C
 from convert_protocol_from_indiv_prot_xml_to_json_xlsx_AB_funconly import convert_protocol_from_indiv_prot_xml_to_json_DE
 from convert_protocol_from_indiv_prot_xml_to_json_xlsx_AB_funconly import convert_protocol_from_json_to_xlsx_DE
-
-def isfloat(x):
-    try:
-        a = float(x)
-    except (TypeError, ValueError):
-        return False
-    else:
-        return True
- 
-def isint(x):
-    try:
-        a = float(x)
-        b = int(a)
-    except (TypeError, ValueError):
-        return False
-    else:
-        return a == b
+from diff_prot_pair import diff_prot_pair
+from diff_prot_pair import get_series_kind_Siemens
+from diff_prot_pair import get_changed_row_cell_set
+from diff_prot_pair import store_prot_change_list_csv
+from diff_prot_pair import get_prot_digest
+from align_prot_series import align_prot_list_by_sequence
+from convert_prot_list_to_xlsx import convert_prot_list_to_xlsx
 
 def parse_prot_pair_structure(prot_se_list1, prot_se_list2):
     """ Figure out the structure of the two protocols, which is used for creating the Excel file.
@@ -74,13 +86,14 @@ def parse_prot_pair_structure(prot_se_list1, prot_se_list2):
 
     for i, se in enumerate(prot_se_list1):
 
-        if ('"Topogram"' in [se[para] for para in se.keys()]) or ('"TopograM"' in [se[para] for para in se.keys()]) or ('"Topogram LAT"' in [se[para] for para in se.keys()]) or ('"Topogram AP"' in [se[para] for para in se.keys()]):
+        series_kind = get_series_kind_Siemens(se)
+        if series_kind == "topo":
             topo_count_list[0] = topo_count_list[0] + 1
-        elif '"PreMonitoring"' in [se[para] for para in se.keys()]:
+        elif series_kind == "premonitoring":
             premonitoring_count_list[0] = premonitoring_count_list[0] + 1
-        elif '"Monitoring"' in [se[para] for para in se.keys()]:
+        elif series_kind == "monitoring":
             monitoring_count_list[0] = monitoring_count_list[0] + 1
-        elif 'ReconJob' in se.keys():
+        elif series_kind == "recon":
             recon_count += 1
         else:
             main_scan_count_list[0] = main_scan_count_list[0] + 1
@@ -100,13 +113,14 @@ def parse_prot_pair_structure(prot_se_list1, prot_se_list2):
 
     for i, se in enumerate(prot_se_list2):
 
-        if ('"Topogram"' in [se[para] for para in se.keys()]) or ('"TopograM"' in [se[para] for para in se.keys()]) or ('"Topogram LAT"' in [se[para] for para in se.keys()]) or ('"Topogram AP"' in [se[para] for para in se.keys()]):
+        series_kind = get_series_kind_Siemens(se)
+        if series_kind == "topo":
             topo_count_list[1] = topo_count_list[1] + 1
-        elif '"PreMonitoring"' in [se[para] for para in se.keys()]:
+        elif series_kind == "premonitoring":
             premonitoring_count_list[1] = premonitoring_count_list[1] + 1
-        elif '"Monitoring"' in [se[para] for para in se.keys()]:
+        elif series_kind == "monitoring":
             monitoring_count_list[1] = monitoring_count_list[1] + 1
-        elif 'ReconJob' in se.keys():
+        elif series_kind == "recon":
             recon_count += 1
         else:
             main_scan_count_list[1] = main_scan_count_list[1] + 1
@@ -153,7 +167,10 @@ def convert_protocol_from_indiv_prot_xml_to_json(topo_lookup_tbl_json_path,
                                                  monitoring_scan_lookup_tbl_json_path,
                                                  target_prot_name_list,
                                                  target_prot_xml_path_list,
-                                                 output_json_path):
+                                                 output_json_path,
+                                                 bool_iterparse=False,
+                                                 prot_cache_folder=None,
+                                                 target_prot_xml_hash_list=None):
 
     """ Parse convert protocol xml to json, for Siemens Force CT.
     How the localizier, premonitoring, monitoring, main scan, and recon series are based on the lookup tables as indicated by
@@ -164,37 +181,60 @@ def convert_protocol_from_indiv_prot_xml_to_json(topo_lookup_tbl_json_path,
     The order of dictionary items appearing in the look up tables file also decide the order of parameters to be shown in each
     section of the intermediate json file and finally the Excel file.
 
-    :param topo_lookup_tbl_json_path: path to the lookup table for the localizers.
-    :param scan_lookup_tbl_json_path: path to the lookup table for the main scan.
-    :param recon_lookup_tbl_json_path: path to the lookup table for the recons.
-    :param monitoring_scan_lookup_tbl_json_path: path to the lookup table for the premonitoring and monitoring scans.
+    :param topo_lookup_tbl_json_path: path to the lookup table for the localizers, or its lookup table object from
+    load_lookup_tbl().
+    :param scan_lookup_tbl_json_path: path to the lookup table for the main scan, or its lookup table object from
+    load_lookup_tbl().
+    :param recon_lookup_tbl_json_path: path to the lookup table for the recons, or its lookup table object from
+    load_lookup_tbl().
+    :param monitoring_scan_lookup_tbl_json_path: path to the lookup table for the premonitoring and monitoring scans, or
+    its lookup table object from load_lookup_tbl().
     :param target_prot_name_list: target protocol names.
     :param target_prot_xml_path_list: target protocol xml files to read in.
-    :param output_json_path: target json path to save to.
-    :returns: N/A
+    :param output_json_path: target json path to save to, or None to save nothing, the result being returned
+    either way. With the .arrow extension, the columnar Arrow format is saved instead (see store_prot_pair_dict_list.py).
+    :param bool_iterparse: whether to stream the protocol files one entry at a time with iterparse, instead of parsing
+    the whole tree in memory, e.g., for very large files. The result is the same.
+    :param prot_cache_folder: optional, folder of the persistent parsing cache (see cache_prot_dict_list.py). The
+    protocol files parsed before with the same lookup tables are not parsed again, the new ones are added to it.
+    :param target_prot_xml_hash_list: optional, content hashes of the protocol files from
+    cache_prot_dict_list.get_file_hash(), e.g., already computed by the caller, for the cache paths; the files are
+    hashed here if None
+    :returns: list of the protocols, each a list of dict, each dict being a scan or recon series, i.e., what
+    the json file holds
 
     """
     
     json_fname = output_json_path
-#    print("loaded topo_lookup_tbl from ./para_lookup_tbl/topo_lookup_tbl.json")
-    with open(topo_lookup_tbl_json_path, 'r') as fp:
-        topo_lookup_tbl = json.load(fp)
-
-#    print("loaded scan_lookup_tbl from ./para_lookup_tbl/scan_lookup_tbl.json")
-    with open(scan_lookup_tbl_json_path, 'r') as fp:
-        scan_lookup_tbl = json.load(fp)
-        
-#    print("loaded scan_lookup_tbl from ./para_lookup_tbl/scan_lookup_tbl.json")
-    with open(scan_AB_lookup_tbl_json_path, 'r') as fp:
-        scan_AB_lookup_tbl = json.load(fp)
-
-#    print("loaded recon_lookup_tbl from ./para_lookup_tbl/recon_lookup_tbl.json")
-    with open(recon_lookup_tbl_json_path, 'r') as fp:
-        recon_lookup_tbl = json.load(fp)
-
-#    print("loaded monitoring_scan_lookup_tbl from ./para_lookup_tbl/monitoring_scan_lookup_tbl.json")
-    with open(monitoring_scan_lookup_tbl_json_path, 'r') as fp:
-        monitoring_scan_lookup_tbl = json.load(fp)
+    # each lookup table is loaded once per process (see lookup_tbl_registry.py), and again only if its file changes
+    topo_lookup_tbl_obj = load_lookup_tbl(topo_lookup_tbl_json_path)
+    scan_lookup_tbl_obj = load_lookup_tbl(scan_lookup_tbl_json_path)
+    scan_AB_lookup_tbl_obj = load_lookup_tbl(scan_AB_lookup_tbl_json_path)
+    recon_lookup_tbl_obj = load_lookup_tbl(recon_lookup_tbl_json_path)
+    monitoring_scan_lookup_tbl_obj = load_lookup_tbl(monitoring_scan_lookup_tbl_json_path)
+
+    # the extraction plans are compiled once per loaded lookup table, so that each series' nodes are visited once for
+    # all of its parameters
+    topo_extraction_plan = get_extraction_plan_Siemens_Force(topo_lookup_tbl_obj)
+    scan_extraction_plan = get_extraction_plan_Siemens_Force(scan_lookup_tbl_obj)
+    scan_AB_extraction_plan = get_extraction_plan_Siemens_Force(scan_AB_lookup_tbl_obj)
+    recon_extraction_plan = get_extraction_plan_Siemens_Force(recon_lookup_tbl_obj)
+    monitoring_scan_extraction_plan = get_extraction_plan_Siemens_Force(monitoring_scan_lookup_tbl_obj)
+    # the tags needed by the lookup tables, the streamed entries keep only these and their ancestors
+    keep_tag_set = get_keep_tag_set_Siemens_Force([topo_extraction_plan,
+                                                   scan_extraction_plan,
+                                                   scan_AB_extraction_plan,
+                                                   recon_extraction_plan,
+                                                   monitoring_scan_extraction_plan])
+
+    if prot_cache_folder is not None:
+        # any change to the lookup tables gives new cache entries
+        lookup_tbl_hash = get_lookup_tbl_hash([topo_lookup_tbl_obj,
+                                               scan_lookup_tbl_obj,
+                                               scan_AB_lookup_tbl_obj,
+                                               recon_lookup_tbl_obj,
+                                               monitoring_scan_lookup_tbl_obj],
+                                              "Siemens_Force")
 
     prot_pair_se_list = []
     prot_pair_dict_list = []
@@ -203,20 +243,40 @@ def convert_protocol_from_indiv_prot_xml_to_json(topo_lookup_tbl_json_path,
 
         indiv_prot_xml_path = target_prot_xml_path_list[i]
 
+        if prot_cache_folder is not None:
+            prot_cache_path = get_prot_cache_path(prot_cache_folder, lookup_tbl_hash, indiv_prot_xml_path,
+                                                  target_prot_xml_hash_list[i] if target_prot_xml_hash_list is not None else None)
+            prot_dict_list = load_prot_dict_list_from_cache(prot_cache_path)
+            if prot_dict_list is not None:
+                # same protocol file content, parsed before with the same lookup tables
+                prot_pair_dict_list.append(prot_dict_list)
+                continue
+
 #        print("\n================================================================================\n")
 #        print(indiv_prot_xml_path)
 
-        # get the ET xml tree from the chosen individual protocol file
-        prot_xml_tree = ET.parse(indiv_prot_xml_path)
-        root = prot_xml_tree.getroot()
-        xpath_string = ".//MlModeEntryType"
-        found_entry_xml_list = root.findall(xpath_string)
+        if bool_iterparse:
+            # stream the entries one at a time instead of keeping the whole tree in memory
+            found_entry_xml_list = iterparse_entry_xml_Siemens_Force(indiv_prot_xml_path,
+                                                                     entry_tag_list=("MlModeEntryType",),
+                                                                     keep_tag_set=keep_tag_set)
+        else:
+            # get the ET xml tree from the chosen individual protocol file, with lxml if it is installed
+            prot_xml_tree = get_xml_module().parse(indiv_prot_xml_path)
+            root = prot_xml_tree.getroot()
+            # index the entries and recons once, instead of searching the whole tree for every series
+            prot_xml_index = build_entry_index_Siemens_Force(prot_xml_tree)
+            found_entry_xml_list = prot_xml_index["entry_list"]
 
         prot_se_list = []
         prot_dict_list = []
 
         for i, entry_xml in enumerate(found_entry_xml_list):
 
+            if bool_iterparse:
+                # each streamed entry is indexed on its own
+                prot_xml_index = build_entry_index_Siemens_Force(entry_xml)
+
             # print(i, entry_xml.findtext(".//MlModeScanType/RangeName"))
             dict1 = {}
 #            print("\n================================================================================\n")
@@ -225,34 +285,21 @@ def convert_protocol_from_indiv_prot_xml_to_json(topo_lookup_tbl_json_path,
 
             if (entry_xml.findtext(".//MlModeScanType/RangeName") == '"Topogram"') or (entry_xml.findtext(".//MlModeScanType/RangeName") == '"TopograM"') or (entry_xml.findtext(".//MlModeScanType/RangeName") == '"Topogram LAT"') or (entry_xml.findtext(".//MlModeScanType/RangeName") == '"Topogram AP"'):
 
-                # note: globals()[]() and locals()[]() are general ways to call a function from its string function name
-                # locals(): use it if the call is in the the namespace of a script, instead of in the body of a function
-                # globals(): use it if the function name is in the body of a function
-                for key in topo_lookup_tbl:
-                    target_func_name = topo_lookup_tbl[key][0]
-                    para_dict = topo_lookup_tbl[key][1]
-                    para = globals()[target_func_name](prot_xml_tree,
-                                                       entry_node_id_value=entry_node_id_value,
-                                                       bool_verbose=False,
-                                                       **para_dict)
-                    dict1[key] = para[1]
-
-                scan_se = pd.Series(dict1)
+                dict1.update(get_para_dict_from_indiv_prot_xml_Siemens_Force(prot_xml_index,
+                                                                             topo_extraction_plan,
+                                                                             entry_node_id_value=entry_node_id_value))
+
+                scan_se = SeriesRecord("topo", dict1, series_id=(entry_node_id_value,))
                 prot_se_list.append(scan_se)
                 prot_dict_list.append(dict1)
 
             elif "monitoring" in entry_xml.findtext(".//MlModeScanType/RangeName").lower():
 
-                for key in monitoring_scan_lookup_tbl:
-                    target_func_name = monitoring_scan_lookup_tbl[key][0]
-                    para_dict = monitoring_scan_lookup_tbl[key][1]
-                    para = globals()[target_func_name](prot_xml_tree,
-                                                       entry_node_id_value=entry_node_id_value,
-                                                       bool_verbose=False,
-                                                       **para_dict)
-                    dict1[key] = para[1]
+                dict1.update(get_para_dict_from_indiv_prot_xml_Siemens_Force(prot_xml_index,
+                                                                             monitoring_scan_extraction_plan,
+                                                                             entry_node_id_value=entry_node_id_value))
 
-                scan_se = pd.Series(dict1)
+                scan_se = SeriesRecord("monitoring", dict1, series_id=(entry_node_id_value,))
                 prot_se_list.append(scan_se)
                 prot_dict_list.append(dict1)
 
@@ -260,27 +307,17 @@ def convert_protocol_from_indiv_prot_xml_to_json(topo_lookup_tbl_json_path,
 
                 if entry_xml.attrib["ModeScans"] == '1':
 
-                    for key in scan_lookup_tbl:
-                        target_func_name = scan_lookup_tbl[key][0]
-                        para_dict = scan_lookup_tbl[key][1]
-                        para = globals()[target_func_name](prot_xml_tree,
-                                                           entry_node_id_value=entry_node_id_value,
-                                                           bool_verbose=False,
-                                                           **para_dict)
-                        dict1[key] = para[1]
+                    dict1.update(get_para_dict_from_indiv_prot_xml_Siemens_Force(prot_xml_index,
+                                                                                 scan_extraction_plan,
+                                                                                 entry_node_id_value=entry_node_id_value))
                 
                 elif entry_xml.attrib["ModeScans"] == '2':
                     
-                    for key in scan_AB_lookup_tbl:
-                        target_func_name = scan_AB_lookup_tbl[key][0]
-                        para_dict = scan_AB_lookup_tbl[key][1]
-                        para = globals()[target_func_name](prot_xml_tree,
-                                                           entry_node_id_value=entry_node_id_value,
-                                                           bool_verbose=False,
-                                                           **para_dict)
-                        dict1[key] = para[1]
-
-                scan_se = pd.Series(dict1)
+                    dict1.update(get_para_dict_from_indiv_prot_xml_Siemens_Force(prot_xml_index,
+                                                                                 scan_AB_extraction_plan,
+                                                                                 entry_node_id_value=entry_node_id_value))
+
+                scan_se = SeriesRecord("scan", dict1, series_id=(entry_node_id_value,))
                 print(scan_se)
                 prot_se_list.append(scan_se)
                 prot_dict_list.append(dict1)                
@@ -298,28 +335,28 @@ def convert_protocol_from_indiv_prot_xml_to_json(topo_lookup_tbl_json_path,
                     dict2["ReconJob"] = str(j)
 #                    print("\n================================================================================\n")
                     sub_node_id_value = str(j)
-                    for key in recon_lookup_tbl:
-                        target_func_name = recon_lookup_tbl[key][0]
-                        para_dict = recon_lookup_tbl[key][1]
-                        para = globals()[target_func_name](prot_xml_tree,
-                                                           entry_node_id_value=entry_node_id_value,
-                                                           sub_node_id_value=sub_node_id_value,
-                                                           bool_verbose=False,
-                                                           **para_dict)
-                        dict2[key] = para[1]
-
-                    recon_se = pd.Series(dict2)
+                    dict2.update(get_para_dict_from_indiv_prot_xml_Siemens_Force(prot_xml_index,
+                                                                                 recon_extraction_plan,
+                                                                                 entry_node_id_value=entry_node_id_value,
+                                                                                 sub_node_id_value=sub_node_id_value))
+
+                    recon_se = SeriesRecord("recon", dict2, series_id=(entry_node_id_value, sub_node_id_value))
                     print(recon_se)
-                    prot_se_list.append(recon_se.copy())
-                    prot_dict_list.append(dict2.copy())
+                    prot_se_list.append(recon_se)
+                    prot_dict_list.append(dict2)
 
         prot_pair_se_list.append(prot_se_list)
         prot_pair_dict_list.append(prot_dict_list)
 
+        if prot_cache_folder is not None:
+            store_prot_dict_list_to_cache(prot_cache_path, prot_dict_list)
+
     # write the json file
-    with open(json_fname, "w") as output:
-#        print("Saved prot_pair_dict_list to:", json_fname)
-        json.dump(prot_pair_dict_list, output, indent=4)
+    if json_fname is not None:
+#    print("Saved prot_pair_dict_list to:", json_fname)
+        store_prot_pair_dict_list(prot_pair_dict_list, json_fname, target_prot_name_list)
+
+    return prot_pair_dict_list
 
 
 def convert_protocol_from_json_to_xlsx(target_prot_name_list,
@@ -331,7 +368,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
 
     :param target_prot_name_list: target protocol names. Note: if target_prot_name_list has only one protocol, the
     Excel file will only have 2 columns: one for the names of parameters and the other for the parameters.
-    :param prot_list_json_path: list of paths of json files to read from.
+    :param prot_list_json_path: list of paths of json files to read from (or .arrow files, see store_prot_pair_dict_list.py), or the parsing result itself, as returned by the json converter, so that no file is written and read back.
     :param output_xlsx_path: path of the output Excel file to save to.
     :param bool_verbose: whether printing status/progress information as the program run through its jobs.
     :param bool_debug:  wheter print out more detailed step-info for debugging
@@ -342,8 +379,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
     xlsx_path = output_xlsx_path
     prot_json_path = prot_list_json_path
     
-    with open(prot_json_path, "r") as input:
-        prot_pair_dict_list = json.load(input)
+    prot_pair_dict_list = load_prot_pair_dict_list(prot_json_path)
 
     # add logic to handle the case of one protocol in prot_pair_dict_list
     if len(prot_pair_dict_list) == 2:
@@ -370,6 +406,10 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
      main_scan_count_list,
      recon_per_scan_list) = parse_prot_pair_structure(prot_se_list1, prot_se_list2)
 
+    # the value cells of the two protocols, {(column letter, row number): (value, format)}, written once all the rows
+    # are laid out, so that each is highlighted if it differs from the other protocol in the same row
+    value_cell_dict = {}
+
     winner_main_scan_banner_row_list = []
     follower_main_scan_banner_row_list = []
 
@@ -402,29 +442,33 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                                          'valign': 'vcenter',
                                          'fg_color': '#5e9cfb'})
 
-    topo_format = workbook.add_format({'border': 1,
-                                       'align': 'center',
-                                       'valign': 'vcenter',
-                                       'fg_color': '#f4f5f7',
-                                       })
-
-    scan_format = workbook.add_format({'border': 1,
-                                       'align': 'center',
-                                       'valign': 'vcenter',
-                                       'fg_color': '#fefae7',
-                                       })
-
-    recon_format = workbook.add_format({'border': 1,
-                                        'align': 'center',
-                                        'valign': 'vcenter',
-                                        'fg_color': '#e9fcff',
-                                        })
+    topo_property_dict = {'border': 1,
+                          'align': 'center',
+                          'valign': 'vcenter',
+                          'fg_color': '#f4f5f7',
+                          }
+    topo_format = workbook.add_format(topo_property_dict)
 
-    monitoring_format = workbook.add_format({'border': 1,
-                                             'align': 'center',
-                                             'valign': 'vcenter',
-                                             'fg_color': '#e6fcef',
-                                             })
+    scan_property_dict = {'border': 1,
+                          'align': 'center',
+                          'valign': 'vcenter',
+                          'fg_color': '#fefae7',
+                          }
+    scan_format = workbook.add_format(scan_property_dict)
+
+    recon_property_dict = {'border': 1,
+                           'align': 'center',
+                           'valign': 'vcenter',
+                           'fg_color': '#e9fcff',
+                           }
+    recon_format = workbook.add_format(recon_property_dict)
+
+    monitoring_property_dict = {'border': 1,
+                                'align': 'center',
+                                'valign': 'vcenter',
+                                'fg_color': '#e6fcef',
+                                }
+    monitoring_format = workbook.add_format(monitoring_property_dict)
 
     dose_format = workbook.add_format({'border': 1,
                                        'align': 'center',
@@ -457,8 +501,14 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                                                   'valign': 'vcenter',
                                                   'fg_color': '#fdebe6'})
 
-    emphasis_format = workbook.add_format({'font_color': '#9c0006',
-                                           'bold': 1})
+    emphasis_property_dict = {'font_color': '#9c0006',
+                              'bold': 1}
+
+    # the format of each section, in the emphasis font, for the parameters which differ between the two protocols
+    changed_format_dict = {topo_format: workbook.add_format(dict(topo_property_dict, **emphasis_property_dict)),
+                           scan_format: workbook.add_format(dict(scan_property_dict, **emphasis_property_dict)),
+                           recon_format: workbook.add_format(dict(recon_property_dict, **emphasis_property_dict)),
+                           monitoring_format: workbook.add_format(dict(monitoring_property_dict, **emphasis_property_dict))}
 
     ws.write('A1', "Protocol Name", title_format)
 
@@ -516,7 +566,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
         se_processed_follower = se_processed_list[follower_index]
 
         for i, se in enumerate(prot_se_list):
-            if ('"Topogram"' in [se[para] for para in se.keys()]) or ('"TopograM"' in [se[para] for para in se.keys()]) or ('"Topogram LAT"' in [se[para] for para in se.keys()]) or ('"Topogram AP"' in [se[para] for para in se.keys()]) and i >= se_processed_winner:
+            if get_series_kind_Siemens(se) == "topo" and i >= se_processed_winner:
                 row_winner += 1
                 banner_str = "Localizer"
                 title_cell_format = topo_para_title_format
@@ -538,15 +588,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
 
                     row_winner += 1
                     ws.write('A'+str(row_winner), para, title_cell_format)
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                     # done with the winner prot
 
         # work with the follower prot in its column
@@ -554,7 +598,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
         target_col_letter = prot_col_letter_list[follower_index]
 
         for j, se in enumerate(prot_se_list):
-            if ('"Topogram"' in [se[para] for para in se.keys()]) or ('"TopograM"' in [se[para] for para in se.keys()]) or ('"Topogram LAT"' in [se[para] for para in se.keys()]) or ('"Topogram AP"' in [se[para] for para in se.keys()])and j >= se_processed_follower:
+            if get_series_kind_Siemens(se) == "topo" and j >= se_processed_follower:
                 row_follower += 1
                 cell_format = topo_format
 
@@ -568,15 +612,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
 
                     row_follower += 1
 
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
+                    para_value = se[para]
 
-                    ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                    value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                     # done with the follower prot
 
     elif max(topo_count_list) < 1:
@@ -617,7 +655,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
         se_processed_follower = se_processed_list[follower_index]
 
         for i, se in enumerate(prot_se_list):
-            if '"PreMonitoring"' in [se[para] for para in se.keys()] and i >= se_processed_winner:
+            if get_series_kind_Siemens(se) == "premonitoring" and i >= se_processed_winner:
                 row_winner += 1
                 banner_str = "PreMonitoring Scan"
                 title_cell_format = monitoring_para_title_format
@@ -638,15 +676,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
 
                     row_winner += 1
                     ws.write('A'+str(row_winner), para, title_cell_format)
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                     # done with the winner prot
 
         # work with the follower prot in its column
@@ -654,7 +686,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
         target_col_letter = prot_col_letter_list[follower_index]
 
         for j, se in enumerate(prot_se_list):
-            if '"PreMonitoring"' in [se[para] for para in se.keys()] and j >= se_processed_follower:
+            if get_series_kind_Siemens(se) == "premonitoring" and j >= se_processed_follower:
                 row_follower += 1
                 cell_format = monitoring_format
 
@@ -665,15 +697,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                     if para in exclusion_para_set:
                         continue
                     row_follower += 1
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                     # done with the winner prot
 
     elif max(premonitoring_count_list) < 1:
@@ -714,7 +740,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
         se_processed_follower = se_processed_list[follower_index]
 
         for i, se in enumerate(prot_se_list):
-            if '"Monitoring"' in [se[para] for para in se.keys()] and i >= se_processed_winner:
+            if get_series_kind_Siemens(se) == "monitoring" and i >= se_processed_winner:
                 row_winner += 1
                 banner_str = "Monitoring Scan"
                 title_cell_format = monitoring_para_title_format
@@ -735,15 +761,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
 
                     row_winner += 1
                     ws.write('A'+str(row_winner), para, title_cell_format)
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                     # done with the winner prot
 
         # work with the follower prot in its column
@@ -751,7 +771,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
         target_col_letter = prot_col_letter_list[follower_index]
 
         for j, se in enumerate(prot_se_list):
-            if '"Monitoring"' in [se[para] for para in se.keys()] and j >= se_processed_follower:
+            if get_series_kind_Siemens(se) == "monitoring" and j >= se_processed_follower:
                 row_follower += 1
                 cell_format = monitoring_format
 
@@ -763,15 +783,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                         continue
 
                     row_follower += 1
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                     # done with the winner prot
 
     elif max(monitoring_count_list) < 1:
@@ -839,7 +853,8 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
             se = prot_se_list[i]
 
             if i >= se_processed_winner:
-                if 'ReconJob' in se.keys():
+                series_kind = get_series_kind_Siemens(se)
+                if series_kind == "recon":
                     row_winner += 1
                     if bool_debug:
                         print("row_winner", row_winner)
@@ -865,18 +880,12 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                             print("row_winner", row_winner)
 
                         ws.write('A'+str(row_winner), para, title_cell_format)
-                        para_value_quote_removed = se[para].replace('"', '')
-                        if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                            para_value = int(para_value_quote_removed)
-                        elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                            para_value = float(para_value_quote_removed)
-                        else:
-                            para_value = para_value_quote_removed
-
-                        ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                        para_value = se[para]
+
+                        value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                         # done with the winner prot
 
-                elif ('Topogram' in " ".join([se[para] for para in se.keys()])) or ('TopograM' in " ".join([se[para] for para in se.keys()])) or ('PreMonitoring' in " ".join([se[para] for para in se.keys()])) or ('Bolus Trigger Level' in se.keys()) or ('Monitoring' in " ".join([se[para] for para in se.keys()])) or ('Test Bolus' in " ".join([se[para] for para in se.keys()])):
+                elif series_kind != "scan":
                     continue
                 else: # this is a main scan
                     row_winner += 1
@@ -906,15 +915,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                             print("row_winner", row_winner)
 
                         ws.write('A'+str(row_winner), para, title_cell_format)
-                        para_value_quote_removed = se[para].replace('"', '')
-                        if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                            para_value = int(para_value_quote_removed)
-                        elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                            para_value = float(para_value_quote_removed)
-                        else:
-                            para_value = para_value_quote_removed
-
-                        ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                        para_value = se[para]
+
+                        value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                         # done with the winner prot
 
                     processed_winner_main_scan_count += 1
@@ -934,7 +937,8 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
             se = prot_se_list[j]
 
             if j >= se_processed_follower:
-                if 'ReconJob' in se.keys():
+                series_kind = get_series_kind_Siemens(se)
+                if series_kind == "recon":
                     row_follower += 1
                     if bool_debug:
                         print("row_follower", row_follower)
@@ -951,18 +955,12 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                         if bool_debug:
                             print("row_follower", row_follower)
 
-                        para_value_quote_removed = se[para].replace('"', '')
-                        if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                            para_value = int(para_value_quote_removed)
-                        elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                            para_value = float(para_value_quote_removed)
-                        else:
-                            para_value = para_value_quote_removed
+                        para_value = se[para]
 
-                        ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                        value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                         # done with the winner prot
 
-                elif ('Topogram' in " ".join([se[para] for para in se.keys()])) or ('TopograM' in " ".join([se[para] for para in se.keys()])) or ('PreMonitoring' in " ".join([se[para] for para in se.keys()])) or ('Bolus Trigger Level' in se.keys()) or ('Monitoring' in " ".join([se[para] for para in se.keys()])) or ('Test Bolus' in " ".join([se[para] for para in se.keys()])):
+                elif series_kind != "scan":
                     continue
                 else: # this is a main scan
                     row_follower += 1
@@ -983,15 +981,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                         if bool_debug:
                             print("row_follower", row_follower)
 
-                        para_value_quote_removed = se[para].replace('"', '')
-                        if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                            para_value = int(para_value_quote_removed)
-                        elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                            para_value = float(para_value_quote_removed)
-                        else:
-                            para_value = para_value_quote_removed
+                        para_value = se[para]
 
-                        ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                        value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                         # done with the follower prot
 
                     processed_follower_main_scan_count += 1
@@ -1050,116 +1042,586 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
     if num_prot == 2:
         ws.set_column('C:C', 60)
 
-        ws.conditional_format("C2:C1000",
-                              {'type':'formula',
-                               'criteria': '=$C2<>$B2',
-                               'format': emphasis_format
-                               })
-
-        ws.conditional_format("B2:B1000",
-                              {'type':'formula',
-                               'criteria': '=$B2<>$C2',
-                               'format': emphasis_format
-                               })
+    # the values which differ between the two protocols, in the emphasis font
+    changed_row_cell_set = get_changed_row_cell_set({cell: para_value for (cell, (para_value, cell_format)) in value_cell_dict.items()}) if num_prot == 2 else set()
+    for (col_letter, row), (para_value, cell_format) in value_cell_dict.items():
+        ws.write(col_letter+str(row), para_value, changed_format_dict[cell_format] if (col_letter, row) in changed_row_cell_set else cell_format)
 
     workbook.close()
 
-############## USER INPUT DATA BELOW #################################################################
-path1 = 'UserProtocols_2020-06'
-path2 = 'UserProtocols_2022-02-09'
-protocol_file_folder = "./Siemens_Force"
-json_path = "\\json_path\\"
-output_path = "\\output_path\\"
-######################################################################################################
-
-path1prefix = protocol_file_folder + '\\' + path1
-path2prefix = protocol_file_folder + '\\' + path2
-target_prot_name_list = [path1, path2]
-
-target_prot_xml_path_list = [0,0]
-onlyprots = []
-
-for i, target_prot_name in enumerate(target_prot_name_list):
-    target_prot_file_name = re.sub(r" \((Child|Adult)\)", r".\1", target_prot_name)
-    mypath = protocol_file_folder + "\\" + target_prot_file_name
-    onlyfiles = [os.path.join(dirpath,f) for (dirpath, dirnames, filenames) in os.walk(mypath) for f in filenames]
-    onlyprots.append([x for x in onlyfiles if any(sub in x for sub in ['.Adult','.Child'])])
-
-onlyprots_1 = onlyprots[0]
-onlyprots_2 = onlyprots[1]
-onlyprotnames_1 = []
-onlyprotnames_2 = []
-
-for x in onlyprots_1:
-    onlyprotnames_1.append(x.removeprefix(path1prefix))
-for x in onlyprots_2:
-    onlyprotnames_2.append(x.removeprefix(path2prefix))
-
-inbothyears = list(set(onlyprotnames_2).intersection(onlyprotnames_1))
-notin2022 = list(set(onlyprotnames_2).difference(onlyprotnames_1))
-notin2023 = list(set(onlyprotnames_1).difference(onlyprotnames_2))
-tot_2022 = len(onlyprotnames_1)
-tot_2023 = len(onlyprotnames_2)
-
-for x in inbothyears:
-    
-    target_prot_xml_path_list[0] = glob.glob(protocol_file_folder + '\\' + target_prot_name_list[0] + "\\**\\" + x, recursive=True)[0]
-    target_prot_xml_path_list[1] = glob.glob(protocol_file_folder + '\\' + target_prot_name_list[1] + "\\**\\" + x, recursive=True)[0]
-    common_prot_name = x.split('\\')[0] + x.split('\\')[1].replace('.','')
-    output_json_path = protocol_file_folder + json_path + common_prot_name + '.json'
-    output_json_path = re.sub('_\.', '.', output_json_path)
-    
-    prot_list_json_path = output_json_path
-    xlsx_path = protocol_file_folder + output_path + common_prot_name + '.xlsx'
+def get_prot_type_BeforeAfter(prot_rel_path):
+    """Figure out which converter a protocol goes to, from its path relative to the protocol snapshot folder.
+
+    :param prot_rel_path: path of the protocol file relative to the snapshot folder, e.g., "\\Cardiac\\CaScore.Adult"
+    :returns: "Cardiac", "DE" (dual energy) or "General"
+
+    """
+
+    if 'Cardiac' in prot_rel_path:
+        return "Cardiac"
+    elif re.search(r"(^|[^A-Za-z])(DE|DualEnergy|Dual Energy)([^A-Za-z]|$)", prot_rel_path):
+        return "DE"
+    else:
+        return "General"
+
+def parse_prot_pair_BeforeAfter(prot_rel_path,
+                                target_prot_name_list,
+                                target_prot_xml_path_list,
+                                output_json_path=None,
+                                prot_cache_folder=None,
+                                target_prot_xml_hash_list=None):
+    """Parse one protocol pair (the same protocol in the snapshots), or a single protocol file, with the general,
+    cardiac or dual energy converter.
+
+    :param prot_rel_path: path of the protocol file relative to the snapshot folders, which decides the converter
+    :param target_prot_name_list: names of the snapshots
+    :param target_prot_xml_path_list: the protocol files, one per snapshot
+    :param output_json_path: optional, target json path to save the intermediate parsing result to. With the .arrow
+    extension, the columnar Arrow format is saved instead (see store_prot_pair_dict_list.py).
+    :param prot_cache_folder: optional, folder of the persistent parsing cache (see cache_prot_dict_list.py)
+    :param target_prot_xml_hash_list: optional, content hashes of the protocol files, for the cache paths, hashed by the
+    converter if None
+    :returns: list of the protocols, each a list of dict, each dict being a scan or recon series
+
+    """
+
+    prot_type = get_prot_type_BeforeAfter(prot_rel_path)
+
+    topo_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/topo_lookup_tbl.json"
+    scan_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/scan_lookup_tbl.json"
+    scan_AB_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/scan_AB_lookup_tbl.json"
+    recon_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/recon_lookup_tbl.json"
+
+    if prot_type == "Cardiac":
 
-    xlsx_path = re.sub('_\.', '.', xlsx_path)
-    
-    if 'Cardiac' in x:
-        
-        topo_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/topo_lookup_tbl.json"
-        scan_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/scan_lookup_tbl.json"
-        scan_AB_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/scan_AB_lookup_tbl.json"
-        recon_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/recon_lookup_tbl.json"
         bolus_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/bolus_lookup_tbl.json"
         monitoring_scan_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/monitoring_C_scan_lookup_tbl.json"
 
-        if 1:
-            convert_protocol_from_indiv_prot_xml_to_json_C(topo_lookup_tbl_json_path,
-                                                           scan_lookup_tbl_json_path,
-                                                           scan_AB_lookup_tbl_json_path,
-                                                           recon_lookup_tbl_json_path,
-                                                           bolus_lookup_tbl_json_path,
-                                                           monitoring_scan_lookup_tbl_json_path,
-                                                           target_prot_name_list,
-                                                           target_prot_xml_path_list,
-                                                           output_json_path)
-      
-            convert_protocol_from_json_to_xlsx_C(x,
-                                                 prot_list_json_path,
-                                                 output_xlsx_path=xlsx_path,
-                                                 bool_verbose=False,
-                                                 bool_debug=False)
+        return convert_protocol_from_indiv_prot_xml_to_json_C(topo_lookup_tbl_json_path,
+                                                              scan_lookup_tbl_json_path,
+                                                              scan_AB_lookup_tbl_json_path,
+                                                              recon_lookup_tbl_json_path,
+                                                              bolus_lookup_tbl_json_path,
+                                                              monitoring_scan_lookup_tbl_json_path,
+                                                              target_prot_name_list,
+                                                              target_prot_xml_path_list,
+                                                              output_json_path,
+                                                              prot_cache_folder=prot_cache_folder,
+                                                              target_prot_xml_hash_list=target_prot_xml_hash_list)
+
+    elif prot_type == "DE":
+
+        monitoring_scan_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/monitoring_scan_lookup_tbl.json"
+
+        return convert_protocol_from_indiv_prot_xml_to_json_DE(topo_lookup_tbl_json_path,
+                                                               scan_lookup_tbl_json_path,
+                                                               scan_AB_lookup_tbl_json_path,
+                                                               recon_lookup_tbl_json_path,
+                                                               monitoring_scan_lookup_tbl_json_path,
+                                                               target_prot_name_list,
+                                                               target_prot_xml_path_list,
+                                                               output_json_path,
+                                                               prot_cache_folder=prot_cache_folder,
+                                                               target_prot_xml_hash_list=target_prot_xml_hash_list)
 
     else:
-        
-        topo_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/topo_lookup_tbl.json"
-        scan_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/scan_lookup_tbl.json"
-        scan_AB_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/scan_AB_lookup_tbl.json"        
-        recon_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/recon_lookup_tbl.json"
+
         monitoring_scan_lookup_tbl_json_path = "./para_lookup_tbl/Siemens/monitoring_scan_lookup_tbl.json"
-    
-        if 1:
-            convert_protocol_from_indiv_prot_xml_to_json(topo_lookup_tbl_json_path,
-                                                         scan_lookup_tbl_json_path,
-                                                         scan_AB_lookup_tbl_json_path,
-                                                         recon_lookup_tbl_json_path,
-                                                         monitoring_scan_lookup_tbl_json_path,
-                                                         target_prot_name_list,
-                                                         target_prot_xml_path_list,
-                                                         output_json_path)
-      
-            convert_protocol_from_json_to_xlsx(x,
-                                               prot_list_json_path,
-                                               output_xlsx_path=xlsx_path,
-                                               bool_verbose=False,
-                                               bool_debug=False)
\ No newline at end of file
+
+        return convert_protocol_from_indiv_prot_xml_to_json(topo_lookup_tbl_json_path,
+                                                            scan_lookup_tbl_json_path,
+                                                            scan_AB_lookup_tbl_json_path,
+                                                            recon_lookup_tbl_json_path,
+                                                            monitoring_scan_lookup_tbl_json_path,
+                                                            target_prot_name_list,
+                                                            target_prot_xml_path_list,
+                                                            output_json_path,
+                                                            prot_cache_folder=prot_cache_folder,
+                                                            target_prot_xml_hash_list=target_prot_xml_hash_list)
+
+def get_lookup_tbl_hash_BeforeAfter():
+    """Hash all the lookup tables the converters of parse_prot_pair_BeforeAfter() may use, e.g., to find out the
+    parsing results (in the protocol catalog) which were parsed with older lookup tables.
+
+    :returns: hex string, from cache_prot_dict_list.get_lookup_tbl_hash()
+
+    """
+
+    lookup_tbl_json_path_list = ["./para_lookup_tbl/Siemens/topo_lookup_tbl.json",
+                                 "./para_lookup_tbl/Siemens/scan_lookup_tbl.json",
+                                 "./para_lookup_tbl/Siemens/scan_AB_lookup_tbl.json",
+                                 "./para_lookup_tbl/Siemens/recon_lookup_tbl.json",
+                                 "./para_lookup_tbl/Siemens/bolus_lookup_tbl.json",
+                                 "./para_lookup_tbl/Siemens/monitoring_C_scan_lookup_tbl.json",
+                                 "./para_lookup_tbl/Siemens/monitoring_scan_lookup_tbl.json"]
+
+    return get_lookup_tbl_hash([load_lookup_tbl(lookup_tbl_json_path) for lookup_tbl_json_path in lookup_tbl_json_path_list],
+                               "Siemens_Force_BeforeAfter")
+
+def get_prot_dict_list_BeforeAfter(prot_rel_path, prot_xml_path, prot_cache_folder=None):
+    """Parse a single protocol file, e.g., to load it into the protocol catalog (see prot_catalog.py).
+
+    :param prot_rel_path: path of the protocol file relative to its snapshot folder, which decides the converter
+    :param prot_xml_path: path of the protocol file
+    :param prot_cache_folder: optional, folder of the persistent parsing cache (see cache_prot_dict_list.py)
+    :returns: list of dict, each dict being a scan or recon series
+
+    """
+
+    return parse_prot_pair_BeforeAfter(prot_rel_path,
+                                       [prot_rel_path],
+                                       [prot_xml_path],
+                                       prot_cache_folder=prot_cache_folder)[0]
+
+def convert_prot_pair_BeforeAfter(prot_rel_path,
+                                  target_prot_name_list,
+                                  target_prot_xml_path_list,
+                                  output_json_path,
+                                  output_xlsx_path,
+                                  prot_cache_folder=None,
+                                  bool_skip_unchanged=False,
+                                  series_align_method="position",
+                                  target_prot_xml_hash_list=None):
+    """Convert one protocol pair (the same protocol in the two snapshots) to the Excel file, with the general, cardiac
+    or dual energy converter. The parsing result is passed to the Excel writer in memory; the json file is only a side
+    output. The pair is diffed once (see diff_prot_pair.py), for its change records; the Excel writers highlight the
+    values which differ from the other protocol in the same row.
+    With bool_skip_unchanged, the pairs which did not change are skipped, and neither their json nor their Excel file is
+    written: the two protocol files are compared by their content hash first, without being parsed, then by the digest
+    of their extracted parameters (see diff_prot_pair.get_prot_digest()), e.g., for a file saved again as is.
+    With series_align_method "sequence", the series of the pair are matched by sequence alignment (see
+    align_prot_series.py), and this alignment drives both the diff and the rows of the Excel file, written by
+    convert_prot_list_to_xlsx() for all the converters.
+
+    :param prot_rel_path: path of the protocol file relative to the snapshot folders, which decides the converter
+    :param target_prot_name_list: names of the two snapshots
+    :param target_prot_xml_path_list: the protocol files of the pair, one per snapshot
+    :param output_json_path: target json path to save the intermediate parsing result to, or None to save nothing. With
+    the .arrow extension, the columnar Arrow format is saved instead (see store_prot_pair_dict_list.py).
+    :param output_xlsx_path: path of the output Excel file to save to.
+    :param prot_cache_folder: optional, folder of the persistent parsing cache (see cache_prot_dict_list.py)
+    :param bool_skip_unchanged: whether to skip the pairs which did not change
+    :param series_align_method: "position", the k-th series of a section with the k-th, as laid out by the Excel writer
+    of the converter, or "sequence"
+    :param target_prot_xml_hash_list: optional, content hashes of the protocol files from
+    cache_prot_dict_list.get_file_hash(), e.g., from the run manifest, for both the skip check and the cache paths;
+    hashed here if None, each file once
+    :returns: (change state, list of the change records of the pair, from diff_prot_pair.diff_prot_pair()), the change
+    state being "identical" (same file content, skipped), "equivalent" (same extracted parameters, skipped) or "changed";
+    always "changed" without bool_skip_unchanged
+
+    """
+
+    prot_type = get_prot_type_BeforeAfter(prot_rel_path)
+
+    if target_prot_xml_hash_list is None and (bool_skip_unchanged or prot_cache_folder is not None):
+        target_prot_xml_hash_list = [get_file_hash(prot_xml_path) for prot_xml_path in target_prot_xml_path_list]
+
+    if bool_skip_unchanged and len(set(target_prot_xml_hash_list)) == 1:
+        return "identical", []
+
+    prot_pair_dict_list = parse_prot_pair_BeforeAfter(prot_rel_path,
+                                                      target_prot_name_list,
+                                                      target_prot_xml_path_list,
+                                                      prot_cache_folder=prot_cache_folder,
+                                                      target_prot_xml_hash_list=target_prot_xml_hash_list)
+
+    if bool_skip_unchanged and len(set([get_prot_digest(prot_dict_list) for prot_dict_list in prot_pair_dict_list])) == 1:
+        return "equivalent", []
+
+    if output_json_path is not None:
+        store_prot_pair_dict_list(prot_pair_dict_list, output_json_path, target_prot_name_list)
+
+    if series_align_method == "sequence":
+
+        aligned_series_list = align_prot_list_by_sequence(prot_pair_dict_list)
+        prot_change_list = diff_prot_pair(prot_pair_dict_list[0], prot_pair_dict_list[-1], prot_rel_path=prot_rel_path,
+                                          aligned_series_list=aligned_series_list)
+
+        convert_prot_list_to_xlsx(target_prot_name_list,
+                                  prot_pair_dict_list,
+                                  output_xlsx_path,
+                                  prot_change_list=prot_change_list,
+                                  aligned_series_list=aligned_series_list)
+
+        return "changed", prot_change_list
+
+    prot_change_list = diff_prot_pair(prot_pair_dict_list[0], prot_pair_dict_list[-1], prot_rel_path=prot_rel_path)
+
+    if prot_type == "Cardiac":
+
+        convert_protocol_from_json_to_xlsx_C(prot_rel_path,
+                                             prot_pair_dict_list,
+                                             output_xlsx_path=output_xlsx_path,
+                                             bool_verbose=False,
+                                             bool_debug=False)
+
+    elif prot_type == "DE":
+
+        convert_protocol_from_json_to_xlsx_DE(prot_rel_path,
+                                              prot_pair_dict_list,
+                                              output_xlsx_path=output_xlsx_path,
+                                              bool_verbose=False,
+                                              bool_debug=False)
+
+    else:
+
+        convert_protocol_from_json_to_xlsx(prot_rel_path,
+                                           prot_pair_dict_list,
+                                           output_xlsx_path=output_xlsx_path,
+                                           bool_verbose=False,
+                                           bool_debug=False)
+
+    return "changed", prot_change_list
+
+def diff_prot_pair_BeforeAfter(prot_rel_path,
+                               target_prot_name_list,
+                               target_prot_xml_path_list,
+                               prot_cache_folder=None,
+                               series_align_method="position",
+                               target_prot_xml_hash_list=None):
+    """Diff one protocol pair as convert_prot_pair_BeforeAfter() does, without writing any file, e.g., for the pairs
+    whose outputs of a previous run are still valid (see convert_prot_pair_list_resumable_BeforeAfter()).
+
+    :param prot_rel_path: path of the protocol file relative to the snapshot folders, which decides the converter
+    :param target_prot_name_list: names of the two snapshots
+    :param target_prot_xml_path_list: the protocol files of the pair, one per snapshot
+    :param prot_cache_folder: optional, folder of the persistent parsing cache (see cache_prot_dict_list.py)
+    :param series_align_method: "position" or "sequence", see convert_prot_pair_BeforeAfter()
+    :param target_prot_xml_hash_list: optional, content hashes of the protocol files, for the cache paths, see
+    convert_prot_pair_BeforeAfter()
+    :returns: list of the change records of the pair, from diff_prot_pair.diff_prot_pair()
+
+    """
+
+    prot_pair_dict_list = parse_prot_pair_BeforeAfter(prot_rel_path,
+                                                      target_prot_name_list,
+                                                      target_prot_xml_path_list,
+                                                      prot_cache_folder=prot_cache_folder,
+                                                      target_prot_xml_hash_list=target_prot_xml_hash_list)
+
+    aligned_series_list = None
+    if series_align_method == "sequence":
+        aligned_series_list = align_prot_list_by_sequence(prot_pair_dict_list)
+
+    return diff_prot_pair(prot_pair_dict_list[0], prot_pair_dict_list[-1], prot_rel_path=prot_rel_path,
+                          aligned_series_list=aligned_series_list)
+
+def convert_prot_pair_task_BeforeAfter(prot_pair_task):
+    """Run convert_prot_pair_BeforeAfter() for one task of the batch, catching its errors, so that one bad protocol
+    file does not abort the whole batch.
+
+    :param prot_pair_task: dict of the parameters of convert_prot_pair_BeforeAfter()
+    :returns: dict, the result of the task:
+    {"prot_rel_path": path of the protocol file relative to the snapshot folders,
+     "prot_type": "Cardiac", "DE" or "General",
+     "status": "success" or "failure",
+     "error": traceback of the error, None if success,
+     "prot_change_state": "identical", "equivalent" or "changed", None if failure,
+     "prot_change_list": change records of the pair, None if failure}
+
+    """
+
+    prot_pair_result = {"prot_rel_path": prot_pair_task["prot_rel_path"],
+                        "prot_type": get_prot_type_BeforeAfter(prot_pair_task["prot_rel_path"]),
+                        "status": "success",
+                        "error": None,
+                        "prot_change_state": None,
+                        "prot_change_list": None}
+    try:
+        prot_pair_result["prot_change_state"], prot_pair_result["prot_change_list"] = convert_prot_pair_BeforeAfter(**prot_pair_task)
+    except Exception:
+        prot_pair_result["status"] = "failure"
+        prot_pair_result["error"] = traceback.format_exc()
+
+    return prot_pair_result
+
+def convert_prot_pair_list_BeforeAfter(prot_pair_task_list, worker_num=None, result_callback=None):
+    """Convert a batch of protocol pairs in parallel, with a pool of worker processes. The pairs are independent, each
+    one is parsed and then saved to Excel by one worker.
+
+    :param prot_pair_task_list: list of dict, the parameters of convert_prot_pair_BeforeAfter() for each pair
+    :param worker_num: number of worker processes, one per CPU core if None; if 1, the pairs are converted one at a
+    time in this process
+    :param result_callback: optional, function called as result_callback(task index, result) for each task as soon as
+    its result is in, in the task order, e.g., to record the progress of the run
+    :returns: list of dict, the result of each task from convert_prot_pair_task_BeforeAfter(), in the task order
+
+    """
+
+    if worker_num == 1:
+        prot_pair_result_list = []
+        for prot_pair_task in prot_pair_task_list:
+            prot_pair_result_list.append(convert_prot_pair_task_BeforeAfter(prot_pair_task))
+            if result_callback is not None:
+                result_callback(len(prot_pair_result_list) - 1, prot_pair_result_list[-1])
+        return prot_pair_result_list
+
+    prot_pair_result_list = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=worker_num) as executor:
+        future_list = [executor.submit(convert_prot_pair_task_BeforeAfter, prot_pair_task) for prot_pair_task in prot_pair_task_list]
+        for prot_pair_task, future in zip(prot_pair_task_list, future_list):
+            try:
+                prot_pair_result_list.append(future.result())
+            except Exception:
+                # the worker process itself failed, e.g., it was killed
+                prot_pair_result_list.append({"prot_rel_path": prot_pair_task["prot_rel_path"],
+                                              "prot_type": get_prot_type_BeforeAfter(prot_pair_task["prot_rel_path"]),
+                                              "status": "failure",
+                                              "error": traceback.format_exc(),
+                                              "prot_change_state": None,
+                                              "prot_change_list": None})
+            if result_callback is not None:
+                result_callback(len(prot_pair_result_list) - 1, prot_pair_result_list[-1])
+
+    return prot_pair_result_list
+
+def get_prot_pair_output_path_list_BeforeAfter(prot_pair_task, prot_change_state):
+    """Paths of the files convert_prot_pair_BeforeAfter() writes for a pair, as recorded in the run manifest.
+
+    :param prot_pair_task: dict of the parameters of convert_prot_pair_BeforeAfter()
+    :param prot_change_state: "identical", "equivalent" or "changed", see convert_prot_pair_BeforeAfter()
+    :returns: list of the json and Excel file paths of the pair, empty unless its change state is "changed", as the
+    pairs which did not change are skipped
+
+    """
+
+    if prot_change_state != "changed":
+        return []
+
+    return [output_path for output_path in [prot_pair_task["output_json_path"], prot_pair_task["output_xlsx_path"]]
+            if output_path is not None]
+
+def convert_prot_pair_list_resumable_BeforeAfter(prot_pair_task_list,
+                                                 prot_run_manifest_path,
+                                                 run_id,
+                                                 worker_num=None,
+                                                 bool_diff_resumed=False,
+                                                 manifest_store_interval=1.0):
+    """Convert a batch of protocol pairs as convert_prot_pair_list_BeforeAfter() does, but only the pairs which failed,
+    are new, whose protocol files changed since the previous runs, or whose output paths are not those recorded in the
+    run manifest (see prot_run_manifest.py); the outputs of the other pairs are left alone. The manifest is saved along the run, so that
+    a run stopped halfway resumes where it stopped.
+
+    :param prot_pair_task_list: list of dict, the parameters of convert_prot_pair_BeforeAfter() for each pair
+    :param prot_run_manifest_path: path of the manifest json file
+    :param run_id: id of the run, from prot_run_manifest.get_run_id(), the manifest of another run id being ignored
+    :param worker_num: number of worker processes, see convert_prot_pair_list_BeforeAfter()
+    :param bool_diff_resumed: whether to diff again the changed pairs which are not converted again, for their change
+    records, e.g., for the csv file of the changed parameters; through the parsing cache, without writing any file
+    :param manifest_store_interval: minimum time between two saves of the manifest during the run, in seconds
+    :returns: list of dict, the result of each task, in the task order, from convert_prot_pair_task_BeforeAfter(), with
+    "bool_resumed": whether the outputs of a previous run were kept; the change records of such a pair are None unless
+    bool_diff_resumed
+
+    """
+
+    prot_entry_dict = load_prot_run_manifest(prot_run_manifest_path, run_id)
+    # the pairs no longer in the batch are dropped from the manifest
+    prot_entry_dict = {prot_pair_task["prot_rel_path"]: prot_entry_dict[prot_pair_task["prot_rel_path"]]
+                       for prot_pair_task in prot_pair_task_list if prot_pair_task["prot_rel_path"] in prot_entry_dict}
+
+    # each protocol file is hashed once, for the manifest, the skip check and the cache paths
+    input_hash_list_list = [[get_file_hash(prot_xml_path) for prot_xml_path in prot_pair_task["target_prot_xml_path_list"]]
+                            for prot_pair_task in prot_pair_task_list]
+
+    prot_pair_result_list = [None] * len(prot_pair_task_list)
+    run_task_index_list = []
+    for k, prot_pair_task in enumerate(prot_pair_task_list):
+        prot_run_entry = prot_entry_dict.get(prot_pair_task["prot_rel_path"])
+        if (prot_run_entry is None
+                or not is_prot_run_current(prot_run_entry,
+                                           input_hash_list_list[k],
+                                           get_prot_pair_output_path_list_BeforeAfter(prot_pair_task, prot_run_entry["prot_change_state"]))):
+            run_task_index_list.append(k)
+            continue
+        prot_pair_result_list[k] = {"prot_rel_path": prot_pair_task["prot_rel_path"],
+                                    "prot_type": get_prot_type_BeforeAfter(prot_pair_task["prot_rel_path"]),
+                                    "status": "success",
+                                    "error": None,
+                                    "prot_change_state": prot_run_entry["prot_change_state"],
+                                    "prot_change_list": [] if prot_run_entry["prot_change_state"] != "changed" else None,
+                                    "bool_resumed": True}
+        if bool_diff_resumed and prot_run_entry["prot_change_state"] == "changed":
+            try:
+                prot_pair_result_list[k]["prot_change_list"] = diff_prot_pair_BeforeAfter(prot_pair_task["prot_rel_path"],
+                                                                                          prot_pair_task["target_prot_name_list"],
+                                                                                          prot_pair_task["target_prot_xml_path_list"],
+                                                                                          prot_cache_folder=prot_pair_task.get("prot_cache_folder"),
+                                                                                          series_align_method=prot_pair_task.get("series_align_method", "position"),
+                                                                                          target_prot_xml_hash_list=input_hash_list_list[k])
+            except Exception:
+                # converted again, which reports the error
+                prot_pair_result_list[k] = None
+                run_task_index_list.append(k)
+
+    last_store_time_list = [time.monotonic()]
+
+    def record_prot_pair_result(run_index, prot_pair_result):
+        k = run_task_index_list[run_index]
+        prot_pair_task = prot_pair_task_list[k]
+        prot_entry_dict[prot_pair_task["prot_rel_path"]] = get_prot_run_entry(input_hash_list_list[k],
+                                                                             get_prot_pair_output_path_list_BeforeAfter(prot_pair_task, prot_pair_result["prot_change_state"]),
+                                                                             prot_pair_result["status"],
+                                                                             prot_pair_result["prot_change_state"])
+        prot_pair_result_list[k] = dict(prot_pair_result, bool_resumed=False)
+        if time.monotonic() - last_store_time_list[0] >= manifest_store_interval:
+            store_prot_run_manifest(prot_run_manifest_path, run_id, prot_entry_dict)
+            last_store_time_list[0] = time.monotonic()
+
+    convert_prot_pair_list_BeforeAfter([dict(prot_pair_task_list[k], target_prot_xml_hash_list=input_hash_list_list[k]) for k in run_task_index_list],
+                                       worker_num=worker_num,
+                                       result_callback=record_prot_pair_result)
+
+    store_prot_run_manifest(prot_run_manifest_path, run_id, prot_entry_dict)
+
+    return prot_pair_result_list
+
+if __name__ == "__main__":
+
+    ############## USER INPUT DATA BELOW #################################################################
+    path1 = 'UserProtocols_2020-06'
+    path2 = 'UserProtocols_2022-02-09'
+    protocol_file_folder = "./Siemens_Force"
+    json_path = "\\json_path\\"
+    # whether to also save the intermediate parsing result of each pair to json_path; the Excel files are written from
+    # the parsing result in memory either way
+    bool_save_intermediate_file = False
+    # extension of the intermediate files: ".json", or ".arrow" for the columnar Arrow format (needs pyarrow), from which
+    # one parameter can be read across all the pairs with store_prot_pair_dict_list.read_para_column_arrow()
+    intermediate_ext = ".json"
+    output_path = "\\output_path\\"
+    # persistent parsing cache, so that the protocols which did not change between the exports are not parsed again
+    prot_cache_path = "\\prot_cache\\"
+    max_prot_cache_size = 512 * 1024 * 1024
+    # optional, SQLite catalog of all the protocols of the snapshots, e.g., "\\prot_catalog.db", to query their
+    # parameters across the snapshots (see prot_catalog.py); None for no catalog
+    prot_catalog_path = None
+    # optional, csv file of the parameters changed between the snapshots, one row per parameter of each pair (see
+    # diff_prot_pair.py), e.g., "\\prot_change_list.csv"; None for no file
+    prot_change_csv_path = None
+    # whether to skip the protocol pairs which did not change between the snapshots (same file content, or same
+    # extracted parameters): no json or Excel file is written for them, they are only counted in the summary
+    bool_skip_unchanged = True
+    # optional, text file listing the skipped protocol pairs, e.g., "\\unchanged_prot_list.txt"; None for no file
+    unchanged_prot_list_path = None
+    # alignment of the series of each pair: "position", the k-th series of a section with the k-th, as laid out by the
+    # Excel writer of the converter; "sequence", by their range, series description, kernel and slice width/thickness,
+    # so that an inserted series does not shift the later ones (see align_prot_series.py)
+    series_align_method = "position"
+    # optional, run manifest recording the input hashes, output paths and status of each protocol pair, e.g.,
+    # "\\run_manifest.json", so that a run again only converts the pairs which failed, are new or changed, and a run
+    # stopped halfway resumes (see prot_run_manifest.py); None to convert all the pairs at each run
+    prot_run_manifest_path = "\\run_manifest.json"
+    # number of worker processes converting the protocol pairs in parallel, one per CPU core if None, 1 for one pair at
+    # a time in this process
+    worker_num = None
+    ######################################################################################################
+
+    prot_cache_folder = protocol_file_folder + prot_cache_path
+
+    target_prot_name_list = [path1, path2]
+
+    # index each snapshot once: relative protocol path -> absolute path, size and mtime
+    prot_snapshot_index_list = []
+
+    for i, target_prot_name in enumerate(target_prot_name_list):
+        target_prot_file_name = re.sub(r" \((Child|Adult)\)", r".\1", target_prot_name)
+        mypath = protocol_file_folder + "\\" + target_prot_file_name
+        prot_snapshot_index_list.append(build_prot_snapshot_index(mypath, suffix_list=['.Adult','.Child']))
+
+    onlyprotnames_1 = list(prot_snapshot_index_list[0])
+    onlyprotnames_2 = list(prot_snapshot_index_list[1])
+
+    inbothyears = list(set(onlyprotnames_2).intersection(onlyprotnames_1))
+    notin2022 = list(set(onlyprotnames_2).difference(onlyprotnames_1))
+    notin2023 = list(set(onlyprotnames_1).difference(onlyprotnames_2))
+    tot_2022 = len(onlyprotnames_1)
+    tot_2023 = len(onlyprotnames_2)
+
+    prot_pair_task_list = []
+
+    for x in inbothyears:
+
+        target_prot_xml_path_list = [prot_snapshot_index_list[0][x]["path"],
+                                     prot_snapshot_index_list[1][x]["path"]]
+        common_prot_name = x.split('\\')[0] + x.split('\\')[1].replace('.','')
+        output_json_path = None
+        if bool_save_intermediate_file:
+            output_json_path = protocol_file_folder + json_path + common_prot_name + intermediate_ext
+            output_json_path = re.sub('_\.', '.', output_json_path)
+
+        xlsx_path = protocol_file_folder + output_path + common_prot_name + '.xlsx'
+        xlsx_path = re.sub('_\.', '.', xlsx_path)
+
+        prot_pair_task_list.append({"prot_rel_path": x,
+                                    "target_prot_name_list": target_prot_name_list,
+                                    "target_prot_xml_path_list": target_prot_xml_path_list,
+                                    "output_json_path": output_json_path,
+                                    "output_xlsx_path": xlsx_path,
+                                    "prot_cache_folder": prot_cache_folder,
+                                    "bool_skip_unchanged": bool_skip_unchanged,
+                                    "series_align_method": series_align_method})
+
+    # each pair is independent: convert them in parallel, a failed pair does not stop the others
+    if prot_run_manifest_path is not None:
+        # the options which change the outputs: a manifest of other options is ignored
+        run_id = get_run_id({"parser_id": get_lookup_tbl_hash_BeforeAfter(),
+                             "target_prot_name_list": target_prot_name_list,
+                             "bool_save_intermediate_file": bool_save_intermediate_file,
+                             "intermediate_ext": intermediate_ext,
+                             "json_path": json_path,
+                             "output_path": output_path,
+                             "bool_skip_unchanged": bool_skip_unchanged,
+                             "series_align_method": series_align_method})
+        prot_pair_result_list = convert_prot_pair_list_resumable_BeforeAfter(prot_pair_task_list,
+                                                                             protocol_file_folder + prot_run_manifest_path,
+                                                                             run_id,
+                                                                             worker_num=worker_num,
+                                                                             bool_diff_resumed=prot_change_csv_path is not None)
+    else:
+        prot_pair_result_list = convert_prot_pair_list_BeforeAfter(prot_pair_task_list, worker_num=worker_num)
+
+    failed_prot_pair_result_list = [result for result in prot_pair_result_list if result["status"] == "failure"]
+    unchanged_prot_rel_path_list = sorted([result["prot_rel_path"] for result in prot_pair_result_list if result["prot_change_state"] in ("identical", "equivalent")])
+    resumed_count = sum([1 for result in prot_pair_result_list if result.get("bool_resumed") and result["prot_change_state"] == "changed"])
+    print("\nConverted", len(prot_pair_result_list) - len(failed_prot_pair_result_list) - len(unchanged_prot_rel_path_list) - resumed_count, "of",
+          len(prot_pair_result_list), "protocol pairs")
+    if prot_run_manifest_path is not None:
+        print("Kept", resumed_count, "converted protocol pairs of the previous runs, unchanged since (see the run manifest)")
+    if bool_skip_unchanged:
+        print("Skipped", len(unchanged_prot_rel_path_list), "unchanged protocol pairs:",
+              sum([1 for result in prot_pair_result_list if result["prot_change_state"] == "identical"]), "identical files,",
+              sum([1 for result in prot_pair_result_list if result["prot_change_state"] == "equivalent"]), "same parameters")
+    if unchanged_prot_list_path is not None:
+        with open(protocol_file_folder + unchanged_prot_list_path, 'w') as fp:
+            fp.write("".join([prot_rel_path + "\n" for prot_rel_path in unchanged_prot_rel_path_list]))
+    for result in failed_prot_pair_result_list:
+        print("\nFailed:", result["prot_rel_path"], "(" + result["prot_type"] + ")")
+        print(result["error"])
+
+    if prot_change_csv_path is not None:
+        prot_change_list = [prot_change for result in prot_pair_result_list if result["prot_change_list"] for prot_change in result["prot_change_list"]]
+        store_prot_change_list_csv(prot_change_list, protocol_file_folder + prot_change_csv_path)
+        print("\nSaved", len(prot_change_list), "changed parameters of", sum([1 for result in prot_pair_result_list if result["prot_change_list"]]),
+              "protocol pairs to", protocol_file_folder + prot_change_csv_path)
+
+    if prot_catalog_path is not None:
+        # load each snapshot into the catalog, only its new or changed protocol files are parsed
+        prot_catalog_conn = open_prot_catalog(protocol_file_folder + prot_catalog_path)
+        parser_id = get_lookup_tbl_hash_BeforeAfter()
+        for target_prot_name, prot_snapshot_index in zip(target_prot_name_list, prot_snapshot_index_list):
+            update_result = update_snapshot_prot_catalog(prot_catalog_conn,
+                                                         target_prot_name,
+                                                         prot_snapshot_index,
+                                                         functools.partial(get_prot_dict_list_BeforeAfter, prot_cache_folder=prot_cache_folder),
+                                                         parser_id=parser_id)
+            print("\nCatalog", target_prot_name + ":", len(update_result["loaded"]), "loaded,", update_result["unchanged"], "unchanged,",
+                  len(update_result["deleted"]), "deleted,", len(update_result["failed"]), "failed")
+            for prot_rel_path, error in update_result["failed"]:
+                print("\nFailed:", prot_rel_path)
+                print(error)
+        prot_catalog_conn.close()
+
+    # bound the size of the parsing cache, the least recently used results first
+    evict_prot_dict_cache(prot_cache_folder, max_cache_size=max_prot_cache_size)
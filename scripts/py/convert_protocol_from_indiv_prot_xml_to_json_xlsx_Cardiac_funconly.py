@@ -8,33 +8,26 @@
 # Last-Updated: Mon Jul 25 22:43:31 2022 (-14400 Eastern Daylight Time)
 # Update #:
 
-import xml.etree.ElementTree as ET
-import pandas as pd
 import xlsxwriter
-import re
 import glob
-from get_para_from_indiv_prot_xml import get_para_from_indiv_prot_xml_Siemens_Force
-import json
+from get_para_from_indiv_prot_xml import get_xml_module
+from get_para_from_indiv_prot_xml import iterparse_entry_xml_Siemens_Force
+from get_para_from_indiv_prot_xml import build_entry_index_Siemens_Force
+from get_para_from_indiv_prot_xml import get_keep_tag_set_Siemens_Force
+from get_para_from_indiv_prot_xml import get_para_dict_from_indiv_prot_xml_Siemens_Force
+from cache_prot_dict_list import get_lookup_tbl_hash
+from cache_prot_dict_list import get_prot_cache_path
+from cache_prot_dict_list import load_prot_dict_list_from_cache
+from cache_prot_dict_list import store_prot_dict_list_to_cache
+from store_prot_pair_dict_list import store_prot_pair_dict_list
+from store_prot_pair_dict_list import load_prot_pair_dict_list
+from series_record import SeriesRecord
+from lookup_tbl_registry import load_lookup_tbl
+from lookup_tbl_registry import get_extraction_plan_Siemens_Force
+from diff_prot_pair import get_series_kind_Siemens
+from diff_prot_pair import get_changed_row_cell_set
 import numpy as np
 
-def isfloat(x):
-    try:
-        a = float(x)
-    except (TypeError, ValueError):
-        return False
-    else:
-        return True
- 
-def isint(x):
-    try:
-        a = float(x)
-        b = int(a)
-    except (TypeError, ValueError):
-        return False
-    else:
-        return a == b
-
-
 def parse_prot_pair_structure_C(prot_se_list1, prot_se_list2):
     """ Figure out the structure of the two protocols, which is used for creating the Excel file.
 
@@ -70,15 +63,16 @@ def parse_prot_pair_structure_C(prot_se_list1, prot_se_list2):
 
     for i, se in enumerate(prot_se_list1):
 
-        if ('"Topogram"' in " ".join([se[para] for para in se.keys()])) or ('"Topogram LAT"' in " ".join([se[para] for para in se.keys()])) or ('"Topogram AP"' in " ".join([se[para] for para in se.keys()])):
+        series_kind = get_series_kind_Siemens(se)
+        if series_kind == "topo":
             topo_count_list[0] = topo_count_list[0] + 1
-        elif 'PreMonitoring' in " ".join([se[para] for para in se.keys()]):
+        elif series_kind == "premonitoring":
             premonitoring_count_list[0] = premonitoring_count_list[0] + 1
-        elif 'Bolus Trigger Level' in se.keys():
+        elif series_kind == "bolus":
             bolus_count_list[0] = bolus_count_list[0] + 1       
-        elif 'Monitoring' in " ".join([se[para] for para in se.keys()]) or 'Test Bolus' in " ".join([se[para] for para in se.keys()]):
+        elif series_kind == "monitoring":
             monitoring_count_list[0] = monitoring_count_list[0] + 1
-        elif 'ReconJob' in se.keys():
+        elif series_kind == "recon":
             recon_count += 1
         else:
             main_scan_count_list[0] = main_scan_count_list[0] + 1
@@ -98,15 +92,16 @@ def parse_prot_pair_structure_C(prot_se_list1, prot_se_list2):
 
     for i, se in enumerate(prot_se_list2):
 
-        if ('"Topogram"' in " ".join([se[para] for para in se.keys()])) or ('"Topogram LAT"' in " ".join([se[para] for para in se.keys()])) or ('"Topogram AP"' in " ".join([se[para] for para in se.keys()])):
+        series_kind = get_series_kind_Siemens(se)
+        if series_kind == "topo":
             topo_count_list[1] = topo_count_list[1] + 1
-        elif 'PreMonitoring' in " ".join([se[para] for para in se.keys()]):
+        elif series_kind == "premonitoring":
             premonitoring_count_list[1] = premonitoring_count_list[1] + 1
-        elif 'Bolus Trigger Level' in se.keys():
+        elif series_kind == "bolus":
             bolus_count_list[1] = bolus_count_list[1] + 1
-        elif 'Monitoring' in " ".join([se[para] for para in se.keys()]) or 'Test Bolus' in " ".join([se[para] for para in se.keys()]):
+        elif series_kind == "monitoring":
             monitoring_count_list[1] = monitoring_count_list[1] + 1
-        elif 'ReconJob' in se.keys():
+        elif series_kind == "recon":
             recon_count += 1
         else:
             main_scan_count_list[1] = main_scan_count_list[1] + 1
@@ -155,49 +150,76 @@ def convert_protocol_from_indiv_prot_xml_to_json_C(topo_lookup_tbl_json_path,
                                                    monitoring_scan_lookup_tbl_json_path,
                                                    target_prot_name_list,
                                                    target_prot_xml_path_list,
-                                                   output_json_path):
+                                                   output_json_path,
+                                                   bool_iterparse=False,
+                                                   prot_cache_folder=None,
+                                                   target_prot_xml_hash_list=None):
 
     """ Parse convert protocol xml to json, for Siemens Force CT.
     How the localizier, premonitoring, monitoring, main scan, and recon series are based on the lookup tables as indicated by the function's parameters.
     For regular scans (non-DE, non-perfusion, non-cardiac), the look up table "scan_lookup_tbl.json" will work.
     The order of dictionary items appearing in the look up tables file also decide the order of parameters to be shown in each section of the intermediate json file and finally the Excel file.
 
-    :param topo_lookup_tbl_json_path: path to the lookup table for the localizers.
-    :param scan_lookup_tbl_json_path: path to the lookup table for the main scan.
-    :param recon_lookup_tbl_json_path: path to the lookup table for the recons.
-    :param bolus_lookup_tbl_json_path: path to the lookup table for the bolus parameters.
-    :param monitoring_scan_lookup_tbl_json_path: path to the lookup table for the premonitoring and monitoring scans.
+    :param topo_lookup_tbl_json_path: path to the lookup table for the localizers, or its lookup table object from
+    load_lookup_tbl().
+    :param scan_lookup_tbl_json_path: path to the lookup table for the main scan, or its lookup table object from
+    load_lookup_tbl().
+    :param recon_lookup_tbl_json_path: path to the lookup table for the recons, or its lookup table object from
+    load_lookup_tbl().
+    :param bolus_lookup_tbl_json_path: path to the lookup table for the bolus parameters, or its lookup table object
+    from load_lookup_tbl().
+    :param monitoring_scan_lookup_tbl_json_path: path to the lookup table for the premonitoring and monitoring scans, or
+    its lookup table object from load_lookup_tbl().
     :param target_prot_name_list: target protocol names.
     :param target_prot_xml_path_list: target protocol xml files to read in.
-    :param output_json_path: target json path to save to.
-    :returns: N/A
+    :param output_json_path: target json path to save to, or None to save nothing, the result being returned
+    either way. With the .arrow extension, the columnar Arrow format is saved instead (see store_prot_pair_dict_list.py).
+    :param bool_iterparse: whether to stream the protocol files one entry at a time with iterparse, instead of parsing
+    the whole tree in memory, e.g., for very large files. The result is the same.
+    :param prot_cache_folder: optional, folder of the persistent parsing cache (see cache_prot_dict_list.py). The
+    protocol files parsed before with the same lookup tables are not parsed again, the new ones are added to it.
+    :param target_prot_xml_hash_list: optional, content hashes of the protocol files from
+    cache_prot_dict_list.get_file_hash(), e.g., already computed by the caller, for the cache paths; the files are
+    hashed here if None
+    :returns: list of the protocols, each a list of dict, each dict being a scan or recon series, i.e., what
+    the json file holds
 
     """
     
     json_fname = output_json_path
-    print("loaded topo_lookup_tbl from ./para_lookup_tbl/topo_lookup_tbl.json")
-    with open(topo_lookup_tbl_json_path, 'r') as fp:
-        topo_lookup_tbl = json.load(fp)
-
-    print("loaded scan_lookup_tbl from ./para_lookup_tbl/scan_lookup_tbl.json")
-    with open(scan_lookup_tbl_json_path, 'r') as fp:
-        scan_lookup_tbl = json.load(fp)
-        
-    print("loaded scan_AB_lookup_tbl from ./para_lookup_tbl/scan_AB_lookup_tbl.json")
-    with open(scan_AB_lookup_tbl_json_path, 'r') as fp:
-        scan_AB_lookup_tbl = json.load(fp)
-
-    print("loaded recon_lookup_tbl from ./para_lookup_tbl/recon_lookup_tbl.json")
-    with open(recon_lookup_tbl_json_path, 'r') as fp:
-        recon_lookup_tbl = json.load(fp)
-
-    print("loaded monitoring_scan_lookup_tbl from ./para_lookup_tbl/monitoring_scan_lookup_tbl.json")
-    with open(monitoring_scan_lookup_tbl_json_path, 'r') as fp:
-        monitoring_scan_lookup_tbl = json.load(fp)
-        
-    print("loaded bolus_lookup_tbl from ./para_lookup_tbl/bolus_lookup_tbl.json")
-    with open(bolus_lookup_tbl_json_path, 'r') as fp:
-        bolus_lookup_tbl = json.load(fp)
+    # each lookup table is loaded once per process (see lookup_tbl_registry.py), and again only if its file changes
+    topo_lookup_tbl_obj = load_lookup_tbl(topo_lookup_tbl_json_path)
+    scan_lookup_tbl_obj = load_lookup_tbl(scan_lookup_tbl_json_path)
+    scan_AB_lookup_tbl_obj = load_lookup_tbl(scan_AB_lookup_tbl_json_path)
+    recon_lookup_tbl_obj = load_lookup_tbl(recon_lookup_tbl_json_path)
+    monitoring_scan_lookup_tbl_obj = load_lookup_tbl(monitoring_scan_lookup_tbl_json_path)
+    bolus_lookup_tbl_obj = load_lookup_tbl(bolus_lookup_tbl_json_path)
+
+    # the extraction plans are compiled once per loaded lookup table, so that each series' nodes are visited once for
+    # all of its parameters
+    topo_extraction_plan = get_extraction_plan_Siemens_Force(topo_lookup_tbl_obj)
+    scan_extraction_plan = get_extraction_plan_Siemens_Force(scan_lookup_tbl_obj)
+    scan_AB_extraction_plan = get_extraction_plan_Siemens_Force(scan_AB_lookup_tbl_obj)
+    recon_extraction_plan = get_extraction_plan_Siemens_Force(recon_lookup_tbl_obj)
+    monitoring_scan_extraction_plan = get_extraction_plan_Siemens_Force(monitoring_scan_lookup_tbl_obj)
+    bolus_extraction_plan = get_extraction_plan_Siemens_Force(bolus_lookup_tbl_obj)
+    # the tags needed by the lookup tables, the streamed entries keep only these and their ancestors
+    keep_tag_set = get_keep_tag_set_Siemens_Force([topo_extraction_plan,
+                                                   scan_extraction_plan,
+                                                   scan_AB_extraction_plan,
+                                                   recon_extraction_plan,
+                                                   monitoring_scan_extraction_plan,
+                                                   bolus_extraction_plan])
+
+    if prot_cache_folder is not None:
+        # any change to the lookup tables gives new cache entries
+        lookup_tbl_hash = get_lookup_tbl_hash([topo_lookup_tbl_obj,
+                                               scan_lookup_tbl_obj,
+                                               scan_AB_lookup_tbl_obj,
+                                               recon_lookup_tbl_obj,
+                                               bolus_lookup_tbl_obj,
+                                               monitoring_scan_lookup_tbl_obj],
+                                              "Siemens_Force_C")
 
     prot_pair_se_list = []
     prot_pair_dict_list = []
@@ -206,14 +228,32 @@ def convert_protocol_from_indiv_prot_xml_to_json_C(topo_lookup_tbl_json_path,
 
         indiv_prot_xml_path = target_prot_xml_path_list[i]
 
+        if prot_cache_folder is not None:
+            prot_cache_path = get_prot_cache_path(prot_cache_folder, lookup_tbl_hash, indiv_prot_xml_path,
+                                                  target_prot_xml_hash_list[i] if target_prot_xml_hash_list is not None else None)
+            prot_dict_list = load_prot_dict_list_from_cache(prot_cache_path)
+            if prot_dict_list is not None:
+                # same protocol file content, parsed before with the same lookup tables
+                prot_pair_dict_list.append(prot_dict_list)
+                continue
+
         print("\n================================================================================\n")
         print(indiv_prot_xml_path)
 
-        # get the ET xml tree from the chosen individual protocol file
-        prot_xml_tree = ET.parse(indiv_prot_xml_path)
-        root = prot_xml_tree.getroot()
-        xpath_string = ".//MlModeEntryType"
-        found_entry_xml_list = root.findall(xpath_string)
+        if bool_iterparse:
+            # stream the entries one at a time instead of keeping the whole tree in memory, the bolus nodes are kept aside
+            bolus_root = get_xml_module().Element("MlBolusTypeList")
+            found_entry_xml_list = iterparse_entry_xml_Siemens_Force(indiv_prot_xml_path,
+                                                                     entry_tag_list=("MlModeEntryType",),
+                                                                     bolus_root=bolus_root,
+                                                                     keep_tag_set=keep_tag_set)
+        else:
+            # get the ET xml tree from the chosen individual protocol file, with lxml if it is installed
+            prot_xml_tree = get_xml_module().parse(indiv_prot_xml_path)
+            root = prot_xml_tree.getroot()
+            # index the entries and recons once, instead of searching the whole tree for every series
+            prot_xml_index = build_entry_index_Siemens_Force(prot_xml_tree)
+            found_entry_xml_list = prot_xml_index["entry_list"]
 
         # NEXT: find the structure of protocol sheet
         # Qn how to use XPath to figure this out?
@@ -223,6 +263,10 @@ def convert_protocol_from_indiv_prot_xml_to_json_C(topo_lookup_tbl_json_path,
 
         for i, entry_xml in enumerate(found_entry_xml_list):
 
+            if bool_iterparse:
+                # each streamed entry is indexed on its own
+                prot_xml_index = build_entry_index_Siemens_Force(entry_xml)
+
             # print(i, entry_xml.findtext(".//MlModeScanType/RangeName"))
             dict1 = {}
             print("\n================================================================================\n")
@@ -231,35 +275,22 @@ def convert_protocol_from_indiv_prot_xml_to_json_C(topo_lookup_tbl_json_path,
 
             if (entry_xml.findtext(".//MlModeScanType/RangeName") == '"Topogram"') or (entry_xml.findtext(".//MlModeScanType/RangeName") == '"Topogram LAT"') or (entry_xml.findtext(".//MlModeScanType/RangeName") == '"Topogram AP"'):
 
-                # note: globals()[]() and locals()[]() are general ways to call a function from its string function name
-                # locals(): use it if the call is in the the namespace of a script, instead of in the body of a function
-                # globals(): use it if the function name is in the body of a function
-                for key in topo_lookup_tbl:
-                    target_func_name = topo_lookup_tbl[key][0]
-                    para_dict = topo_lookup_tbl[key][1]
-                    para = globals()[target_func_name](prot_xml_tree,
-                                                       entry_node_id_value=entry_node_id_value,
-                                                       bool_verbose=False,
-                                                       **para_dict)
-                    dict1[key] = para[1]
-
-                scan_se = pd.Series(dict1)
+                dict1.update(get_para_dict_from_indiv_prot_xml_Siemens_Force(prot_xml_index,
+                                                                             topo_extraction_plan,
+                                                                             entry_node_id_value=entry_node_id_value))
+
+                scan_se = SeriesRecord("topo", dict1, series_id=(entry_node_id_value,))
                 print(scan_se)
                 prot_se_list.append(scan_se)
                 prot_dict_list.append(dict1)
 
             elif ("monitoring" in entry_xml.findtext(".//MlModeScanType/RangeName").lower()) or ("premonitoring" in entry_xml.findtext(".//MlModeScanType/RangeName").lower()) or ("test bolus" in entry_xml.findtext(".//MlModeScanType/RangeName").lower()):
 
-                for key in monitoring_scan_lookup_tbl:
-                    target_func_name = monitoring_scan_lookup_tbl[key][0]
-                    para_dict = monitoring_scan_lookup_tbl[key][1]
-                    para = globals()[target_func_name](prot_xml_tree,
-                                                       entry_node_id_value=entry_node_id_value,
-                                                       bool_verbose=False,
-                                                       **para_dict)
-                    dict1[key] = para[1]
+                dict1.update(get_para_dict_from_indiv_prot_xml_Siemens_Force(prot_xml_index,
+                                                                             monitoring_scan_extraction_plan,
+                                                                             entry_node_id_value=entry_node_id_value))
 
-                scan_se = pd.Series(dict1)
+                scan_se = SeriesRecord("monitoring", dict1, series_id=(entry_node_id_value,))
                 print(scan_se)
                 prot_se_list.append(scan_se)
                 prot_dict_list.append(dict1)
@@ -268,14 +299,9 @@ def convert_protocol_from_indiv_prot_xml_to_json_C(topo_lookup_tbl_json_path,
                 
                 if entry_xml.attrib["ModeScans"] == '1':
 
-                    for key in scan_lookup_tbl:
-                        target_func_name = scan_lookup_tbl[key][0]
-                        para_dict = scan_lookup_tbl[key][1]
-                        para = globals()[target_func_name](prot_xml_tree,
-                                                           entry_node_id_value=entry_node_id_value,
-                                                           bool_verbose=False,
-                                                           **para_dict)
-                        dict1[key] = para[1]
+                    dict1.update(get_para_dict_from_indiv_prot_xml_Siemens_Force(prot_xml_index,
+                                                                                 scan_extraction_plan,
+                                                                                 entry_node_id_value=entry_node_id_value))
                         
                     # scan_se = pd.Series(dict1)
                     # print(scan_se)
@@ -284,16 +310,11 @@ def convert_protocol_from_indiv_prot_xml_to_json_C(topo_lookup_tbl_json_path,
                 
                 elif entry_xml.attrib["ModeScans"] == '2':
                     
-                    for key in scan_AB_lookup_tbl:
-                        target_func_name = scan_AB_lookup_tbl[key][0]
-                        para_dict = scan_AB_lookup_tbl[key][1]
-                        para = globals()[target_func_name](prot_xml_tree,
-                                                           entry_node_id_value=entry_node_id_value,
-                                                           bool_verbose=False,
-                                                           **para_dict)
-                        dict1[key] = para[1]
-
-                scan_se = pd.Series(dict1)
+                    dict1.update(get_para_dict_from_indiv_prot_xml_Siemens_Force(prot_xml_index,
+                                                                                 scan_AB_extraction_plan,
+                                                                                 entry_node_id_value=entry_node_id_value))
+
+                scan_se = SeriesRecord("scan", dict1, series_id=(entry_node_id_value,))
                 print(scan_se)
                 prot_se_list.append(scan_se)
                 prot_dict_list.append(dict1)
@@ -311,17 +332,12 @@ def convert_protocol_from_indiv_prot_xml_to_json_C(topo_lookup_tbl_json_path,
                     dict2["ReconJob"] = str(j)
                     print("\n================================================================================\n")
                     sub_node_id_value = str(j)
-                    for key in recon_lookup_tbl:
-                        target_func_name = recon_lookup_tbl[key][0]
-                        para_dict = recon_lookup_tbl[key][1]
-                        para = globals()[target_func_name](prot_xml_tree,
-                                                           entry_node_id_value=entry_node_id_value,
-                                                           sub_node_id_value=sub_node_id_value,
-                                                           bool_verbose=False,
-                                                           **para_dict)
-                        dict2[key] = para[1]
-
-                    recon_se = pd.Series(dict2)
+                    dict2.update(get_para_dict_from_indiv_prot_xml_Siemens_Force(prot_xml_index,
+                                                                                 recon_extraction_plan,
+                                                                                 entry_node_id_value=entry_node_id_value,
+                                                                                 sub_node_id_value=sub_node_id_value))
+
+                    recon_se = SeriesRecord("recon", dict2, series_id=(entry_node_id_value, sub_node_id_value))
                     print(recon_se)
                     prot_se_list.append(recon_se)
                     prot_dict_list.append(dict2)
@@ -329,8 +345,13 @@ def convert_protocol_from_indiv_prot_xml_to_json_C(topo_lookup_tbl_json_path,
         # prot_pair_se_list.append(prot_se_list)
         # prot_pair_dict_list.append(prot_dict_list)
 
-        xpath_string_bolus = ".//MlBolusType"
-        found_entry_xml_list_bolus = root.findall(xpath_string_bolus)
+        if bool_iterparse:
+            bolus_xml_index = build_entry_index_Siemens_Force(bolus_root)
+            found_entry_xml_list_bolus = list(bolus_root)
+        else:
+            bolus_xml_index = prot_xml_index
+            xpath_string_bolus = ".//MlBolusType"
+            found_entry_xml_list_bolus = root.findall(xpath_string_bolus)
         
         for i, entry_xml in enumerate(found_entry_xml_list_bolus):
 
@@ -338,17 +359,12 @@ def convert_protocol_from_indiv_prot_xml_to_json_C(topo_lookup_tbl_json_path,
             dict1 = {}
             print("\n================================================================================\n")
 
-            for key in bolus_lookup_tbl:
-                target_func_name = bolus_lookup_tbl[key][0]
-                para_dict = bolus_lookup_tbl[key][1]
-                para = globals()[target_func_name](prot_xml_tree,
-                                                   entry_node_id_attrib='',
-                                                   entry_node_id_value='',
-                                                   bool_verbose=False,
-                                                   **para_dict)
-                dict1[key] = para[1]
-
-            scan_se = pd.Series(dict1)
+            dict1.update(get_para_dict_from_indiv_prot_xml_Siemens_Force(bolus_xml_index,
+                                                                         bolus_extraction_plan,
+                                                                         entry_node_id_attrib='',
+                                                                         entry_node_id_value=''))
+
+            scan_se = SeriesRecord("bolus", dict1, series_id=(str(i+1),))
             print(scan_se)
             prot_se_list.append(scan_se)
             prot_dict_list.append(dict1)
@@ -356,10 +372,15 @@ def convert_protocol_from_indiv_prot_xml_to_json_C(topo_lookup_tbl_json_path,
         prot_pair_se_list.append(prot_se_list)
         prot_pair_dict_list.append(prot_dict_list)
 
+        if prot_cache_folder is not None:
+            store_prot_dict_list_to_cache(prot_cache_path, prot_dict_list)
+
     # write the json file
-    with open(json_fname, "w") as output:
+    if json_fname is not None:
         print("Saved prot_pair_dict_list to:", json_fname)
-        json.dump(prot_pair_dict_list, output, indent=4)
+        store_prot_pair_dict_list(prot_pair_dict_list, json_fname, target_prot_name_list)
+
+    return prot_pair_dict_list
 
 
 def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
@@ -371,7 +392,7 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
 
     :param target_prot_name_list: target protocol names. Note: if target_prot_name_list has only one protocol, the
     Excel file will only have 2 columns: one for the names of parameters and the other for the parameters.
-    :param prot_list_json_path: list of paths of json files to read from. These json files are the result of calling convert_protocol_from_indiv_prot_xml_to_json(), as intermediate results.
+    :param prot_list_json_path: list of paths of json files to read from (or .arrow files, see store_prot_pair_dict_list.py), or the parsing result itself, as returned by the json converter, so that no file is written and read back. These json files are the result of calling convert_protocol_from_indiv_prot_xml_to_json(), as intermediate results.
     :param output_xlsx_path: path of the output Excel file to save to.
     :param bool_verbose: whether printing status/progress information as the program run through its jobs.
     :param bool_debug:  wheter print out more detailed step-info for debugging
@@ -382,8 +403,7 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
     xlsx_path = output_xlsx_path
     prot_json_path = prot_list_json_path
     
-    with open(prot_json_path, "r") as input:
-        prot_pair_dict_list = json.load(input)
+    prot_pair_dict_list = load_prot_pair_dict_list(prot_json_path)
 
     # add logic to handle the case of one protocol in prot_pair_dict_list
     if len(prot_pair_dict_list) == 2:
@@ -411,6 +431,10 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
      main_scan_count_list,
      recon_per_scan_list) = parse_prot_pair_structure_C(prot_se_list1, prot_se_list2)
 
+    # the value cells of the two protocols, {(column letter, row number): (value, format)}, written once all the rows
+    # are laid out, so that each is highlighted if it differs from the other protocol in the same row
+    value_cell_dict = {}
+
     winner_main_scan_banner_row_list = []
     follower_main_scan_banner_row_list = []
 
@@ -443,35 +467,40 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
                                          'valign': 'vcenter',
                                          'fg_color': '#5e9cfb'})
 
-    topo_format = workbook.add_format({'border': 1,
-                                       'align': 'center',
-                                       'valign': 'vcenter',
-                                       'fg_color': '#f4f5f7',
-                                       })
-
-    scan_format = workbook.add_format({'border': 1,
-                                       'align': 'center',
-                                       'valign': 'vcenter',
-                                       'fg_color': '#fefae7',
-                                       })
+    topo_property_dict = {'border': 1,
+                          'align': 'center',
+                          'valign': 'vcenter',
+                          'fg_color': '#f4f5f7',
+                          }
+    topo_format = workbook.add_format(topo_property_dict)
 
-    recon_format = workbook.add_format({'border': 1,
-                                        'align': 'center',
-                                        'valign': 'vcenter',
-                                        'fg_color': '#e9fcff',
-                                        })
-
-    monitoring_format = workbook.add_format({'border': 1,
-                                             'align': 'center',
-                                             'valign': 'vcenter',
-                                             'fg_color': '#e6fcef',
-                                             })
+    scan_property_dict = {'border': 1,
+                          'align': 'center',
+                          'valign': 'vcenter',
+                          'fg_color': '#fefae7',
+                          }
+    scan_format = workbook.add_format(scan_property_dict)
+
+    recon_property_dict = {'border': 1,
+                           'align': 'center',
+                           'valign': 'vcenter',
+                           'fg_color': '#e9fcff',
+                           }
+    recon_format = workbook.add_format(recon_property_dict)
+
+    monitoring_property_dict = {'border': 1,
+                                'align': 'center',
+                                'valign': 'vcenter',
+                                'fg_color': '#e6fcef',
+                                }
+    monitoring_format = workbook.add_format(monitoring_property_dict)
     
-    bolus_format = workbook.add_format({'border': 1,
-                                             'align': 'center',
-                                             'valign': 'vcenter',
-                                             'fg_color': '#80d7c7',
-                                             })
+    bolus_property_dict = {'border': 1,
+                           'align': 'center',
+                           'valign': 'vcenter',
+                           'fg_color': '#80d7c7',
+                           }
+    bolus_format = workbook.add_format(bolus_property_dict)
 
     dose_format = workbook.add_format({'border': 1,
                                        'align': 'center',
@@ -509,8 +538,15 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
                                                   'valign': 'vcenter',
                                                   'fg_color': '#fdebe6'})
 
-    emphasis_format = workbook.add_format({'font_color': '#9c0006',
-                                           'bold': 1})
+    emphasis_property_dict = {'font_color': '#9c0006',
+                              'bold': 1}
+
+    # the format of each section, in the emphasis font, for the parameters which differ between the two protocols
+    changed_format_dict = {topo_format: workbook.add_format(dict(topo_property_dict, **emphasis_property_dict)),
+                           scan_format: workbook.add_format(dict(scan_property_dict, **emphasis_property_dict)),
+                           recon_format: workbook.add_format(dict(recon_property_dict, **emphasis_property_dict)),
+                           monitoring_format: workbook.add_format(dict(monitoring_property_dict, **emphasis_property_dict)),
+                           bolus_format: workbook.add_format(dict(bolus_property_dict, **emphasis_property_dict))}
 
     ws.write('A1', "Protocol Name", title_format)
 
@@ -572,7 +608,7 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
         se_processed_follower = se_processed_list[follower_index]
 
         for i, se in enumerate(prot_se_list):
-            if ('"Topogram"' in [se[para] for para in se.keys()]) or ('"Topogram LAT"' in [se[para] for para in se.keys()]) or ('"Topogram AP"' in [se[para] for para in se.keys()]) and i >= se_processed_winner:
+            if get_series_kind_Siemens(se) == "topo" and i >= se_processed_winner:
                 row_winner += 1
                 banner_str = "Localizer"
                 title_cell_format = topo_para_title_format
@@ -594,15 +630,9 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
 
                     row_winner += 1
                     ws.write('A'+str(row_winner), para, title_cell_format)
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                     # done with the winner prot
 
         # work with the follower prot in its column
@@ -610,7 +640,7 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
         target_col_letter = prot_col_letter_list[follower_index]
 
         for j, se in enumerate(prot_se_list):
-            if ('"Topogram"' in [se[para] for para in se.keys()]) or ('"Topogram LAT"' in [se[para] for para in se.keys()]) or ('"Topogram AP"' in [se[para] for para in se.keys()]) or ('"Topogram AP"' in " ".join([se[para] for para in se.keys()])) and j >= se_processed_follower:
+            if get_series_kind_Siemens(se) == "topo" and j >= se_processed_follower:
                 row_follower += 1
                 cell_format = topo_format
 
@@ -624,15 +654,9 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
 
                     row_follower += 1
 
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
+                    para_value = se[para]
 
-                    ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                    value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                     # done with the follower prot
 
     elif max(topo_count_list) < 1:
@@ -673,7 +697,7 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
         se_processed_follower = se_processed_list[follower_index]
 
         for i, se in enumerate(prot_se_list):
-            if '"PreMonitoring"' in " ".join([se[para] for para in se.keys()]) and i >= se_processed_winner:
+            if get_series_kind_Siemens(se) == "premonitoring" and i >= se_processed_winner:
                 row_winner += 1
                 banner_str = "PreMonitoring Scan"
                 title_cell_format = monitoring_para_title_format
@@ -695,15 +719,9 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
 
                     row_winner += 1
                     ws.write('A'+str(row_winner), para, title_cell_format)
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                     # done with the winner prot
 
         # work with the follower prot in its column
@@ -711,7 +729,7 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
         target_col_letter = prot_col_letter_list[follower_index]
 
         for j, se in enumerate(prot_se_list):
-            if '"PreMonitoring"' in " ".join([se[para] for para in se.keys()]) and j >= se_processed_follower:
+            if get_series_kind_Siemens(se) == "premonitoring" and j >= se_processed_follower:
                 row_follower += 1
                 cell_format = monitoring_format
 
@@ -723,15 +741,9 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
                     if para in exclusion_para_set:
                         continue
                     row_follower += 1
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                     # done with the winner prot
 
     elif max(premonitoring_count_list) < 1:
@@ -772,7 +784,7 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
         se_processed_follower = se_processed_list[follower_index]
 
         for i, se in enumerate(prot_se_list):
-            if 'Bolus Trigger Level' in se.keys() and i >= se_processed_winner:
+            if get_series_kind_Siemens(se) == "bolus" and i >= se_processed_winner:
                 row_winner += 1
                 banner_str = "Contrast"
                 title_cell_format = bolus_para_title_format
@@ -794,15 +806,9 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
 
                     row_winner += 1
                     ws.write('A'+str(row_winner), para, title_cell_format)
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                     # done with the winner prot
 
         # work with the follower prot in its column
@@ -810,7 +816,7 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
         target_col_letter = prot_col_letter_list[follower_index]
 
         for j, se in enumerate(prot_se_list):
-            if 'Bolus Trigger Level' in se.keys() and j >= se_processed_follower:
+            if get_series_kind_Siemens(se) == "bolus" and j >= se_processed_follower:
                 row_follower += 1
                 cell_format = bolus_format
 
@@ -823,15 +829,9 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
                         continue
 
                     row_follower += 1
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                     # done with the winner prot
 
     elif max(bolus_count_list) < 1:
@@ -871,8 +871,10 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
         se_processed_winner = se_processed_list[winner_index]
         se_processed_follower = se_processed_list[follower_index]
 
+        # no check against se_processed_winner: the bolus series, written before, come after the monitoring scans in the
+        # protocol
         for i, se in enumerate(prot_se_list):
-            if ('"Monitoring"' in " ".join([se[para] for para in se.keys()])) or ('"Test Bolus"' in " ".join([se[para] for para in se.keys()])) and i >= se_processed_winner:
+            if get_series_kind_Siemens(se) == "monitoring":
                 row_winner += 1
                 banner_str = "Monitoring Scan"
                 title_cell_format = monitoring_para_title_format
@@ -894,15 +896,9 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
 
                     row_winner += 1
                     ws.write('A'+str(row_winner), para, title_cell_format)
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                     # done with the winner prot
 
         # work with the follower prot in its column
@@ -910,7 +906,7 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
         target_col_letter = prot_col_letter_list[follower_index]
 
         for j, se in enumerate(prot_se_list):
-            if ('"Monitoring"' in " ".join([se[para] for para in se.keys()])) or ('"Test Bolus"' in " ".join([se[para] for para in se.keys()])) and j >= se_processed_follower:
+            if get_series_kind_Siemens(se) == "monitoring":
                 row_follower += 1
                 cell_format = monitoring_format
 
@@ -923,15 +919,9 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
                         continue
 
                     row_follower += 1
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                     # done with the winner prot
 
     elif max(monitoring_count_list) < 1:
@@ -1036,7 +1026,8 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
             se = prot_se_list[i]
 
             if i >= se_processed_winner:
-                if 'ReconJob' in se.keys():
+                series_kind = get_series_kind_Siemens(se)
+                if series_kind == "recon":
                     row_winner += 1
                     if bool_debug:
                         print("row_winner", row_winner)
@@ -1063,18 +1054,12 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
                             print("row_winner", row_winner)
 
                         ws.write('A'+str(row_winner), para, title_cell_format)
-                        para_value_quote_removed = se[para].replace('"', '')
-                        if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                            para_value = int(para_value_quote_removed)
-                        elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                            para_value = float(para_value_quote_removed)
-                        else:
-                            para_value = para_value_quote_removed
-
-                        ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                        para_value = se[para]
+
+                        value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                         # done with the winner prot
 
-                elif ('Topogram' in " ".join([se[para] for para in se.keys()])) or ('PreMonitoring' in " ".join([se[para] for para in se.keys()])) or ('Bolus Trigger Level' in se.keys()) or ('Monitoring' in " ".join([se[para] for para in se.keys()])) or ('Test Bolus' in " ".join([se[para] for para in se.keys()])):
+                elif series_kind != "scan":
                     continue
                 else: # this is a main scan
                     row_winner += 1
@@ -1105,15 +1090,9 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
                             print("row_winner", row_winner)
 
                         ws.write('A'+str(row_winner), para, title_cell_format)
-                        para_value_quote_removed = se[para].replace('"', '')
-                        if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                            para_value = int(para_value_quote_removed)
-                        elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                            para_value = float(para_value_quote_removed)
-                        else:
-                            para_value = para_value_quote_removed
-
-                        ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                        para_value = se[para]
+
+                        value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                         # done with the winner prot
 
                     processed_winner_main_scan_count += 1
@@ -1133,7 +1112,8 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
             se = prot_se_list[j]
 
             if j >= se_processed_follower:
-                if 'ReconJob' in se.keys():
+                series_kind = get_series_kind_Siemens(se)
+                if series_kind == "recon":
                     row_follower += 1
                     if bool_debug:
                         print("row_follower", row_follower)
@@ -1151,18 +1131,12 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
                         if bool_debug:
                             print("row_follower", row_follower)
 
-                        para_value_quote_removed = se[para].replace('"', '')
-                        if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                            para_value = int(para_value_quote_removed)
-                        elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                            para_value = float(para_value_quote_removed)
-                        else:
-                            para_value = para_value_quote_removed
+                        para_value = se[para]
 
-                        ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                        value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                         # done with the winner prot
 
-                elif ('Topogram' in " ".join([se[para] for para in se.keys()])) or ('PreMonitoring' in " ".join([se[para] for para in se.keys()])) or ('Bolus Trigger Level' in se.keys()) or ('Monitoring' in " ".join([se[para] for para in se.keys()])) or ('Test Bolus' in " ".join([se[para] for para in se.keys()])):
+                elif series_kind != "scan":
                     continue
                 else: # this is a main scan
                     row_follower += 1
@@ -1184,15 +1158,9 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
                         if bool_debug:
                             print("row_follower", row_follower)
 
-                        para_value_quote_removed = se[para].replace('"', '')
-                        if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                            para_value = int(para_value_quote_removed)
-                        elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                            para_value = float(para_value_quote_removed)
-                        else:
-                            para_value = para_value_quote_removed
+                        para_value = se[para]
 
-                        ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                        value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                         # done with the follower prot
 
                     processed_follower_main_scan_count += 1
@@ -1251,17 +1219,10 @@ def convert_protocol_from_json_to_xlsx_C(target_prot_name_list,
     if num_prot == 2:
         ws.set_column('C:C', 60)
 
-        ws.conditional_format("C2:C1000",
-                              {'type':'formula',
-                               'criteria': '=$C2<>$B2',
-                               'format': emphasis_format
-                               })
-
-        ws.conditional_format("B2:B1000",
-                              {'type':'formula',
-                               'criteria': '=$B2<>$C2',
-                               'format': emphasis_format
-                               })
+    # the values which differ between the two protocols, in the emphasis font
+    changed_row_cell_set = get_changed_row_cell_set({cell: para_value for (cell, (para_value, cell_format)) in value_cell_dict.items()}) if num_prot == 2 else set()
+    for (col_letter, row), (para_value, cell_format) in value_cell_dict.items():
+        ws.write(col_letter+str(row), para_value, changed_format_dict[cell_format] if (col_letter, row) in changed_row_cell_set else cell_format)
 
     workbook.close()
     print("Saved protocol information to:", xlsx_path)
\ No newline at end of file
@@ -6,38 +6,34 @@ Created on Thu Jan  5 12:23:18 2023
 """
 
 import xml.etree.ElementTree as ET
-import pandas as pd
 import xlsxwriter
 import re
-import glob
-from get_para_from_indiv_prot_xml import get_para_from_indiv_prot_xml_GE_Optima
-import json
-
-def isfloat(x):
-    try:
-        a = float(x)
-    except (TypeError, ValueError):
-        return False
-    else:
-        return True
- 
-def isint(x):
-    try:
-        a = float(x)
-        b = int(a)
-    except (TypeError, ValueError):
-        return False
-    else:
-        return a == b
+from get_para_from_indiv_prot_xml import iter_series_node_GE
+from cache_prot_dict_list import get_lookup_tbl_hash
+from cache_prot_dict_list import get_prot_cache_path
+from cache_prot_dict_list import load_prot_dict_list_from_cache
+from cache_prot_dict_list import store_prot_dict_list_to_cache
+from store_prot_pair_dict_list import store_prot_pair_dict_list
+from store_prot_pair_dict_list import load_prot_pair_dict_list
+from series_record import SeriesRecord
+from normalize_para_value import normalize_para_value
+from lookup_tbl_registry import load_lookup_tbl
+from index_prot_snapshot import build_prot_snapshot_index
+from index_prot_snapshot import get_file_name_index
+from diff_prot_pair import get_series_kind_GE
+from diff_prot_pair import get_changed_row_cell_set
 
 def read_GE_file(target_file):
-    with open(target_file) as f:
-        lines = f.readlines()
+    """Read a GE .proto protocol file (or a multi-protocol export) one Series block at a time, from a buffered stream,
+    into Series -> Group -> Recon nodes (see iter_series_node_GE()).
+
+    :param target_file: path to the protocol file
+    :returns: generator of the Series nodes of the protocol
 
-    lines = [i.strip() for i in lines]
-   
-    res = [i for i, s in enumerate(lines) if 'Series {' in s]
-    return lines, res
+    """
+
+    with open(target_file, buffering=1024 * 1024) as f:
+        yield from iter_series_node_GE(f)
 
 ####################################################################
 ####################################################################
@@ -77,13 +73,14 @@ def parse_prot_pair_structure(prot_se_list1, prot_se_list2):
 
     for i, se in enumerate(prot_se_list1):
 
-        if 'Scout' in " ".join([se[para] for para in se.keys()]):
+        series_kind = get_series_kind_GE(se)
+        if series_kind == "topo":
             topo_count_list[0] = topo_count_list[0] + 1
-        elif 'PreMonitoring' in " ".join([se[para] for para in se.keys()]):
+        elif series_kind == "premonitoring":
             premonitoring_count_list[0] = premonitoring_count_list[0] + 1      
-        elif 'Monitoring' in " ".join([se[para] for para in se.keys()]):
+        elif series_kind == "monitoring":
             monitoring_count_list[0] = monitoring_count_list[0] + 1
-        elif 'Iter.Recon Type' in se.keys():
+        elif series_kind == "recon":
             recon_count += 1
         else:
             main_scan_count_list[0] = main_scan_count_list[0] + 1
@@ -103,13 +100,14 @@ def parse_prot_pair_structure(prot_se_list1, prot_se_list2):
 
     for i, se in enumerate(prot_se_list2):
 
-        if 'Scout' in " ".join([se[para] for para in se.keys()]):
+        series_kind = get_series_kind_GE(se)
+        if series_kind == "topo":
             topo_count_list[1] = topo_count_list[1] + 1
-        elif 'PreMonitoring' in " ".join([se[para] for para in se.keys()]):
+        elif series_kind == "premonitoring":
             premonitoring_count_list[1] = premonitoring_count_list[1] + 1
-        elif 'Monitoring' in " ".join([se[para] for para in se.keys()]):
+        elif series_kind == "monitoring":
             monitoring_count_list[1] = monitoring_count_list[1] + 1
-        elif 'Iter.Recon Type' in se.keys():
+        elif series_kind == "recon":
             recon_count += 1
         else:
             main_scan_count_list[1] = main_scan_count_list[1] + 1
@@ -154,138 +152,130 @@ def convert_protocol_from_indiv_prot_xml_to_json(topo_lookup_tbl_json_path,
                                                  monitoring_scan_lookup_tbl_json_path,
                                                  target_prot_name_list,
                                                  target_prot_xml_path_list,
-                                                 output_json_path):
+                                                 output_json_path,
+                                                 prot_cache_folder=None):
 
     """ Parse convert protocol xml to json, for Siemens Force CT.
     How the localizier, premonitoring, monitoring, main scan, and recon series are based on the lookup tables as indicated by the function's parameters.
     For regular scans (non-DE, non-perfusion, non-cardiac), the look up table "scan_lookup_tbl.json" will work.
     The order of dictionary items appearing in the look up tables file also decide the order of parameters to be shown in each section of the intermediate json file and finally the Excel file.
 
-    :param topo_lookup_tbl_json_path: path to the lookup table for the localizers.
-    :param scan_lookup_tbl_json_path: path to the lookup table for the main scan.
-    :param recon_lookup_tbl_json_path: path to the lookup table for the recons.
+    :param topo_lookup_tbl_json_path: path to the lookup table for the localizers, or its lookup table object from
+    load_lookup_tbl().
+    :param scan_lookup_tbl_json_path: path to the lookup table for the main scan, or its lookup table object from
+    load_lookup_tbl().
+    :param recon_lookup_tbl_json_path: path to the lookup table for the recons, or its lookup table object from
+    load_lookup_tbl().
     :param monitoring_scan_lookup_tbl_json_path: path to the lookup table for the premonitoring and monitoring scans.
     :param target_prot_name_list: target protocol names.
     :param target_prot_xml_path_list: target protocol xml files to read in.
-    :param output_json_path: target json path to save to.
-    :returns: N/A
+    :param output_json_path: target json path to save to, or None to save nothing, the result being returned
+    either way. With the .arrow extension, the columnar Arrow format is saved instead (see store_prot_pair_dict_list.py).
+    :param prot_cache_folder: optional, folder of the persistent parsing cache (see cache_prot_dict_list.py). The
+    protocol files parsed before with the same lookup tables are not parsed again, the new ones are added to it.
+    :returns: list of the protocols, each a list of dict, each dict being a scan or recon series, i.e., what
+    the json file holds
 
     """
     
     json_fname = output_json_path
-    print("loaded topo_lookup_tbl from ./para_lookup_tbl/topo_lookup_tbl.json")
-    with open(topo_lookup_tbl_json_path, 'r') as fp:
-        topo_lookup_tbl = json.load(fp)
-
-    print("loaded scan_lookup_tbl from ./para_lookup_tbl/scan_lookup_tbl.json")
-    with open(scan_lookup_tbl_json_path, 'r') as fp:
-        scan_lookup_tbl = json.load(fp)
-
-    print("loaded recon_lookup_tbl from ./para_lookup_tbl/recon_lookup_tbl.json")
-    with open(recon_lookup_tbl_json_path, 'r') as fp:
-        recon_lookup_tbl = json.load(fp)
+    # each lookup table is loaded once per process (see lookup_tbl_registry.py), and again only if its file changes
+    topo_lookup_tbl_obj = load_lookup_tbl(topo_lookup_tbl_json_path)
+    scan_lookup_tbl_obj = load_lookup_tbl(scan_lookup_tbl_json_path)
+    recon_lookup_tbl_obj = load_lookup_tbl(recon_lookup_tbl_json_path)
+    # the rows of the lookup tables, bound to their extractors when the tables were loaded
+    topo_extractor_list = topo_lookup_tbl_obj["extractor_list"]
+    scan_extractor_list = scan_lookup_tbl_obj["extractor_list"]
+    recon_extractor_list = recon_lookup_tbl_obj["extractor_list"]
+    # the values are normalized into their declared types once, here (see normalize_para_value.py)
+    topo_para_type_dict = topo_lookup_tbl_obj["para_type_dict"]
+    scan_para_type_dict = scan_lookup_tbl_obj["para_type_dict"]
+    recon_para_type_dict = recon_lookup_tbl_obj["para_type_dict"]
     
+    if prot_cache_folder is not None:
+        # any change to the lookup tables gives new cache entries
+        lookup_tbl_hash = get_lookup_tbl_hash([topo_lookup_tbl_obj,
+                                               scan_lookup_tbl_obj,
+                                               recon_lookup_tbl_obj],
+                                              "GE_Optima")
+
     prot_pair_se_list=[]
     prot_pair_dict_list=[]
     
     # write the json file
     
     for k, target_prot_name in enumerate(target_prot_name_list):
-        lines, res = read_GE_file(target_prot_xml_path_list[k])
-        
-        j = 0
-        sub_protocol = []
-        sub_group = []
+        if prot_cache_folder is not None:
+            prot_cache_path = get_prot_cache_path(prot_cache_folder, lookup_tbl_hash, target_prot_xml_path_list[k])
+            prot_dict_list = load_prot_dict_list_from_cache(prot_cache_path)
+            if prot_dict_list is not None:
+                # same protocol file content, parsed before with the same lookup tables
+                prot_pair_dict_list.append(prot_dict_list)
+                continue
+
         prot_se_list=[]
         prot_dict_list=[]
     
-        for i in range(0,len(res)):
+        for s, series_node in enumerate(read_GE_file(target_prot_xml_path_list[k])):
             dict1 = {}
-            if i == len(res)-1:
-                sub_protocol.append(lines[res[i]:])
-            else:
-                sub_protocol.append(lines[res[i]:res[i+1]])
-                
-            groups = [j for j, s in enumerate(sub_protocol[i]) if 'Group {' in s]
          
-            for m in range(0,len(groups)):
-                
-                if len(groups) == 0:
-                    continue
-                elif m == len(groups)-1:
-                    sub_group.append(sub_protocol[i][groups[m]:])
-                else:
-                    sub_group.append(sub_protocol[i][groups[m]:groups[m+1]])
+            for g, group_node in enumerate(series_node["block_list"]):
             
-                if ('groupType = Scout' in sub_group[j]) == True:              
-                    for key in topo_lookup_tbl:
-                        target_func_name = topo_lookup_tbl[key][0]
-                        para_dict = topo_lookup_tbl[key][1]
-                        para = globals()[target_func_name](sub_protocol=sub_protocol[i],
-                                                           sub_group=sub_group[j],
-                                                           bool_verbose=False,
-                                                           **para_dict)
-                        dict1[key] = para[1]
+                if group_node["para_dict"].get("groupType") == "Scout":
+                    for key, extractor in topo_extractor_list:
+                        para = extractor(sub_protocol=series_node,
+                                         sub_group=group_node)
+                        dict1[key] = normalize_para_value(para[1], topo_para_type_dict[key])
                     
-                    scan_se = pd.Series(dict1)
-                    prot_se_list.append(scan_se.copy())
+                    scan_se = SeriesRecord("topo", dict1, series_id=(str(s+1), str(g+1)))
+                    prot_se_list.append(scan_se)
                     prot_dict_list.append(dict1.copy())
                     
-                    j=j+1
-                    
                 else:
-                    for key in scan_lookup_tbl:
-                        target_func_name = scan_lookup_tbl[key][0]
-                        para_dict = scan_lookup_tbl[key][1]
-                        para = globals()[target_func_name](sub_protocol=sub_protocol[i],
-                                                           sub_group=sub_group[j],
-                                                           bool_verbose=False,
-                                                           **para_dict)
-                        dict1[key] = para[1]
+                    for key, extractor in scan_extractor_list:
+                        para = extractor(sub_protocol=series_node,
+                                         sub_group=group_node)
+                        dict1[key] = normalize_para_value(para[1], scan_para_type_dict[key])
                     
-                    scan_se = pd.Series(dict1)
+                    scan_se = SeriesRecord("scan", dict1, series_id=(str(s+1), str(g+1)))
                     prot_se_list.append(scan_se)
                     prot_dict_list.append(dict1)
                     ############################################################
     
-                    recon_inds = [k for k, s in enumerate(sub_group[j]) if 'Recon {' in s]
-                    sub_recon = []
+                    recon_node_list = group_node["block_list"]
                     
-                    for k in range(0,len(recon_inds)):
+                    for k in range(0,len(recon_node_list)):
                         dict2 = {}
         
-                        if k == len(recon_inds)-1 or len(recon_inds) == 1:
-                            sub_recon.append(sub_group[j][recon_inds[k]:])
-                        else:
-                            sub_recon.append(sub_group[j][recon_inds[k]:recon_inds[k+1]])
-                        
-                            for key in recon_lookup_tbl:
-                                target_func_name = recon_lookup_tbl[key][0]
-                                para_dict = recon_lookup_tbl[key][1]
-                                para = globals()[target_func_name](sub_protocol=sub_protocol[i],
-                                                                   sub_group=sub_group[j],
-                                                                   sub_recon=sub_recon[k],
-                                                                   bool_verbose=False,
-                                                                   **para_dict)
-                                dict2[key] = para[1]
+                        # the last recon of the group is not extracted
+                        if k < len(recon_node_list)-1:
+                            for key, extractor in recon_extractor_list:
+                                para = extractor(sub_protocol=series_node,
+                                                 sub_group=group_node,
+                                                 sub_recon=recon_node_list[k])
+                                dict2[key] = normalize_para_value(para[1], recon_para_type_dict[key])
                                 
                         if 'Series Description' not in dict2:
                             continue
-                        elif dict2['Series Description'] == '""':
+                        elif dict2['Series Description'] == '':
                             continue
                         else:
-                            recon_se = pd.Series(dict2)
+                            recon_se = SeriesRecord("recon", dict2, series_id=(str(s+1), str(g+1), str(k+1)))
                             print(recon_se)
                             prot_se_list.append(recon_se)
                             prot_dict_list.append(dict2)
-                            
-                    j=j+1
         
         prot_pair_se_list.append(prot_se_list)
         prot_pair_dict_list.append(prot_dict_list)
-    with open(json_fname, "w") as output:
+
+        if prot_cache_folder is not None:
+            store_prot_dict_list_to_cache(prot_cache_path, prot_dict_list)
+
+    if json_fname is not None:
         print("Saved prot_pair_dict_list to:", json_fname)
-        json.dump(prot_pair_dict_list, output, indent=4)
+        store_prot_pair_dict_list(prot_pair_dict_list, json_fname, target_prot_name_list)
+
+    return prot_pair_dict_list
 
 ####################################################################
 ####################################################################
@@ -301,7 +291,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
 
     :param target_prot_name_list: target protocol names. Note: if target_prot_name_list has only one protocol, the
     Excel file will only have 2 columns: one for the names of parameters and the other for the parameters.
-    :param prot_list_json_path: list of paths of json files to read from. These json files are the result of calling convert_protocol_from_indiv_prot_xml_to_json(), as intermediate results.
+    :param prot_list_json_path: list of paths of json files to read from (or .arrow files, see store_prot_pair_dict_list.py), or the parsing result itself, as returned by the json converter, so that no file is written and read back. These json files are the result of calling convert_protocol_from_indiv_prot_xml_to_json(), as intermediate results.
     :param output_xlsx_path: path of the output Excel file to save to.
     :param bool_verbose: whether printing status/progress information as the program run through its jobs.
     :param bool_debug:  wheter print out more detailed step-info for debugging
@@ -315,8 +305,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
     
     xlsx_path = output_xlsx_path
     prot_json_path = prot_list_json_path
-    with open(prot_json_path, "r") as input:
-        prot_pair_dict_list = json.load(input)
+    prot_pair_dict_list = load_prot_pair_dict_list(prot_json_path)
 
     # add logic to handle the case of one protocol in prot_pair_dict_list
     if len(prot_pair_dict_list) == 2:
@@ -343,6 +332,10 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
      main_scan_count_list,
      recon_per_scan_list) = parse_prot_pair_structure(prot_se_list1, prot_se_list2)
 
+    # the value cells of the two protocols, {(column letter, row number): (value, format)}, written once all the rows
+    # are laid out, so that each is highlighted if it differs from the other protocol in the same row
+    value_cell_dict = {}
+
     winner_main_scan_banner_row_list = []
     follower_main_scan_banner_row_list = []
 
@@ -375,29 +368,33 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                                          'valign': 'vcenter',
                                          'fg_color': '#5e9cfb'})
 
-    topo_format = workbook.add_format({'border': 1,
-                                       'align': 'center',
-                                       'valign': 'vcenter',
-                                       'fg_color': '#f4f5f7',
-                                       })
-
-    scan_format = workbook.add_format({'border': 1,
-                                       'align': 'center',
-                                       'valign': 'vcenter',
-                                       'fg_color': '#fefae7',
-                                       })
-
-    recon_format = workbook.add_format({'border': 1,
-                                        'align': 'center',
-                                        'valign': 'vcenter',
-                                        'fg_color': '#e9fcff',
-                                        })
+    topo_property_dict = {'border': 1,
+                          'align': 'center',
+                          'valign': 'vcenter',
+                          'fg_color': '#f4f5f7',
+                          }
+    topo_format = workbook.add_format(topo_property_dict)
 
-    monitoring_format = workbook.add_format({'border': 1,
-                                             'align': 'center',
-                                             'valign': 'vcenter',
-                                             'fg_color': '#e6fcef',
-                                             })
+    scan_property_dict = {'border': 1,
+                          'align': 'center',
+                          'valign': 'vcenter',
+                          'fg_color': '#fefae7',
+                          }
+    scan_format = workbook.add_format(scan_property_dict)
+
+    recon_property_dict = {'border': 1,
+                           'align': 'center',
+                           'valign': 'vcenter',
+                           'fg_color': '#e9fcff',
+                           }
+    recon_format = workbook.add_format(recon_property_dict)
+
+    monitoring_property_dict = {'border': 1,
+                                'align': 'center',
+                                'valign': 'vcenter',
+                                'fg_color': '#e6fcef',
+                                }
+    monitoring_format = workbook.add_format(monitoring_property_dict)
 
     dose_format = workbook.add_format({'border': 1,
                                        'align': 'center',
@@ -430,8 +427,14 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                                                   'valign': 'vcenter',
                                                   'fg_color': '#fdebe6'})
 
-    emphasis_format = workbook.add_format({'font_color': '#9c0006',
-                                           'bold': 1})
+    emphasis_property_dict = {'font_color': '#9c0006',
+                              'bold': 1}
+
+    # the format of each section, in the emphasis font, for the parameters which differ between the two protocols
+    changed_format_dict = {topo_format: workbook.add_format(dict(topo_property_dict, **emphasis_property_dict)),
+                           scan_format: workbook.add_format(dict(scan_property_dict, **emphasis_property_dict)),
+                           recon_format: workbook.add_format(dict(recon_property_dict, **emphasis_property_dict)),
+                           monitoring_format: workbook.add_format(dict(monitoring_property_dict, **emphasis_property_dict))}
 
     ws.write('A1', "Protocol Name", title_format)
 
@@ -489,7 +492,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
         se_processed_follower = se_processed_list[follower_index]
 
         for i, se in enumerate(prot_se_list):
-            if 'Scout' in " ".join([se[para] for para in se.keys()]) and i >= se_processed_winner:
+            if get_series_kind_GE(se) == "topo" and i >= se_processed_winner:
                 row_winner += 1
                 banner_str = "Localizer"
                 title_cell_format = topo_para_title_format
@@ -511,15 +514,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
 
                     row_winner += 1
                     ws.write('A'+str(row_winner), para, title_cell_format)
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                     # done with the winner prot
 
         # work with the follower prot in its column
@@ -527,7 +524,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
         target_col_letter = prot_col_letter_list[follower_index]
 
         for j, se in enumerate(prot_se_list):
-            if 'Scout' in " ".join([se[para] for para in se.keys()]) and j >= se_processed_follower:
+            if get_series_kind_GE(se) == "topo" and j >= se_processed_follower:
                 row_follower += 1
                 cell_format = topo_format
 
@@ -541,15 +538,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
 
                     row_follower += 1
 
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
+                    para_value = se[para]
 
-                    ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                    value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                     # done with the follower prot
 
     elif max(topo_count_list) < 1:
@@ -590,7 +581,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
         se_processed_follower = se_processed_list[follower_index]
 
         for i, se in enumerate(prot_se_list):
-            if '"PreMonitoring"' in " ".join([se[para] for para in se.keys()]) and i >= se_processed_winner:
+            if get_series_kind_GE(se) == "premonitoring" and i >= se_processed_winner:
                 row_winner += 1
                 banner_str = "PreMonitoring Scan"
                 title_cell_format = monitoring_para_title_format
@@ -612,15 +603,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
 
                     row_winner += 1
                     ws.write('A'+str(row_winner), para, title_cell_format)
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                     # done with the winner prot
 
         # work with the follower prot in its column
@@ -628,7 +613,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
         target_col_letter = prot_col_letter_list[follower_index]
 
         for j, se in enumerate(prot_se_list):
-            if '"PreMonitoring"' in " ".join([se[para] for para in se.keys()]) and j >= se_processed_follower:
+            if get_series_kind_GE(se) == "premonitoring" and j >= se_processed_follower:
                 row_follower += 1
                 cell_format = monitoring_format
 
@@ -640,15 +625,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                     if para in exclusion_para_set:
                         continue
                     row_follower += 1
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                     # done with the winner prot
 
     elif max(premonitoring_count_list) < 1:
@@ -689,7 +668,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
         se_processed_follower = se_processed_list[follower_index]
 
         for i, se in enumerate(prot_se_list):
-            if 'Monitoring' in " ".join([se[para] for para in se.keys()]) and i >= se_processed_winner:
+            if get_series_kind_GE(se) == "monitoring" and i >= se_processed_winner:
                 row_winner += 1
                 banner_str = "Monitoring Scan"
                 title_cell_format = monitoring_para_title_format
@@ -711,15 +690,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
 
                     row_winner += 1
                     ws.write('A'+str(row_winner), para, title_cell_format)
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                     # done with the winner prot
 
         # work with the follower prot in its column
@@ -727,7 +700,7 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
         target_col_letter = prot_col_letter_list[follower_index]
 
         for j, se in enumerate(prot_se_list):
-            if '"Monitoring"' in " ".join([se[para] for para in se.keys()]) and j >= se_processed_follower:
+            if get_series_kind_GE(se) == "monitoring" and j >= se_processed_follower:
                 row_follower += 1
                 cell_format = monitoring_format
 
@@ -740,15 +713,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                         continue
 
                     row_follower += 1
-                    para_value_quote_removed = se[para].replace('"', '')
-                    if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                        para_value = int(para_value_quote_removed)
-                    elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                        para_value = float(para_value_quote_removed)
-                    else:
-                        para_value = para_value_quote_removed
-
-                    ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                    para_value = se[para]
+
+                    value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                     # done with the winner prot
 
     elif max(monitoring_count_list) < 1:
@@ -825,7 +792,8 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
             se = prot_se_list[i]
 
             if i >= se_processed_winner:
-                if 'Iter.Recon Type' in se.keys():
+                series_kind = get_series_kind_GE(se)
+                if series_kind == "recon":
                     row_winner += 1
                     if bool_debug:
                         print("row_winner", row_winner)
@@ -854,18 +822,12 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                             print("row_winner", row_winner)
 
                         ws.write('A'+str(row_winner), para, title_cell_format)
-                        para_value_quote_removed = se[para].replace('"', '')
-                        if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                            para_value = int(para_value_quote_removed)
-                        elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                            para_value = float(para_value_quote_removed)
-                        else:
-                            para_value = para_value_quote_removed
+                        para_value = se[para]
 
-                        ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                        value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                         # done with the winner prot
 
-                elif ('Scout' in " ".join([se[para] for para in se.keys()])) or ('PreMonitoring' in " ".join([se[para] for para in se.keys()])) or ('Bolus Trigger Level' in se.keys()) or ('Monitoring' in " ".join([se[para] for para in se.keys()])):
+                elif series_kind != "scan":
                     continue
                 else: # this is a main scan
                     row_winner += 1
@@ -896,15 +858,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                             print("row_winner", row_winner)
 
                         ws.write('A'+str(row_winner), para, title_cell_format)
-                        para_value_quote_removed = se[para].replace('"', '')
-                        if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                            para_value = int(para_value_quote_removed)
-                        elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                            para_value = float(para_value_quote_removed)
-                        else:
-                            para_value = para_value_quote_removed
+                        para_value = se[para]
 
-                        ws.write(target_col_letter+str(row_winner), para_value, cell_format)
+                        value_cell_dict[(target_col_letter, row_winner)] = (para_value, cell_format)
                         # done with the winner prot
 
                     processed_winner_main_scan_count += 1
@@ -924,7 +880,8 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
             se = prot_se_list[j]
 
             if j >= se_processed_follower:
-                if 'Iter.Recon Type' in se.keys():
+                series_kind = get_series_kind_GE(se)
+                if series_kind == "recon":
                     row_follower += 1
                     if bool_debug:
                         print("row_follower", row_follower)
@@ -940,18 +897,12 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                         if bool_debug:
                             print("row_follower", row_follower)
 
-                        para_value_quote_removed = se[para].replace('"', '')
-                        if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                            para_value = int(para_value_quote_removed)
-                        elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                            para_value = float(para_value_quote_removed)
-                        else:
-                            para_value = para_value_quote_removed
+                        para_value = se[para]
 
-                        ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                        value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                         # done with the winner prot
 
-                elif ('Scout' in " ".join([se[para] for para in se.keys()])) or ('PreMonitoring' in " ".join([se[para] for para in se.keys()])) or ('Bolus Trigger Level' in se.keys()) or ('Monitoring' in " ".join([se[para] for para in se.keys()])):
+                elif series_kind != "scan":
                     continue
                 else: # this is a main scan
                     row_follower += 1
@@ -973,15 +924,9 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
                         if bool_debug:
                             print("row_follower", row_follower)
 
-                        para_value_quote_removed = se[para].replace('"', '')
-                        if (re.compile('^\s*\d+\s*$').search(para_value_quote_removed)) and isint(para_value_quote_removed):
-                            para_value = int(para_value_quote_removed)
-                        elif (re.compile('^\s*(\d*\.\d+)|(\d+\.\d*)\s*$').search(para_value_quote_removed)) and isfloat(para_value_quote_removed):
-                            para_value = float(para_value_quote_removed)
-                        else:
-                            para_value = para_value_quote_removed
+                        para_value = se[para]
 
-                        ws.write(target_col_letter+str(row_follower), para_value, cell_format)
+                        value_cell_dict[(target_col_letter, row_follower)] = (para_value, cell_format)
                         # done with the follower prot
 
                     processed_follower_main_scan_count += 1
@@ -1040,17 +985,10 @@ def convert_protocol_from_json_to_xlsx(target_prot_name_list,
     if num_prot == 2:
         ws.set_column('C:C', 60)
 
-        ws.conditional_format("C2:C1000",
-                              {'type':'formula',
-                               'criteria': '=$C2<>$B2',
-                               'format': emphasis_format
-                               })
-
-        ws.conditional_format("B2:B1000",
-                              {'type':'formula',
-                               'criteria': '=$B2<>$C2',
-                               'format': emphasis_format
-                               })
+    # the values which differ between the two protocols, in the emphasis font
+    changed_row_cell_set = get_changed_row_cell_set({cell: para_value for (cell, (para_value, cell_format)) in value_cell_dict.items()}) if num_prot == 2 else set()
+    for (col_letter, row), (para_value, cell_format) in value_cell_dict.items():
+        ws.write(col_letter+str(row), para_value, changed_format_dict[cell_format] if (col_letter, row) in changed_row_cell_set else cell_format)
 
     workbook.close()
     print("Saved protocol information to:", xlsx_path)
@@ -1072,10 +1010,14 @@ output_path = "\\output_path\\"
 
 target_prot_name_list = [prot1,prot2]
 
+# index the protocol folder once, then find each protocol file by its name anywhere in it
+prot_snapshot_index = build_prot_snapshot_index(protocol_file_folder)
+file_name_index = get_file_name_index(prot_snapshot_index)
+
 target_prot_xml_path_list = []
 for i, target_prot_name in enumerate(target_prot_name_list):
     target_prot_file_name = re.sub(r" \((Child|Adult)\)", r".\1", target_prot_name)
-    target_prot_xml_path_list.append(glob.glob(protocol_file_folder + "\\**\\" + target_prot_file_name, recursive=True)[0])
+    target_prot_xml_path_list.append(prot_snapshot_index[file_name_index[target_prot_file_name][0]]["path"])
 
 output_json_path = protocol_file_folder + json_path + common_prot_name + '.json'
 output_json_path = re.sub('_\.', '.', output_json_path)
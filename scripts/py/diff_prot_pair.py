@@ -0,0 +1,339 @@
+# Filename: diff_prot_pair.py
+"""Summary: parameter-level diff of a protocol pair (the same protocol in two snapshots): the series of the two
+protocols are aligned as in the Excel file, i.e., the k-th localizer, premonitoring, monitoring, bolus or main scan
+of one protocol with the k-th of the other, and the r-th recon of a main scan with the r-th recon of the aligned main
+scan, then each parameter of the aligned series is compared. A series without a counterpart has all its parameters
+changed (from or to None). The series kinds are those of the sections of the Excel writers, from the same
+get_series_kind_Siemens() or get_series_kind_GE(). The change records can be saved for a whole batch of pairs with
+store_prot_change_list_csv(), and drive the highlighting of the N-way Excel file; the pairwise Excel writers, which lay
+out their rows by position, highlight the cells which differ from the other column of their row instead (see
+get_changed_row_cell_set()). align_prot_list() and diff_prot_list() do the same for N
+protocols at once, e.g., the same protocol on several scanners or in several snapshots, for the N-way Excel file of
+convert_prot_list_to_xlsx.py. Both can take the series aligned by sequence alignment instead (see
+align_prot_series.py), so that an inserted series does not shift the later ones.
+
+
+"""
+
+import csv
+import hashlib
+import json
+
+# ids of the series, which are not parameters
+default_exclusion_para_set = {'EntryNo', 'ReconJob'}
+
+# columns of the csv file of the change records
+prot_change_field_list = ["prot_rel_path", "series_kind", "series_index", "para_key", "old_value", "new_value"]
+
+# order of the sections of the Excel file, the recons being with their main scan
+series_kind_rank_dict = {"topo": 0, "premonitoring": 1, "bolus": 2, "monitoring": 3, "scan": 4, "recon": 4}
+
+def get_series_kind_Siemens(se):
+    """Get the kind of a series of a Siemens protocol, i.e., the section of the Excel file it is written in, for the
+    Excel writers of the general, cardiac and dual energy converters and the diff alike.
+
+    :param se: dict, a scan or recon series
+    :returns: "topo", "premonitoring", "bolus", "monitoring", "recon" or "scan" (main scan)
+
+    """
+
+    value_list = [se[para] for para in se.keys()]
+
+    if ('Topogram' in value_list) or ('TopograM' in value_list) or ('Topogram LAT' in value_list) or ('Topogram AP' in value_list):
+        return "topo"
+    elif 'PreMonitoring' in value_list:
+        return "premonitoring"
+    elif 'Bolus Trigger Level' in se.keys():
+        return "bolus"
+    elif ('Monitoring' in value_list) or ('Test Bolus' in value_list):
+        return "monitoring"
+    elif 'ReconJob' in se.keys():
+        return "recon"
+    else:
+        return "scan"
+
+def get_series_kind_GE(se):
+    """Get the kind of a series of a GE protocol, i.e., the section of the Excel file it is written in, for the Excel
+    writer of the GE converter and the diff alike.
+
+    :param se: dict, a scan or recon series
+    :returns: "topo", "premonitoring", "monitoring", "recon" or "scan" (main scan)
+
+    """
+
+    value_str = " ".join([str(se[para]) for para in se.keys()])
+
+    if 'Scout' in value_str:
+        return "topo"
+    elif 'PreMonitoring' in value_str:
+        return "premonitoring"
+    elif 'Monitoring' in value_str:
+        return "monitoring"
+    elif 'Iter.Recon Type' in se.keys():
+        return "recon"
+    else:
+        return "scan"
+
+def index_series_by_kind(prot_se_list, get_series_kind):
+    """Index the series of a protocol by their kind and rank.
+
+    :param prot_se_list: list of dict, each dict being a scan or recon series
+    :param get_series_kind: function, e.g., get_series_kind_Siemens()
+    :returns: dict, {(series kind, series index): index in prot_se_list}, the series index being (k,) for the k-th
+    series of its kind, or (k, r) for the r-th recon of the k-th main scan (the recons before the first main scan go
+    with it), all starting from 1
+
+    """
+
+    series_index_dict = {}
+    count_dict = {}
+    recon_count = 0
+
+    for i, se in enumerate(prot_se_list):
+        series_kind = get_series_kind(se)
+        if series_kind == "recon":
+            recon_count += 1
+            series_index = (max(count_dict.get("scan", 0), 1), recon_count)
+        else:
+            count_dict[series_kind] = count_dict.get(series_kind, 0) + 1
+            if series_kind == "scan" and count_dict["scan"] > 1:
+                recon_count = 0
+            series_index = (count_dict[series_kind],)
+        series_index_dict[(series_kind, series_index)] = i
+
+    return series_index_dict
+
+def align_prot_pair(prot_se_list1, prot_se_list2, get_series_kind=get_series_kind_Siemens):
+    """Align the series of the two protocols of a pair.
+
+    :param prot_se_list1: list of dict, each dict being a scan or recon series, for protocol 1
+    :param prot_se_list2: list of dict, each dict being a scan or recon series, for protocol 2
+    :param get_series_kind: function, e.g., get_series_kind_Siemens()
+    :returns: list of (series kind, series index, index in prot_se_list1 or None, index in prot_se_list2 or None), in
+    the order of protocol 1, then the series only found in protocol 2
+
+    """
+
+    series_index_dict1 = index_series_by_kind(prot_se_list1, get_series_kind)
+    series_index_dict2 = index_series_by_kind(prot_se_list2, get_series_kind)
+
+    aligned_series_list = [(series_kind, series_index, i, series_index_dict2.get((series_kind, series_index)))
+                           for ((series_kind, series_index), i) in series_index_dict1.items()]
+    aligned_series_list += [(series_kind, series_index, None, j)
+                            for ((series_kind, series_index), j) in series_index_dict2.items()
+                            if (series_kind, series_index) not in series_index_dict1]
+
+    return aligned_series_list
+
+def diff_prot_pair(prot_se_list1,
+                   prot_se_list2,
+                   get_series_kind=get_series_kind_Siemens,
+                   exclusion_para_set=default_exclusion_para_set,
+                   prot_rel_path=None,
+                   aligned_series_list=None):
+    """Diff the two protocols of a pair, parameter by parameter.
+
+    :param prot_se_list1: list of dict, each dict being a scan or recon series, for protocol 1 (before)
+    :param prot_se_list2: list of dict, each dict being a scan or recon series, for protocol 2 (after)
+    :param get_series_kind: function, e.g., get_series_kind_Siemens()
+    :param exclusion_para_set: parameters not compared, by default the ids of the series
+    :param prot_rel_path: optional, path of the protocol file relative to the snapshot folders, copied to the records
+    :param aligned_series_list: optional, the series of the pair aligned otherwise, in the format of align_prot_list(),
+    e.g., by align_prot_series.align_prot_list_by_sequence(); aligned by align_prot_pair() if None
+    :returns: list of dict, one change record per parameter which differs:
+    {"prot_rel_path": prot_rel_path,
+     "series_kind": e.g., "recon",
+     "series_index": e.g., (2, 1) for the first recon of the second main scan, see index_series_by_kind(),
+     "se_index_list": [index of the series in prot_se_list1 or None, index of the series in prot_se_list2 or None],
+     "para_key": e.g., "Kernel",
+     "old_value": value in protocol 1, None if not found,
+     "new_value": value in protocol 2, None if not found}
+
+    """
+
+    if aligned_series_list is None:
+        aligned_series_list = [(series_kind, series_index, [i, j])
+                               for (series_kind, series_index, i, j) in align_prot_pair(prot_se_list1, prot_se_list2, get_series_kind)]
+
+    prot_change_list = []
+
+    for (series_kind, series_index, (i, j)) in aligned_series_list:
+        se1 = prot_se_list1[i] if i is not None else {}
+        se2 = prot_se_list2[j] if j is not None else {}
+        para_key_list = list(se1.keys()) + [para for para in se2.keys() if para not in se1]
+        for para in para_key_list:
+            if para in exclusion_para_set:
+                continue
+            old_value = se1.get(para)
+            new_value = se2.get(para)
+            if old_value != new_value:
+                prot_change_list.append({"prot_rel_path": prot_rel_path,
+                                         "series_kind": series_kind,
+                                         "series_index": series_index,
+                                         "se_index_list": [i, j],
+                                         "para_key": para,
+                                         "old_value": old_value,
+                                         "new_value": new_value})
+
+    return prot_change_list
+
+def align_prot_list(prot_se_list_list, get_series_kind=get_series_kind_Siemens):
+    """Align the series of N protocols at once, each protocol being indexed once.
+
+    :param prot_se_list_list: list of the N protocols, each a list of dict, each dict being a scan or recon series
+    :param get_series_kind: function, e.g., get_series_kind_Siemens()
+    :returns: list of (series kind, series index, list of the N indexes of the series in their protocol, None where a
+    protocol does not have it), in the order of the sections of the Excel file, each main scan followed by its recons
+
+    """
+
+    series_index_dict_list = [index_series_by_kind(prot_se_list, get_series_kind) for prot_se_list in prot_se_list_list]
+
+    aligned_key_set = set()
+    for series_index_dict in series_index_dict_list:
+        aligned_key_set.update(series_index_dict)
+
+    # a main scan (k,) goes before its recons (k, 1), (k, 2), ...
+    aligned_key_list = sorted(aligned_key_set, key=lambda aligned_key: (series_kind_rank_dict[aligned_key[0]], aligned_key[1] + (0,) * (2 - len(aligned_key[1]))))
+
+    return [(series_kind, series_index, [series_index_dict.get((series_kind, series_index)) for series_index_dict in series_index_dict_list])
+            for (series_kind, series_index) in aligned_key_list]
+
+def diff_prot_list(prot_se_list_list,
+                   get_series_kind=get_series_kind_Siemens,
+                   exclusion_para_set=default_exclusion_para_set,
+                   prot_rel_path=None,
+                   aligned_series_list=None):
+    """Diff N protocols at once, parameter by parameter, against the first one, e.g., the reference scanner or the
+    oldest snapshot.
+
+    :param prot_se_list_list: list of the N protocols, each a list of dict, each dict being a scan or recon series
+    :param get_series_kind: function, e.g., get_series_kind_Siemens()
+    :param exclusion_para_set: parameters not compared, by default the ids of the series
+    :param prot_rel_path: optional, path of the protocol file relative to the snapshot folders, copied to the records
+    :param aligned_series_list: optional, the series already aligned by align_prot_list(), so that they are not aligned
+    again
+    :returns: list of dict, one change record per parameter of which at least one protocol differs from the first one:
+    {"prot_rel_path": prot_rel_path,
+     "series_kind": e.g., "recon",
+     "series_index": e.g., (2, 1) for the first recon of the second main scan, see index_series_by_kind(),
+     "se_index_list": the N indexes of the series in their protocol, None where a protocol does not have it,
+     "para_key": e.g., "Kernel",
+     "value_list": the N values, None where not found}
+
+    """
+
+    if aligned_series_list is None:
+        aligned_series_list = align_prot_list(prot_se_list_list, get_series_kind)
+
+    prot_change_list = []
+
+    for (series_kind, series_index, se_index_list) in aligned_series_list:
+        se_list = [prot_se_list[se_index] if se_index is not None else {} for (prot_se_list, se_index) in zip(prot_se_list_list, se_index_list)]
+        para_key_dict = {}
+        for se in se_list:
+            para_key_dict.update(dict.fromkeys(se.keys()))
+        for para in para_key_dict:
+            if para in exclusion_para_set:
+                continue
+            value_list = [se.get(para) for se in se_list]
+            if any(value != value_list[0] for value in value_list[1:]):
+                prot_change_list.append({"prot_rel_path": prot_rel_path,
+                                         "series_kind": series_kind,
+                                         "series_index": series_index,
+                                         "se_index_list": se_index_list,
+                                         "para_key": para,
+                                         "value_list": value_list})
+
+    return prot_change_list
+
+def get_changed_cell_set(prot_change_list):
+    """Get the parameters to highlight in the Excel file.
+
+    :param prot_change_list: change records from diff_prot_pair() or diff_prot_list()
+    :returns: set of (protocol index, index of the series in its protocol, parameter key): for a pair, both protocols;
+    for N protocols, the ones which differ from the first protocol, and the first protocol
+
+    """
+
+    changed_cell_set = set()
+    for prot_change in prot_change_list:
+        value_list = prot_change.get("value_list")
+        for prot_index, se_index in enumerate(prot_change["se_index_list"]):
+            if se_index is None:
+                continue
+            if value_list is None or prot_index == 0 or value_list[prot_index] != value_list[0]:
+                changed_cell_set.add((prot_index, se_index, prot_change["para_key"]))
+
+    return changed_cell_set
+
+def get_changed_row_cell_set(cell_value_dict, col_letter_pair=("B", "C")):
+    """Get the cells to highlight in a pairwise Excel file, i.e., the value cells which differ from the cell of the other
+    protocol in the same row, as its rows show them, whatever the series the writer put side by side. A missing cell is
+    blank, as is an empty value.
+
+    :param cell_value_dict: dict, {(column letter, row number): value written}, for the value columns of the two protocols
+    :param col_letter_pair: column letters of the two protocols
+    :returns: set of (column letter, row number)
+
+    """
+
+    changed_row_cell_set = set()
+    for (col_letter, row), para_value in cell_value_dict.items():
+        other_col_letter = col_letter_pair[1] if col_letter == col_letter_pair[0] else col_letter_pair[0]
+        other_para_value = cell_value_dict.get((other_col_letter, row))
+        if (para_value if para_value != "" else None) != (other_para_value if other_para_value != "" else None):
+            changed_row_cell_set.add((col_letter, row))
+
+    return changed_row_cell_set
+
+def get_prot_digest(prot_se_list, exclusion_para_set=default_exclusion_para_set):
+    """Digest the extracted parameters of a protocol, e.g., to find out the protocol pairs which did not change without
+    aligning and diffing them: two protocols with the same digest have no change record in diff_prot_pair().
+
+    :param prot_se_list: list of dict, each dict being a scan or recon series
+    :param exclusion_para_set: parameters not digested, by default the ids of the series, as in diff_prot_pair()
+    :returns: hex string of the sha256 of the series, their parameters and values, in their order
+
+    """
+
+    prot_digest = hashlib.sha256()
+    for se in prot_se_list:
+        prot_digest.update(json.dumps([[para, se[para]] for para in se.keys() if para not in exclusion_para_set],
+                                      ensure_ascii=False, default=str).encode() + b"\n")
+    return prot_digest.hexdigest()
+
+def store_prot_change_list_csv(prot_change_list, output_csv_path):
+    """Save change records, e.g., of a whole batch of protocol pairs, to a csv file, one row per record, with the
+    series index written as, e.g., "2.1".
+
+    :param prot_change_list: change records from diff_prot_pair()
+    :param output_csv_path: path of the output csv file
+    :returns: N/A
+
+    """
+
+    with open(output_csv_path, 'w', newline='') as fp:
+        writer = csv.DictWriter(fp, fieldnames=prot_change_field_list, extrasaction='ignore')
+        writer.writeheader()
+        for prot_change in prot_change_list:
+            writer.writerow(dict(prot_change, series_index=".".join([str(k) for k in prot_change["series_index"]])))
+
+def store_prot_list_change_list_csv(prot_change_list, target_prot_name_list, output_csv_path):
+    """Save the change records of N protocols to a csv file, one row per record, with one value column per protocol.
+
+    :param prot_change_list: change records from diff_prot_list()
+    :param target_prot_name_list: names of the N protocols, e.g., of the scanners or snapshots, for the value columns
+    :param output_csv_path: path of the output csv file
+    :returns: N/A
+
+    """
+
+    with open(output_csv_path, 'w', newline='') as fp:
+        writer = csv.writer(fp)
+        writer.writerow(prot_change_field_list[:4] + list(target_prot_name_list))
+        for prot_change in prot_change_list:
+            writer.writerow([prot_change["prot_rel_path"],
+                             prot_change["series_kind"],
+                             ".".join([str(k) for k in prot_change["series_index"]]),
+                             prot_change["para_key"]] + prot_change["value_list"])
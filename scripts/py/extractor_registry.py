@@ -0,0 +1,90 @@
+# Filename: extractor_registry.py
+"""Summary: registry of the parameter extractors named in the lookup tables (the func_name of each row), which turns
+each row of a lookup table into a ready-to-call extractor when the table is loaded. Other packages can add their own
+extractors through the "ct_protocol_management.extractors" entry point group, e.g., in their pyproject.toml:
+
+[project.entry-points."ct_protocol_management.extractors"]
+get_para_from_my_scanner = "my_package.my_module:get_para_from_my_scanner"
+
+
+"""
+
+import functools
+from importlib import metadata
+from get_para_from_indiv_prot_xml import get_para_from_indiv_prot_xml_Siemens_Force
+from get_para_from_indiv_prot_xml import get_para_from_indiv_prot_xml_GE_Optima
+
+# entry point group of the third-party extractors, loaded on the first lookup of an extractor which is not registered
+extractor_entry_point_group = "ct_protocol_management.extractors"
+
+# registered extractors, {func_name: function}
+extractor_registry = {"get_para_from_indiv_prot_xml_Siemens_Force": get_para_from_indiv_prot_xml_Siemens_Force,
+                      "get_para_from_indiv_prot_xml_GE_Optima": get_para_from_indiv_prot_xml_GE_Optima}
+
+# whether the entry point group has been loaded in this process
+bool_entry_point_loaded = False
+
+def register_extractor(func_name, func):
+    """Register an extractor, to be named in the lookup tables as func_name.
+    It is called with the para_dict of the row as keyword arguments, plus the keyword arguments given by the converter
+    (e.g., sub_protocol, sub_group and sub_recon for GE), and returns the tuple (key or tag, value).
+
+    :param func_name: name of the extractor in the lookup tables
+    :param func: the extractor
+    :returns: N/A
+
+    """
+
+    extractor_registry[func_name] = func
+
+def load_entry_point_extractors():
+    """Register the extractors of the extractor_entry_point_group entry points of the installed packages, not
+    overriding the ones already registered.
+
+    :returns: N/A
+
+    """
+
+    global bool_entry_point_loaded
+
+    all_entry_points = metadata.entry_points()
+    if hasattr(all_entry_points, "select"):
+        entry_point_list = all_entry_points.select(group=extractor_entry_point_group)
+    else:
+        # python < 3.10
+        entry_point_list = all_entry_points.get(extractor_entry_point_group, [])
+
+    for entry_point in entry_point_list:
+        if entry_point.name not in extractor_registry:
+            extractor_registry[entry_point.name] = entry_point.load()
+
+    bool_entry_point_loaded = True
+
+def get_extractor(func_name):
+    """Get a registered extractor by its name, loading the entry point extractors if it is not registered yet.
+
+    :param func_name: name of the extractor in the lookup tables
+    :returns: the extractor, raises ValueError if there is none with this name
+
+    """
+
+    if func_name not in extractor_registry and not bool_entry_point_loaded:
+        load_entry_point_extractors()
+
+    if func_name not in extractor_registry:
+        raise ValueError("no extractor registered as " + func_name)
+
+    return extractor_registry[func_name]
+
+def bind_lookup_tbl_extractors(lookup_tbl):
+    """Bind each row of a lookup table to its extractor and para_dict, so that the converters call it with the series
+    only, without resolving the extractor or expanding the para_dict of each parameter of each series. The para_type
+    of the row is not passed to the extractor, the converters normalize the value it returns (see normalize_para_value.py).
+
+    :param lookup_tbl: lookup table, i.e., {key: [func_name, para_dict]}
+    :returns: list of (key, bound extractor), in the lookup table order
+
+    """
+
+    return [(key, functools.partial(get_extractor(func_name), **{field: value for (field, value) in para_dict.items() if field != "para_type"}))
+            for (key, (func_name, para_dict)) in lookup_tbl.items()]
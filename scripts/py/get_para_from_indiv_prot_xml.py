@@ -9,6 +9,66 @@
 # Update #:
     
 import re
+import xml.etree.ElementTree as ET
+from normalize_para_value import normalize_para_value
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+# xml backend to parse the protocol files with: "lxml" if it is installed (XPath evaluated in C), otherwise "etree"
+# (xml.etree.ElementTree). Set it to "etree" to force the standard library.
+default_xml_backend = "lxml" if lxml_etree is not None else "etree"
+
+# lxml XPath objects compiled from (node_xpath, node_id_attrib), with the ID value as the variable $node_id_value
+compiled_xpath_dict = {}
+
+def get_xml_module(xml_backend=None):
+    """Get the ElementTree-compatible module of the xml backend, i.e., lxml.etree or xml.etree.ElementTree.
+
+    :param xml_backend: "lxml" or "etree", default_xml_backend if None
+    :returns: the module, providing parse(), iterparse() and Element()
+
+    """
+
+    if xml_backend is None:
+        xml_backend = default_xml_backend
+
+    if xml_backend == "lxml":
+        if lxml_etree is None:
+            raise ImportError("the lxml xml backend is selected, but lxml is not installed")
+        return lxml_etree
+    elif xml_backend == "etree":
+        return ET
+    else:
+        raise ValueError("unknown xml backend: " + str(xml_backend))
+
+def is_lxml_node(node):
+    """Whether the node was parsed by lxml, in which case its lookups can use compiled XPath objects."""
+
+    return lxml_etree is not None and isinstance(node, lxml_etree._Element)
+
+def select_node_list_by_id(node, node_xpath, node_id_attrib, node_id_value):
+    """Select the nodes of node_xpath whose ID attribute has the target value, e.g.,
+    ".//MlModeEntryType[@EntryNo='3']". With lxml, the XPath is compiled once per (node_xpath, node_id_attrib) and the ID
+    value is passed as a variable, instead of building a new XPath string on every call.
+
+    :param node: the node to search from
+    :param node_xpath: xpath string of the nodes, e.g., ".//MlModeEntryType", "./MlModeReconType"
+    :param node_id_attrib: attribute name for the ID of the nodes, in XPath format, e.g., "@EntryNo", "@ReconJob"
+    :param node_id_value: target attribute value for the ID
+    :returns: list of the matching nodes, in document order
+
+    """
+
+    if is_lxml_node(node):
+        xpath_id = (node_xpath, node_id_attrib)
+        if xpath_id not in compiled_xpath_dict:
+            compiled_xpath_dict[xpath_id] = lxml_etree.XPath(node_xpath + "[" + node_id_attrib + "=$node_id_value]")
+        return compiled_xpath_dict[xpath_id](node, node_id_value=node_id_value)
+
+    return node.findall(node_xpath + "[" + node_id_attrib + "='" + node_id_value + "']")
 
 def get_para_from_indiv_prot_xml_Siemens_Force(prot_xml_tree,
                                                para_xpath,
@@ -18,7 +78,8 @@ def get_para_from_indiv_prot_xml_Siemens_Force(prot_xml_tree,
                                                sub_node_xpath="./MlModeScanType", # "./MlModeReconType"
                                                sub_node_id_attrib=None, # "@ReconJob",
                                                sub_node_id_value=None, # "1",
-                                               bool_verbose=False):
+                                               bool_verbose=False,
+                                               prot_xml_index=None):
 
     """Dig out detailed scan parameter from individual protocol file
 
@@ -31,36 +92,52 @@ def get_para_from_indiv_prot_xml_Siemens_Force(prot_xml_tree,
     :param sub_node_id_attrib: attribute name for the sub-node's ID, in XPath format, e.g., "@ReconJob" for Siemens Force
     :param sub_node_id_value: target attribute value for the sub-node's ID
     :param bool_verbose: whether to print the results
+    :param prot_xml_index: optional, index of prot_xml_tree from build_entry_index_Siemens_Force(), to look up the entry
+    node and the recon node without searching the whole tree
 
     :returns: tuple containing the single parameter's tag and text, (e.tag: e.text)
 
     """
 
+    if prot_xml_index is not None:
+        entry_node = get_entry_node_from_index_Siemens_Force(prot_xml_index,
+                                                             entry_node_xpath,
+                                                             entry_node_id_attrib,
+                                                             entry_node_id_value)
+        if not (entry_node_id_attrib == '' and entry_node_id_value == ''):
+            entry_node = get_sub_node_from_index_Siemens_Force(prot_xml_index,
+                                                               entry_node,
+                                                               entry_node_xpath,
+                                                               entry_node_id_attrib,
+                                                               entry_node_id_value,
+                                                               sub_node_xpath,
+                                                               sub_node_id_attrib,
+                                                               sub_node_id_value)
+        e = entry_node.find(para_xpath)
+        if bool_verbose:
+            print(e.tag, e.text, "\n")
+        return (e.tag, e.text)
+
     root = prot_xml_tree.getroot()
     # select the entry node based on the entry_node_xpath, entry_node_id_attrib, and entry_node_id_value
-    if entry_node_id_attrib == '' and entry_node_id_value == '':
-        target_entry_node_xpath = entry_node_xpath
-    else:
-        target_entry_node_xpath = entry_node_xpath + "[" + entry_node_id_attrib + "='" + entry_node_id_value + "']"
     if bool_verbose:
-        print("target entry-node's xpath: ", target_entry_node_xpath)
-    entry_node_list = root.findall(target_entry_node_xpath)
+        print("target entry-node's xpath: ", entry_node_xpath, entry_node_id_attrib, entry_node_id_value)
     if entry_node_id_attrib == '' and entry_node_id_value == '':
-        pass
+        entry_node_list = root.findall(entry_node_xpath)
     else:
+        entry_node_list = select_node_list_by_id(root, entry_node_xpath, entry_node_id_attrib, entry_node_id_value)
         assert len(entry_node_list) == 1
-    if (sub_node_id_attrib is None) or (sub_node_id_value is None):
-        target_sub_node_xpath = sub_node_xpath
-    else:
-        target_sub_node_xpath = sub_node_xpath + "[" + sub_node_id_attrib + "='" + sub_node_id_value + "']"
 
     if bool_verbose:
-        print("target sub-node's xpath: ", target_sub_node_xpath)
+        print("target sub-node's xpath: ", sub_node_xpath, sub_node_id_attrib, sub_node_id_value)
 
     if entry_node_id_attrib == '' and entry_node_id_value == '':
         entry_node = entry_node_list[0]
+    elif (sub_node_id_attrib is None) or (sub_node_id_value is None):
+        entry_node = entry_node_list[0].find(sub_node_xpath)
     else:
-        entry_node = entry_node_list[0].find(target_sub_node_xpath)
+        sub_node_list = select_node_list_by_id(entry_node_list[0], sub_node_xpath, sub_node_id_attrib, sub_node_id_value)
+        entry_node = sub_node_list[0] if sub_node_list else None
         
     e = entry_node.find(para_xpath)
     return_pair = (e.tag, e.text)
@@ -70,29 +147,519 @@ def get_para_from_indiv_prot_xml_Siemens_Force(prot_xml_tree,
             
     return return_pair
 
+def get_keep_tag_set_Siemens_Force(extraction_plan_list):
+    """Work out, from the compiled lookup tables, the set of tags the extraction needs: the tags of the parameters, the
+    entry and sub-node tags they are read from, and the tags the converters use to sort the series (e.g., RangeName).
+    A node whose tag is not in the set, and none of whose descendants is, can never be matched and can be dropped.
+
+    :param extraction_plan_list: extraction plans from compile_extraction_plan_Siemens_Force(), e.g., one per lookup table
+    :returns: set of the tags to keep, or None if a para_xpath is not of the form ".//Tag", or if a parameter is read by
+    another extractor, in which case nothing can be dropped safely
+
+    """
+
+    keep_tag_set = {"MlModeEntryType", "MlModeScanType", "MlModeReconType", "MlBolusType", "RangeName"}
+
+    for extraction_plan in extraction_plan_list:
+        if extraction_plan["extractor_list"]:
+            return None
+        for group in extraction_plan["group_list"]:
+            for node_xpath in (group["entry_node_xpath"], group["sub_node_xpath"]):
+                keep_tag_set.update(re.findall(r"[A-Za-z_][\w.-]*", node_xpath))
+            for key, para_xpath, para_tag in group["para_list"]:
+                if para_tag is None:
+                    return None
+                keep_tag_set.add(para_tag)
+
+    return keep_tag_set
+
+def iterparse_entry_xml_Siemens_Force(indiv_prot_xml_path,
+                                      entry_tag_list=("MlModeEntryType", "MlBolusType"),
+                                      bolus_root=None,
+                                      xml_backend=None,
+                                      keep_tag_set=None):
+    """Stream the entry nodes of an individual protocol file one at a time, instead of parsing the whole tree in memory.
+    Each entry node is given back complete, i.e., with its scan and recon sub-nodes, and then detached from the tree, as is
+    everything else outside the entry nodes once it has been read, so that the memory used is bounded by the largest entry
+    node, not by the file.
+
+    :param indiv_prot_xml_path: path to the individual protocol file, e.g., *.Child, *.Adult for Siemens CT
+    :param entry_tag_list: tags of the entry nodes to give back, e.g., "MlModeEntryType", "MlBolusType"
+    :param bolus_root: optional, if given, the MlBolusType nodes are appended to it instead of being given back, to be
+    processed after all the MlModeEntryType nodes (the bolus nodes are few and small). It must be a node of the same
+    xml backend, e.g., get_xml_module(xml_backend).Element("MlBolusTypeList")
+    :param xml_backend: "lxml" or "etree", default_xml_backend if None
+    :param keep_tag_set: optional, set of the tags to keep, from get_keep_tag_set_Siemens_Force(); the other subtrees of
+    the entry nodes are dropped as they are read
+    :returns: generator of the entry nodes, in document order
+
+    """
+
+    node_stack = []
+    # number of entry nodes (or kept bolus nodes) open at the current position, their descendants must be kept
+    entry_depth = 0
+
+    for event, node in get_xml_module(xml_backend).iterparse(indiv_prot_xml_path, events=("start", "end")):
+
+        bool_entry = (node.tag in entry_tag_list) or (bolus_root is not None and node.tag == "MlBolusType")
+
+        if event == "start":
+            node_stack.append(node)
+            if bool_entry:
+                entry_depth += 1
+            continue
+
+        node_stack.pop()
+        if bool_entry:
+            entry_depth -= 1
+
+        if entry_depth > 0:
+            # part of an entry node which is not complete yet, drop it if it can never match
+            if (keep_tag_set is not None) and (node.tag not in keep_tag_set) and (len(node) == 0):
+                # the parser reads ahead of the events, so the node is not always the last child of its parent yet
+                if node_stack[-1][-1] is node:
+                    del node_stack[-1][-1]
+                else:
+                    node_stack[-1].remove(node)
+            continue
+
+        if bool_entry:
+            if bolus_root is not None and node.tag == "MlBolusType":
+                bolus_root.append(node)
+            else:
+                yield node
+
+        # all the earlier siblings of this node are complete as well, detach them all at once
+        if node_stack:
+            del node_stack[-1][:]
+
+def build_entry_index_Siemens_Force(prot_xml_tree):
+    """Index the entry nodes and recon nodes of a parsed protocol in one pass over the tree, so that looking up an entry
+    by its EntryNo, or a recon by its (EntryNo, ReconJob), does not search the whole tree again.
+
+    :param prot_xml_tree: xml ET parsed from the individual protocol file, e.g., *.Child, *.Adult for Siemens CT, or a
+    single node, e.g., an entry node from iterparse_entry_xml_Siemens_Force()
+    :returns: dict, the index, containing:
+    {"root": root node of prot_xml_tree,
+     "entry_list": list of the MlModeEntryType nodes in document order,
+     "entry": {EntryNo: MlModeEntryType node},
+     "duplicate_entry_no": set of EntryNo found more than once,
+     "recon": {(EntryNo, ReconJob): first MlModeReconType child of the entry with this ReconJob},
+     "first_node": {xpath: first node}, filled on demand for the entry nodes which are not numbered, e.g., MlBolusType}
+
+    """
+
+    if hasattr(prot_xml_tree, "getroot"):
+        root = prot_xml_tree.getroot()
+    else:
+        root = prot_xml_tree
+    prot_xml_index = {"root": root,
+                      "entry_list": [],
+                      "entry": {},
+                      "duplicate_entry_no": set(),
+                      "recon": {},
+                      "first_node": {}}
+
+    for entry_node in root.iter("MlModeEntryType"):
+        prot_xml_index["entry_list"].append(entry_node)
+        entry_no = entry_node.get("EntryNo")
+        if entry_no in prot_xml_index["entry"]:
+            prot_xml_index["duplicate_entry_no"].add(entry_no)
+            continue
+        prot_xml_index["entry"][entry_no] = entry_node
+
+        for sub_node in entry_node:
+            if sub_node.tag == "MlModeReconType":
+                prot_xml_index["recon"].setdefault((entry_no, sub_node.get("ReconJob")), sub_node)
+
+    return prot_xml_index
+
+def get_entry_node_from_index_Siemens_Force(prot_xml_index,
+                                            entry_node_xpath,
+                                            entry_node_id_attrib,
+                                            entry_node_id_value):
+    """Look up the entry node of a series in the index from build_entry_index_Siemens_Force().
+    Entry nodes other than ".//MlModeEntryType" numbered by "@EntryNo" are searched for in the tree.
+
+    :param prot_xml_index: index from build_entry_index_Siemens_Force()
+    :param entry_node_xpath: xpath string for the entry level node, e.g. ".//MlModeEntryType"
+    :param entry_node_id_attrib: attribute name for the ID of the entry node, in XPath format, e.g., "@EntryNo"
+    :param entry_node_id_value: target attribute value for the entry-node's ID
+    :returns: the entry node
+
+    """
+
+    if entry_node_id_attrib == '' and entry_node_id_value == '':
+        # not numbered, e.g., MlBolusType: the first one in the tree
+        if entry_node_xpath not in prot_xml_index["first_node"]:
+            prot_xml_index["first_node"][entry_node_xpath] = prot_xml_index["root"].findall(entry_node_xpath)[0]
+        return prot_xml_index["first_node"][entry_node_xpath]
+
+    if entry_node_xpath == ".//MlModeEntryType" and entry_node_id_attrib == "@EntryNo":
+        assert (entry_node_id_value in prot_xml_index["entry"]) and (entry_node_id_value not in prot_xml_index["duplicate_entry_no"])
+        return prot_xml_index["entry"][entry_node_id_value]
+
+    entry_node_list = select_node_list_by_id(prot_xml_index["root"], entry_node_xpath, entry_node_id_attrib, entry_node_id_value)
+    assert len(entry_node_list) == 1
+    return entry_node_list[0]
+
+def get_sub_node_from_index_Siemens_Force(prot_xml_index,
+                                          entry_node,
+                                          entry_node_xpath,
+                                          entry_node_id_attrib,
+                                          entry_node_id_value,
+                                          sub_node_xpath,
+                                          sub_node_id_attrib,
+                                          sub_node_id_value):
+    """Look up the sub-node (scan or recon node) of an entry node, using the recon index from
+    build_entry_index_Siemens_Force() for "./MlModeReconType" numbered by "@ReconJob".
+
+    :param prot_xml_index: index from build_entry_index_Siemens_Force()
+    :param entry_node: the entry node, from get_entry_node_from_index_Siemens_Force()
+    :param entry_node_xpath: xpath string for the entry level node, e.g. ".//MlModeEntryType"
+    :param entry_node_id_attrib: attribute name for the ID of the entry node, in XPath format, e.g., "@EntryNo"
+    :param entry_node_id_value: target attribute value for the entry-node's ID
+    :param sub_node_xpath: xpath string relative to the entry node, e.g., "./MlModeReconType", "./MlModeScanType"
+    :param sub_node_id_attrib: attribute name for the sub-node's ID, in XPath format, e.g., "@ReconJob"
+    :param sub_node_id_value: target attribute value for the sub-node's ID
+    :returns: the sub-node, or None if not found
+
+    """
+
+    if (sub_node_id_attrib is None) or (sub_node_id_value is None):
+        return entry_node.find(sub_node_xpath)
+
+    if (entry_node_xpath == ".//MlModeEntryType" and entry_node_id_attrib == "@EntryNo" and
+            sub_node_xpath == "./MlModeReconType" and sub_node_id_attrib == "@ReconJob"):
+        return prot_xml_index["recon"].get((entry_node_id_value, sub_node_id_value))
+
+    sub_node_list = select_node_list_by_id(entry_node, sub_node_xpath, sub_node_id_attrib, sub_node_id_value)
+    return sub_node_list[0] if sub_node_list else None
+
+def compile_extraction_plan_Siemens_Force(lookup_tbl, extractor_list=None):
+    """Compile a lookup table into an extraction plan, so that all of its parameters can be pulled out of one series in a
+    single visit of the entry node and its sub-node(s), instead of one full-tree search per key.
+
+    The rows of the lookup table are grouped by the node they read from (entry node xpath/ID attribute, sub-node xpath/ID
+    attribute/ID value). Each group keeps its (key, para_xpath, para_tag) in the table order, and the tuple of its ".//Tag"
+    tags, which lxml can match in C with node.iter(*para_tag_tuple).
+    The rows naming another extractor than get_para_from_indiv_prot_xml_Siemens_Force() are called one by one, with the
+    bound extractors of extractor_list.
+
+    :param lookup_tbl: lookup table as loaded from para_lookup_tbl/Siemens/*.json, i.e., {key: [func_name, para_dict]}
+    :param extractor_list: optional, the bound extractors of the lookup table, from
+    extractor_registry.bind_lookup_tbl_extractors(), needed only if a row names another extractor
+    :returns: dict, the extraction plan, containing:
+    {"key_list": keys in the lookup table order,
+     "para_type_list": the declared type of each key of key_list, see normalize_para_value.py,
+     "group_list": list of dict, one per node to read from,
+     "extractor_list": list of (key, bound extractor, whether its para_dict fixes the sub_node_id_value), for the rows
+     naming another extractor}
+
+    """
+
+    group_dict = {}
+    key_list = []
+    para_type_list = []
+    other_extractor_list = []
+    bound_extractor_dict = dict(extractor_list) if extractor_list is not None else {}
+
+    for key in lookup_tbl:
+        target_func_name = lookup_tbl[key][0]
+        para_dict = lookup_tbl[key][1]
+        if target_func_name != "get_para_from_indiv_prot_xml_Siemens_Force":
+            if key not in bound_extractor_dict:
+                raise ValueError("cannot compile extractor " + target_func_name + " for key " + key)
+            other_extractor_list.append((key, bound_extractor_dict[key], "sub_node_id_value" in para_dict))
+            key_list.append(key)
+            para_type_list.append(para_dict.get("para_type", "auto"))
+            continue
+
+        # the defaults are the same as the ones of get_para_from_indiv_prot_xml_Siemens_Force()
+        # a sub_node_id_value of None in the group means it is given per series, e.g., the ReconJob of a recon
+        group_id = (para_dict.get("entry_node_xpath", ".//MlModeEntryType"),
+                    para_dict.get("entry_node_id_attrib", "@EntryNo"),
+                    para_dict.get("sub_node_xpath", "./MlModeScanType"),
+                    para_dict.get("sub_node_id_attrib", None),
+                    para_dict.get("sub_node_id_value", None))
+
+        if group_id not in group_dict:
+            group_dict[group_id] = {"entry_node_xpath": group_id[0],
+                                    "entry_node_id_attrib": group_id[1],
+                                    "sub_node_xpath": group_id[2],
+                                    "sub_node_id_attrib": group_id[3],
+                                    "sub_node_id_value": group_id[4],
+                                    "para_list": [],
+                                    "para_tag_tuple": ()}
+
+        # a para_xpath of the form ".//Tag" can be matched by tag in a single pass over the node
+        para_xpath = para_dict["para_xpath"]
+        if re.match(r"^\.//[A-Za-z_][\w.-]*$", para_xpath):
+            para_tag = para_xpath[3:]
+        else:
+            para_tag = None
+
+        group_dict[group_id]["para_list"].append((key, para_xpath, para_tag))
+        key_list.append(key)
+        para_type_list.append(para_dict.get("para_type", "auto"))
+
+    for group in group_dict.values():
+        group["para_tag_tuple"] = tuple(dict.fromkeys(para_tag for (key, para_xpath, para_tag) in group["para_list"] if para_tag is not None))
+
+    return {"key_list": key_list,
+            "para_type_list": para_type_list,
+            "group_list": list(group_dict.values()),
+            "extractor_list": other_extractor_list}
+
+def get_para_dict_from_indiv_prot_xml_Siemens_Force(prot_xml_index,
+                                                    extraction_plan,
+                                                    entry_node_id_value="1",
+                                                    sub_node_id_value=None,
+                                                    entry_node_id_attrib=None,
+                                                    bool_verbose=False):
+    """Dig out all the parameters of one series from individual protocol file, based on a compiled extraction plan.
+    The texts are the same as calling get_para_from_indiv_prot_xml_Siemens_Force() for every key of the lookup table,
+    each then normalized into its typed value, once, with normalize_para_value() and the para_type of its row.
+
+    :param prot_xml_index: index of the xml ET parsed from the individual protocol file, from build_entry_index_Siemens_Force()
+    :param extraction_plan: extraction plan from compile_extraction_plan_Siemens_Force()
+    :param entry_node_id_value: target attribute value for the entry-node's ID
+    :param sub_node_id_value: target attribute value for the sub-node's ID, used if the lookup table does not fix it
+    :param entry_node_id_attrib: if not None, overrides the entry-node's ID attribute of the lookup table, e.g., '' for the
+    bolus entries, which are not numbered
+    :param bool_verbose: whether to print the results
+    :returns: dict, {key: typed value of e.text} in the lookup table order
+
+    """
+
+    para_text_dict = {}
+
+    for group in extraction_plan["group_list"]:
+
+        target_entry_node_id_attrib = group["entry_node_id_attrib"] if entry_node_id_attrib is None else entry_node_id_attrib
+        target_sub_node_id_value = sub_node_id_value if group["sub_node_id_value"] is None else group["sub_node_id_value"]
+
+        entry_node = get_entry_node_from_index_Siemens_Force(prot_xml_index,
+                                                             group["entry_node_xpath"],
+                                                             target_entry_node_id_attrib,
+                                                             entry_node_id_value)
+
+        if not (target_entry_node_id_attrib == '' and entry_node_id_value == ''):
+            entry_node = get_sub_node_from_index_Siemens_Force(prot_xml_index,
+                                                               entry_node,
+                                                               group["entry_node_xpath"],
+                                                               target_entry_node_id_attrib,
+                                                               entry_node_id_value,
+                                                               group["sub_node_xpath"],
+                                                               group["sub_node_id_attrib"],
+                                                               target_sub_node_id_value)
+
+        para_text_dict.update(get_para_text_from_node(entry_node,
+                                                      group["para_list"],
+                                                      para_tag_tuple=group["para_tag_tuple"],
+                                                      bool_verbose=bool_verbose))
+
+    for key, extractor, bool_fixed_sub_node_id_value in extraction_plan["extractor_list"]:
+        extractor_kwargs = {"prot_xml_tree": prot_xml_index["root"],
+                            "prot_xml_index": prot_xml_index,
+                            "entry_node_id_value": entry_node_id_value}
+        if not bool_fixed_sub_node_id_value:
+            extractor_kwargs["sub_node_id_value"] = sub_node_id_value
+        if entry_node_id_attrib is not None:
+            extractor_kwargs["entry_node_id_attrib"] = entry_node_id_attrib
+        para_text_dict[key] = extractor(bool_verbose=bool_verbose, **extractor_kwargs)[1]
+
+    # keep the order of the lookup table, as it decides the order of the rows in the Excel file
+    return {key: normalize_para_value(para_text_dict[key], para_type) for (key, para_type) in zip(extraction_plan["key_list"], extraction_plan["para_type_list"])}
+
+def get_para_text_from_node(node, para_list, para_tag_tuple=(), bool_verbose=False):
+    """Get the text of all the parameters of para_list under one node, in a single pass over its descendants.
+    A para_xpath of the form ".//Tag" matches the first descendant with that tag in document order, the same as node.find();
+    any other para_xpath falls back to node.find().
+
+    :param node: the xml node to read from, e.g., a MlModeScanType or MlModeReconType node
+    :param para_list: list of (key, para_xpath, para_tag), para_tag being None if para_xpath is not of the form ".//Tag"
+    :param para_tag_tuple: optional, the para_tag of para_list, so that lxml can skip the other descendants in C
+    :param bool_verbose: whether to print the results
+    :returns: dict, {key: e.text}
+
+    """
+
+    para_text_dict = {}
+    # tag -> list of keys still waiting for it
+    pending_tag_dict = {}
+
+    for key, para_xpath, para_tag in para_list:
+        if para_tag is not None:
+            pending_tag_dict.setdefault(para_tag, []).append(key)
+        else:
+            e = node.find(para_xpath)
+            para_text_dict[key] = e.text
+            if bool_verbose:
+                print(e.tag, e.text, "\n")
+
+    if pending_tag_dict:
+        if para_tag_tuple and is_lxml_node(node):
+            it = node.iter(*para_tag_tuple)
+        else:
+            it = node.iter()
+        for e in it:
+            # skip the node itself, ".//" only matches its descendants
+            if e is node:
+                continue
+            if e.tag in pending_tag_dict:
+                for key in pending_tag_dict.pop(e.tag):
+                    para_text_dict[key] = e.text
+                if bool_verbose:
+                    print(e.tag, e.text, "\n")
+                if not pending_tag_dict:
+                    break
+
+    if pending_tag_dict:
+        # same failure as the per-key lookup, where node.find() returns None
+        raise AttributeError("'NoneType' object has no attribute 'tag', missing: " + ", ".join(pending_tag_dict))
+
+    return para_text_dict
+
+# GE .proto blocks making up the protocol tree: the block expected below each level of the tree (None for the root,
+# i.e., the file itself); the other blocks (e.g., the Protocol block enclosing the Series blocks) are merged into their
+# enclosing tree node
+sub_block_name_dict_GE = {None: "Series", "Series": "Group", "Group": "Recon"}
+
+# GE para_xpath values, compiled once: {para_xpath: (key, bool_prefix, compiled regex)}, key being the parameter key
+# of the plain "^key" patterns, which are looked up directly, None for the other patterns; bool_prefix being True for
+# "^key", which matches the first key starting with it (e.g., "isdMode" before "isd"), False for "^key =" and "^key ",
+# which match the key only
+compiled_para_pattern_dict_GE = {}
+plain_para_key_pattern_GE = re.compile(r"\^(\w+)( ?=?)")
+
+def iter_series_node_GE(line_iter):
+    """Parse a GE .proto protocol file, or an export bundling several protocols, one Series block at a time, in one
+    pass over its lines, by following its braces. Each Series node is yielded as soon as its closing brace is read and
+    is not kept afterwards, so only one Series block is held in memory at a time. Each node is a dict:
+    {"block_name": "Series"/"Group"/"Recon", "para_dict": {key: value}, "block_list": [sub-nodes]},
+    para_dict holding the "key = value" lines of the block (the first one if a key is repeated), in file order, and
+    block_list the Group nodes of a Series node, or the Recon nodes of a Group node.
+
+    :param line_iter: lines of the protocol file, e.g., its opened file object
+    :returns: generator of the Series nodes, in file order
+
+    """
+
+    root_node = {"block_name": None, "para_dict": {}, "block_list": []}
+    node_stack = [root_node]
+    # one item per open block: True if it is a tree node (on node_stack), False if it is merged into its enclosing one
+    block_stack = []
+
+    for line in line_iter:
+        line = line.strip()
+        if line.endswith("{"):
+            if line[:-1].strip() == sub_block_name_dict_GE.get(node_stack[-1]["block_name"]):
+                node = {"block_name": line[:-1].strip(), "para_dict": {}, "block_list": []}
+                if node_stack[-1] is not root_node:
+                    node_stack[-1]["block_list"].append(node)
+                node_stack.append(node)
+                block_stack.append(True)
+            else:
+                # not a tree level, its parameters go to the enclosing node
+                block_stack.append(False)
+        elif line.startswith("}"):
+            if block_stack and block_stack.pop():
+                node = node_stack.pop()
+                if node["block_name"] == "Series":
+                    yield node
+        elif "=" in line:
+            key, value = line.split("=", 1)
+            node_stack[-1]["para_dict"].setdefault(key.strip(), value.strip())
+
+    if len(node_stack) > 1:
+        # truncated file, its last Series block is not closed
+        yield node_stack[1]
+
+def parse_prot_tree_GE(line_iter):
+    """Parse a whole GE .proto protocol file into a Series -> Group -> Recon tree (see iter_series_node_GE()).
+
+    :param line_iter: lines of the protocol file, e.g., its opened file object
+    :returns: dict, the root node, {"block_name": None, "para_dict": {}, "block_list": [Series nodes]}
+
+    """
+
+    return {"block_name": None, "para_dict": {}, "block_list": list(iter_series_node_GE(line_iter))}
+
+def get_para_index_GE(node):
+    """Get the key -> value dictionary of a GE protocol tree node and of its sub-nodes: the parameters of the node
+    itself first, then those of its sub-nodes, in file order (the first one if a key is repeated). It is built on the
+    first lookup in the node and kept in it, as "para_index".
+
+    :param node: node from parse_prot_tree_GE()
+    :returns: dict, {key: value}
+
+    """
+
+    if "para_index" not in node:
+        para_index = dict(node["para_dict"])
+        for sub_node in node["block_list"]:
+            for key, value in get_para_index_GE(sub_node).items():
+                para_index.setdefault(key, value)
+        node["para_index"] = para_index
+
+    return node["para_index"]
+
 def get_para_from_indiv_prot_xml_GE_Optima(sub_protocol,
                                            para_xpath,
                                            in_group=False,
                                            in_recon=False,
-                                           sub_group='',
-                                           sub_recon='',
+                                           sub_group=None,
+                                           sub_recon=None,
                                            convert_to_val=False,
                                            convert_dict={},
                                            bool_verbose=False):
-    
-    sub_protocol = sub_protocol
-    sub_group = sub_group
-    sub_recon = sub_recon
-    # select the entry node based on the entry_node_xpath, entry_node_id_attrib, and entry_node_id_value
+    """Get a parameter of a GE protocol from its protocol tree, the nearest block first: the parameters of the Series
+    (or Group, or Recon) block itself, then those of its sub-blocks. A plain "^key" para_xpath is looked up by its key,
+    the other ones are matched in order against the "key = value" lines, the first matching line winning, as for a
+    plain "^key", whose first key in file order starting with key is kept for the node, as "prefix_index".
+
+    :param sub_protocol: Series node, from parse_prot_tree_GE()
+    :param para_xpath: regex matched against the "key = value" line of the parameter, e.g., "^kiloVolts"
+    :param in_group: search the Group node sub_group instead of the Series node
+    :param in_recon: with in_group, search the Recon node sub_recon
+    :param sub_group: Group node of the Series node
+    :param sub_recon: Recon node of the Group node
+    :returns: tuple, (key, value)
+
+    """
+
     if in_group == True and in_recon == True:
-        para = list(filter(lambda x: re.match(para_xpath,x), sub_recon))[0]
+        node = sub_recon
     elif in_group == True and in_recon == False:
-        para = list(filter(lambda x: re.match(para_xpath,x), sub_group))[0]
+        node = sub_group
     else:
-        para = list(filter(lambda x: re.match(para_xpath,x), sub_protocol))[0]
-    
-    e = para.split("=",1)[1].strip()
-    f = para.split("=",1)[0].strip()
+        node = sub_protocol
+
+    if para_xpath not in compiled_para_pattern_dict_GE:
+        plain_para_key_match = plain_para_key_pattern_GE.fullmatch(para_xpath)
+        compiled_para_pattern_dict_GE[para_xpath] = (plain_para_key_match.group(1) if plain_para_key_match else None,
+                                                     plain_para_key_match is not None and plain_para_key_match.group(2) == "",
+                                                     re.compile(para_xpath))
+    para_key, bool_prefix, para_pattern = compiled_para_pattern_dict_GE[para_xpath]
+
+    para_index = get_para_index_GE(node)
+    if para_key is not None and bool_prefix:
+        prefix_index = node.setdefault("prefix_index", {})
+        if para_key not in prefix_index:
+            prefix_index[para_key] = next((key for key in para_index if key.startswith(para_key)), None)
+        if prefix_index[para_key] is None:
+            raise IndexError("no parameter matching " + para_xpath)
+        f, e = prefix_index[para_key], para_index[prefix_index[para_key]]
+    elif para_key in para_index:
+        f, e = para_key, para_index[para_key]
+    else:
+        # a regex pattern
+        for f, e in para_index.items():
+            if para_pattern.match(f + " = " + e):
+                break
+        else:
+            raise IndexError("no parameter matching " + para_xpath)
     
     # if convert_to_val == True:
     #     e = convert_dict[e]
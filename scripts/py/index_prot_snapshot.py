@@ -0,0 +1,51 @@
+# Filename: index_prot_snapshot.py
+"""Summary: one-shot index of a protocol snapshot folder (e.g., an exported UserProtocols folder), listing its protocol
+files once, instead of searching the whole folder again for every protocol
+
+
+"""
+
+import os
+
+def build_prot_snapshot_index(snapshot_folder, suffix_list=None):
+    """Walk a protocol snapshot folder once and index its protocol files by their path relative to the folder.
+
+    :param snapshot_folder: path to the snapshot folder, e.g., "./Siemens_Force\\UserProtocols_2020-06"
+    :param suffix_list: optional, e.g., ['.Adult', '.Child']: only the files whose path contains one of them are indexed;
+    all the files if None
+    :returns: dict, the index, {relative path: {"path": absolute path, "size": size in bytes, "mtime": modification time}},
+    the relative path being the path of the file with snapshot_folder removed from its start, e.g., "\\Body\\Abdomen.Adult"
+
+    """
+
+    prot_snapshot_index = {}
+    folder_stack = [snapshot_folder]
+
+    while folder_stack:
+        with os.scandir(folder_stack.pop()) as entry_iter:
+            for entry in entry_iter:
+                if entry.is_dir():
+                    folder_stack.append(entry.path)
+                    continue
+                if suffix_list is not None and not any(sub in entry.path for sub in suffix_list):
+                    continue
+                entry_stat = entry.stat()
+                prot_snapshot_index[entry.path[len(snapshot_folder):]] = {"path": os.path.abspath(entry.path),
+                                                                          "size": entry_stat.st_size,
+                                                                          "mtime": entry_stat.st_mtime}
+
+    return prot_snapshot_index
+
+def get_file_name_index(prot_snapshot_index):
+    """Index the files of a snapshot index by their file name, to find a protocol file anywhere in the snapshot folder,
+    as glob.glob(snapshot_folder + "\\**\\" + file_name, recursive=True) does.
+
+    :param prot_snapshot_index: index from build_prot_snapshot_index()
+    :returns: dict, {file name: list of the relative paths of the files with this name, sorted}
+
+    """
+
+    file_name_index = {}
+    for prot_rel_path in sorted(prot_snapshot_index):
+        file_name_index.setdefault(os.path.basename(prot_snapshot_index[prot_rel_path]["path"]), []).append(prot_rel_path)
+    return file_name_index
@@ -0,0 +1,135 @@
+# Filename: lookup_tbl_registry.py
+"""Summary: registry of the parameter lookup tables (para_lookup_tbl/*), each loaded and validated once per process,
+and loaded again only when its json file changes (modification time, then content hash). Both the original format and
+the compact v2 format (see lookup_tbl_v2.py) are read.
+
+
+"""
+
+import hashlib
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+from get_para_from_indiv_prot_xml import compile_extraction_plan_Siemens_Force
+from extractor_registry import bind_lookup_tbl_extractors
+from lookup_tbl_v2 import validate_lookup_tbl_v2
+from lookup_tbl_v2 import expand_lookup_tbl_v2
+from normalize_para_value import para_type_tuple
+from normalize_para_value import get_para_type_dict
+
+# lookup tables loaded in this process, {absolute path of the json file: lookup table object}
+lookup_tbl_registry = {}
+
+def validate_lookup_tbl(lookup_tbl, lookup_tbl_json_path=""):
+    """Check the structure of a lookup table, so that a bad table fails when it is loaded, not in the middle of a run.
+The xpaths of the Siemens rows must be valid ElementTree paths (the subset of XPath both xml backends read), and their
+ID attributes of the form "@Name"; the para_xpath of the GE rows must be a valid regex. The para_type of a row, if any,
+must be one of normalize_para_value.para_type_tuple.
+
+    :param lookup_tbl: lookup table, i.e., {key: [func_name, para_dict]}
+    :param lookup_tbl_json_path: path of its json file, for the error message
+    :returns: N/A, raises ValueError for the first bad row
+
+    """
+
+    if not isinstance(lookup_tbl, dict):
+        raise ValueError(lookup_tbl_json_path + ": a lookup table is a dict of {key: [func_name, para_dict]}")
+
+    for key, row in lookup_tbl.items():
+        if not (isinstance(row, (list, tuple)) and len(row) == 2):
+            raise ValueError(lookup_tbl_json_path + ": " + key + ": a row is [func_name, para_dict]")
+        if not isinstance(row[0], str):
+            raise ValueError(lookup_tbl_json_path + ": " + key + ": func_name is not a string")
+        if not (isinstance(row[1], dict) and isinstance(row[1].get("para_xpath"), str) and row[1]["para_xpath"]):
+            raise ValueError(lookup_tbl_json_path + ": " + key + ": para_dict has no para_xpath string")
+
+        func_name, para_dict = row
+        if para_dict.get("para_type", "auto") not in para_type_tuple:
+            raise ValueError(lookup_tbl_json_path + ": " + key + ": bad para_type " + repr(para_dict["para_type"]) + ", not one of " + repr(para_type_tuple))
+        if func_name == "get_para_from_indiv_prot_xml_Siemens_Force":
+            for field in ("para_xpath", "entry_node_xpath", "sub_node_xpath"):
+                try:
+                    if para_dict.get(field) is not None:
+                        ET.Element("root").findall(para_dict[field])
+                except (SyntaxError, TypeError, KeyError) as e:
+                    raise ValueError(lookup_tbl_json_path + ": " + key + ": bad " + field + " " + repr(para_dict[field]) + ", " + repr(e))
+            for field in ("entry_node_id_attrib", "sub_node_id_attrib"):
+                if para_dict.get(field) not in (None, "") and not re.fullmatch(r"@[A-Za-z_][\w.-]*", str(para_dict[field])):
+                    raise ValueError(lookup_tbl_json_path + ": " + key + ": bad " + field + " " + repr(para_dict[field]))
+        elif func_name == "get_para_from_indiv_prot_xml_GE_Optima":
+            try:
+                re.compile(para_dict["para_xpath"])
+            except re.error as e:
+                raise ValueError(lookup_tbl_json_path + ": " + key + ": bad para_xpath regex " + repr(para_dict["para_xpath"]) + ", " + str(e))
+
+def load_lookup_tbl(lookup_tbl_json_path):
+    """Get a lookup table from the registry, loading it if it is not loaded yet, or if its json file has changed since.
+    A file with a new modification time but the same content is not loaded again. A v2 table is expanded into its rows
+    once, when it is loaded.
+
+    :param lookup_tbl_json_path: path to the lookup table json file, or a lookup table object from load_lookup_tbl(),
+    which is returned as is
+    :returns: dict, the lookup table object:
+    {"path": absolute path of the json file,
+     "mtime_ns": modification time of the json file, in ns,
+     "size": size of the json file, in bytes,
+     "hash": hex string of the sha256 of the json file,
+     "lookup_tbl": the lookup table, {key: [func_name, para_dict]}, expanded from the v2 format if needed,
+     "extractor_list": its rows bound to their extractors, [(key, bound extractor)], see
+     extractor_registry.bind_lookup_tbl_extractors(),
+     "para_type_dict": the declared type of each parameter, {key: para_type}, see normalize_para_value.py},
+    plus what is derived from the table and kept with it, e.g., "extraction_plan"
+
+    """
+
+    if isinstance(lookup_tbl_json_path, dict):
+        return lookup_tbl_json_path
+
+    abs_path = os.path.abspath(lookup_tbl_json_path)
+    file_stat = os.stat(abs_path)
+    lookup_tbl_obj = lookup_tbl_registry.get(abs_path)
+
+    if lookup_tbl_obj is not None and (lookup_tbl_obj["mtime_ns"], lookup_tbl_obj["size"]) == (file_stat.st_mtime_ns, file_stat.st_size):
+        return lookup_tbl_obj
+
+    with open(abs_path, 'rb') as fp:
+        lookup_tbl_bytes = fp.read()
+    lookup_tbl_hash = hashlib.sha256(lookup_tbl_bytes).hexdigest()
+
+    if lookup_tbl_obj is not None and lookup_tbl_obj["hash"] == lookup_tbl_hash:
+        # touched, but not changed
+        lookup_tbl_obj["mtime_ns"] = file_stat.st_mtime_ns
+        lookup_tbl_obj["size"] = file_stat.st_size
+        return lookup_tbl_obj
+
+    lookup_tbl = json.loads(lookup_tbl_bytes)
+    if isinstance(lookup_tbl, dict) and "format_version" in lookup_tbl:
+        validate_lookup_tbl_v2(lookup_tbl, abs_path)
+        lookup_tbl = expand_lookup_tbl_v2(lookup_tbl)
+    validate_lookup_tbl(lookup_tbl, abs_path)
+
+    lookup_tbl_obj = {"path": abs_path,
+                      "mtime_ns": file_stat.st_mtime_ns,
+                      "size": file_stat.st_size,
+                      "hash": lookup_tbl_hash,
+                      "lookup_tbl": lookup_tbl,
+                      "extractor_list": bind_lookup_tbl_extractors(lookup_tbl),
+                      "para_type_dict": get_para_type_dict(lookup_tbl)}
+    lookup_tbl_registry[abs_path] = lookup_tbl_obj
+
+    return lookup_tbl_obj
+
+def get_extraction_plan_Siemens_Force(lookup_tbl_obj):
+    """Get the extraction plan of a Siemens Force lookup table, compiled once per loaded table.
+
+    :param lookup_tbl_obj: lookup table object from load_lookup_tbl()
+    :returns: dict, the extraction plan from compile_extraction_plan_Siemens_Force()
+
+    """
+
+    if "extraction_plan" not in lookup_tbl_obj:
+        lookup_tbl_obj["extraction_plan"] = compile_extraction_plan_Siemens_Force(lookup_tbl_obj["lookup_tbl"],
+                                                                                  lookup_tbl_obj["extractor_list"])
+
+    return lookup_tbl_obj["extraction_plan"]
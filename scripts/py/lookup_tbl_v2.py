@@ -0,0 +1,128 @@
+# Filename: lookup_tbl_v2.py
+"""Summary: compact (v2) format of the parameter lookup tables, with defaults shared by the whole table and by each
+section of it, instead of the same entry/sub-node xpaths repeated in every row, e.g.:
+
+{"format_version": 2,
+ "defaults": {"func_name": "get_para_from_indiv_prot_xml_Siemens_Force",
+              "entry_node_xpath": ".//MlModeEntryType",
+              "entry_node_id_attrib": "@EntryNo"},
+ "section_list": [{"defaults": {"sub_node_xpath": "./MlModeScanType"},
+                   "row_dict": {"Range": ".//RangeName",
+                                "kVp": {"para_xpath": ".//Voltage", "para_type": "int"}}},
+                  {"defaults": {"sub_node_xpath": "./MlModeReconType", "sub_node_id_attrib": "@ReconJob"},
+                   "row_dict": {"Kernel": ".//Kernel",
+                                "Series Description": {"para_xpath": ".//SeriesDescription", "para_type": "str"}}}]}
+
+A row is its para_xpath, or a dict of the fields it overrides (including para_xpath, and its para_type, if declared, see
+normalize_para_value.py); the fields of a row are the table defaults, then the section defaults, then its own. The rows keep the order of the sections and of their row_dict,
+which is the order of the parameters in the Excel file. lookup_tbl_registry.load_lookup_tbl() reads both formats.
+
+
+"""
+
+import json
+
+def validate_lookup_tbl_v2(lookup_tbl_v2, lookup_tbl_json_path=""):
+    """Check the structure of a v2 lookup table (the rows it expands to are checked by
+    lookup_tbl_registry.validate_lookup_tbl()).
+
+    :param lookup_tbl_v2: v2 lookup table
+    :param lookup_tbl_json_path: path of its json file, for the error message
+    :returns: N/A, raises ValueError for the first error
+
+    """
+
+    if not (isinstance(lookup_tbl_v2, dict) and lookup_tbl_v2.get("format_version") == 2):
+        raise ValueError(lookup_tbl_json_path + ": not a v2 lookup table, its format_version is not 2")
+    if not isinstance(lookup_tbl_v2.get("defaults", {}), dict):
+        raise ValueError(lookup_tbl_json_path + ": defaults is not a dict")
+    if not isinstance(lookup_tbl_v2.get("section_list"), list):
+        raise ValueError(lookup_tbl_json_path + ": section_list is not a list")
+
+    key_set = set()
+    for i, section in enumerate(lookup_tbl_v2["section_list"]):
+        if not (isinstance(section, dict) and isinstance(section.get("defaults", {}), dict) and isinstance(section.get("row_dict"), dict)):
+            raise ValueError(lookup_tbl_json_path + ": section " + str(i) + " is not {\"defaults\": dict, \"row_dict\": dict}")
+        for key, row in section["row_dict"].items():
+            if not isinstance(row, (str, dict)):
+                raise ValueError(lookup_tbl_json_path + ": " + key + ": a row is its para_xpath, or a dict of its fields")
+            if key in key_set:
+                raise ValueError(lookup_tbl_json_path + ": " + key + ": found in more than one section")
+            key_set.add(key)
+
+def expand_lookup_tbl_v2(lookup_tbl_v2):
+    """Expand a v2 lookup table into the rows of the original format.
+
+    :param lookup_tbl_v2: v2 lookup table, checked by validate_lookup_tbl_v2()
+    :returns: dict, the lookup table, {key: [func_name, para_dict]}
+
+    """
+
+    lookup_tbl = {}
+    for section in lookup_tbl_v2["section_list"]:
+        section_defaults = dict(lookup_tbl_v2.get("defaults", {}), **section.get("defaults", {}))
+        for key, row in section["row_dict"].items():
+            para_dict = dict(section_defaults, **({"para_xpath": row} if isinstance(row, str) else row))
+            lookup_tbl[key] = [para_dict.pop("func_name", None), para_dict]
+
+    return lookup_tbl
+
+def convert_lookup_tbl_to_v2(lookup_tbl):
+    """Convert a lookup table of the original format to the v2 format: the fields found with the same value in every
+    row become the table defaults, and each run of consecutive rows sharing the same other fields (but para_xpath)
+    becomes a section with these fields as its defaults. para_xpath and para_type stay in their row. expand_lookup_tbl_v2()
+    gives back the same rows.
+
+    :param lookup_tbl: lookup table, {key: [func_name, para_dict]}
+    :returns: dict, the v2 lookup table
+
+    """
+
+    row_field_list = [dict(para_dict, func_name=func_name) for (func_name, para_dict) in lookup_tbl.values()]
+    row_only_field_tuple = ("para_xpath", "para_type")
+
+    table_defaults = {}
+    if row_field_list:
+        for field, value in row_field_list[0].items():
+            if field not in row_only_field_tuple and all(field in row_fields and row_fields[field] == value for row_fields in row_field_list):
+                table_defaults[field] = value
+
+    section_list = []
+    for key, row_fields in zip(lookup_tbl, row_field_list):
+        section_defaults = {field: value for (field, value) in row_fields.items()
+                            if field not in row_only_field_tuple and field not in table_defaults}
+        if not section_list or section_list[-1]["defaults"] != section_defaults:
+            section_list.append({"defaults": section_defaults, "row_dict": {}})
+        row = {field: row_fields[field] for field in row_only_field_tuple if field in row_fields}
+        section_list[-1]["row_dict"][key] = row if len(row) > 1 else row_fields["para_xpath"]
+
+    return {"format_version": 2,
+            "defaults": table_defaults,
+            "section_list": section_list}
+
+if __name__ == "__main__":
+
+    ############## USER INPUT DATA BELOW #################################################################
+    # lookup tables of the original format to convert to the v2 format, in place
+    lookup_tbl_json_path_list = ["./para_lookup_tbl/Siemens/topo_lookup_tbl.json",
+                                 "./para_lookup_tbl/Siemens/scan_lookup_tbl.json",
+                                 "./para_lookup_tbl/Siemens/scan_AB_lookup_tbl.json",
+                                 "./para_lookup_tbl/Siemens/recon_lookup_tbl.json",
+                                 "./para_lookup_tbl/Siemens/monitoring_scan_lookup_tbl.json",
+                                 "./para_lookup_tbl/Siemens/monitoring_C_scan_lookup_tbl.json",
+                                 "./para_lookup_tbl/Siemens/bolus_lookup_tbl.json"]
+    ######################################################################################################
+
+    for lookup_tbl_json_path in lookup_tbl_json_path_list:
+        with open(lookup_tbl_json_path, 'r') as fp:
+            lookup_tbl = json.load(fp)
+        if isinstance(lookup_tbl, dict) and lookup_tbl.get("format_version") == 2:
+            print(lookup_tbl_json_path, "is already in the v2 format")
+            continue
+
+        lookup_tbl_v2 = convert_lookup_tbl_to_v2(lookup_tbl)
+        assert expand_lookup_tbl_v2(lookup_tbl_v2) == {key: list(row) for (key, row) in lookup_tbl.items()}
+
+        with open(lookup_tbl_json_path, 'w') as fp:
+            json.dump(lookup_tbl_v2, fp, indent=4)
+        print("converted", lookup_tbl_json_path, "to the v2 format")
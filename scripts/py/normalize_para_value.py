@@ -0,0 +1,72 @@
+# Filename: normalize_para_value.py
+"""Summary: normalization of the extracted parameter values, done once when a series is extracted, so that the
+intermediate files hold typed values (int, float, or string without its quotes) and the Excel writers (and any diff of
+the parsing results) do not parse the raw text of every value again. The type of a parameter is declared by the
+optional "para_type" field of its row in the lookup table:
+
+"auto" (default): int if the text is an integer, float if it is a decimal number, the string without quotes otherwise,
+                  i.e., what the Excel writers did with every value
+"int":            int if the text is an integral number, e.g., "120" or "120.0"; otherwise as "auto"
+"float":          float if the text is a number; otherwise as "auto"
+"str":            the string without quotes, never a number, e.g., a series description "1.0" or a kernel
+
+
+"""
+
+import re
+
+para_type_tuple = ("auto", "int", "float", "str")
+
+# what the Excel writers took for an integer/decimal number, before converting it with int()/float()
+int_text_pattern = re.compile(r"^\s*\d+\s*$")
+float_text_pattern = re.compile(r"^\s*(\d*\.\d+)|(\d+\.\d*)\s*$")
+
+def get_float(para_text):
+    """:returns: float(para_text), or None if it is not a number"""
+
+    try:
+        return float(para_text)
+    except (TypeError, ValueError):
+        return None
+
+def normalize_para_value(para_text, para_type="auto"):
+    """Normalize the raw text of a parameter into its typed value.
+
+    :param para_text: raw text extracted from the protocol file, e.g., '"Topogram"' or '120', or None if not found;
+    a value which is not a string (already normalized) is returned as is
+    :param para_type: declared type of the parameter, one of para_type_tuple
+    :returns: int, float, str without quotes, or None
+
+    """
+
+    if not isinstance(para_text, str):
+        return para_text
+
+    para_value = para_text.replace('"', '')
+
+    if para_type == "str":
+        return para_value
+
+    float_value = get_float(para_value)
+
+    if para_type == "float" and float_value is not None:
+        return float_value
+    if para_type == "int" and float_value is not None and float_value.is_integer():
+        return int(float_value)
+
+    if int_text_pattern.search(para_value) and float_value is not None and float_value.is_integer():
+        return int(para_value)
+    elif float_text_pattern.search(para_value) and float_value is not None:
+        return float_value
+    else:
+        return para_value
+
+def get_para_type_dict(lookup_tbl):
+    """Get the declared type of each parameter of a lookup table.
+
+    :param lookup_tbl: lookup table, i.e., {key: [func_name, para_dict]}
+    :returns: dict, {key: para_type}, "auto" for the rows declaring none
+
+    """
+
+    return {key: para_dict.get("para_type", "auto") for (key, (func_name, para_dict)) in lookup_tbl.items()}
@@ -0,0 +1,175 @@
+# Filename: pivot_prot_fleet.py
+"""Summary: fleet-wide pivot of chosen parameters (lookup table keys, e.g., "kVp", "Kernel") across all the protocols
+of one or more snapshot folders, e.g., the kVp of every main scan of every protocol, instead of opening thousands of
+Excel files. Each snapshot folder is indexed once (see index_prot_snapshot.py), its protocols are extracted in
+parallel, through the persistent parsing cache, and the chosen parameters of their series are gathered into one pandas
+DataFrame, indexed by snapshot, protocol and series, which is saved as one csv file or Excel sheet.
+
+
+"""
+
+import concurrent.futures
+import functools
+import traceback
+from diff_prot_pair import get_series_kind_Siemens
+from diff_prot_pair import index_series_by_kind
+from index_prot_snapshot import build_prot_snapshot_index
+from convert_protocol_from_indiv_prot_xml_to_json_xlsx_ANALYZE_BeforeAfter_GenCardioDE import get_prot_dict_list_BeforeAfter
+
+# index of the rows of the pivot: one row per series of each protocol of each snapshot
+prot_fleet_index_list = ["snapshot_name", "prot_rel_path", "series_kind", "series_index"]
+
+# number of protocols sent to a worker process at once
+default_chunk_size = 32
+
+def extract_prot_fleet_row_list(prot_task, get_prot_dict_list, para_key_list, get_series_kind=get_series_kind_Siemens, series_kind_set=None):
+    """Extract the rows of the pivot of one protocol file, catching its errors, so that one bad protocol file does not
+    abort the whole fleet.
+
+    :param prot_task: (snapshot name, relative path of the protocol file, path of the protocol file)
+    :param get_prot_dict_list: function parsing a protocol file, called as get_prot_dict_list(prot_rel_path, path),
+    and returning its list of dict, each dict being a scan or recon series, e.g.,
+    get_prot_dict_list_BeforeAfter() of the BeforeAfter module
+    :param para_key_list: parameters of the pivot, e.g., ["kVp", "Kernel"]
+    :param get_series_kind: function, e.g., diff_prot_pair.get_series_kind_Siemens()
+    :param series_kind_set: optional, the series kinds of the pivot, e.g., {"scan"} for the main scans; all if None
+    :returns: (list of rows, each a tuple of the index values of prot_fleet_index_list then of the parameter values,
+    None where a series does not have the parameter; traceback of the error, None if success)
+
+    """
+
+    snapshot_name, prot_rel_path, prot_path = prot_task
+
+    try:
+        prot_dict_list = get_prot_dict_list(prot_rel_path, prot_path)
+    except Exception:
+        return [], traceback.format_exc()
+
+    row_list = []
+    for ((series_kind, series_index), i) in sorted(index_series_by_kind(prot_dict_list, get_series_kind).items(), key=lambda item: item[1]):
+        if series_kind_set is not None and series_kind not in series_kind_set:
+            continue
+        se = prot_dict_list[i]
+        row_list.append((snapshot_name, prot_rel_path, series_kind, ".".join([str(k) for k in series_index]))
+                        + tuple(se.get(para) for para in para_key_list))
+
+    return row_list, None
+
+def build_prot_fleet_pivot(snapshot_folder_dict,
+                           para_key_list,
+                           get_prot_dict_list,
+                           get_series_kind=get_series_kind_Siemens,
+                           series_kind_set=None,
+                           suffix_list=None,
+                           worker_num=None):
+    """Build the pivot of the chosen parameters of all the protocols of the snapshot folders, the protocols being
+    extracted in parallel, with a pool of worker processes.
+
+    :param snapshot_folder_dict: dict, {snapshot name: path of the snapshot folder}
+    :param para_key_list: parameters of the pivot, e.g., ["kVp", "Kernel"]
+    :param get_prot_dict_list: function parsing a protocol file, see extract_prot_fleet_row_list(), to be picklable for
+    the worker processes, e.g., functools.partial(get_prot_dict_list_BeforeAfter, prot_cache_folder=...)
+    :param get_series_kind: function, e.g., diff_prot_pair.get_series_kind_Siemens()
+    :param series_kind_set: optional, the series kinds of the pivot, e.g., {"scan"} for the main scans; all if None
+    :param suffix_list: optional, e.g., ['.Adult', '.Child']: only the files whose path contains one of them; all the
+    files if None
+    :param worker_num: number of worker processes, one per CPU core if None; if 1, the protocols are extracted one at a
+    time in this process
+    :returns: (pandas.DataFrame, indexed by prot_fleet_index_list, one column per parameter, the columns of numbers
+    being numeric; list of (snapshot name, relative path of the protocol file, traceback) of the protocols which
+    failed)
+
+    """
+
+    # imported here, not with the module, so that the worker processes do not load pandas (slow to import)
+    import pandas as pd
+
+    prot_task_list = []
+    for snapshot_name, snapshot_folder in snapshot_folder_dict.items():
+        prot_snapshot_index = build_prot_snapshot_index(snapshot_folder, suffix_list=suffix_list)
+        prot_task_list += [(snapshot_name, prot_rel_path, prot_snapshot_index[prot_rel_path]["path"]) for prot_rel_path in sorted(prot_snapshot_index)]
+
+    extract_row_list = functools.partial(extract_prot_fleet_row_list,
+                                         get_prot_dict_list=get_prot_dict_list,
+                                         para_key_list=para_key_list,
+                                         get_series_kind=get_series_kind,
+                                         series_kind_set=series_kind_set)
+
+    if worker_num == 1:
+        result_list = [extract_row_list(prot_task) for prot_task in prot_task_list]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=worker_num) as executor:
+            result_list = list(executor.map(extract_row_list, prot_task_list, chunksize=default_chunk_size))
+
+    row_list = [row for (prot_row_list, error) in result_list for row in prot_row_list]
+    failed_prot_list = [(prot_task[0], prot_task[1], error) for (prot_task, (prot_row_list, error)) in zip(prot_task_list, result_list)
+                        if error is not None]
+
+    prot_fleet_pivot = pd.DataFrame.from_records(row_list, columns=prot_fleet_index_list + list(para_key_list))
+    prot_fleet_pivot = prot_fleet_pivot.set_index(prot_fleet_index_list).infer_objects()
+
+    return prot_fleet_pivot, failed_prot_list
+
+def pivot_prot_fleet_by_snapshot(prot_fleet_pivot):
+    """Put the snapshots side by side, e.g., to compare the kVp of each main scan between the snapshots.
+
+    :param prot_fleet_pivot: DataFrame from build_prot_fleet_pivot()
+    :returns: pandas.DataFrame, indexed by protocol and series, with the columns (parameter, snapshot name)
+
+    """
+
+    return prot_fleet_pivot.unstack("snapshot_name")
+
+def store_prot_fleet_pivot(prot_fleet_pivot, output_path, sheet_name="pivot"):
+    """Save the pivot as a csv file, or as a sheet of an Excel file if output_path ends with .xlsx.
+
+    :param prot_fleet_pivot: DataFrame from build_prot_fleet_pivot() or pivot_prot_fleet_by_snapshot()
+    :param output_path: path of the csv or Excel file
+    :param sheet_name: name of the sheet of the Excel file
+    :returns: N/A
+
+    """
+
+    if output_path.endswith(".xlsx"):
+        prot_fleet_pivot.to_excel(output_path, sheet_name=sheet_name, engine="xlsxwriter", merge_cells=False)
+    else:
+        prot_fleet_pivot.to_csv(output_path)
+
+if __name__ == "__main__":
+
+    ############## USER INPUT DATA BELOW #################################################################
+    # the snapshots of the pivot, e.g., one per scanner or one per export
+    snapshot_name_list = ['UserProtocols_2020-06',
+                          'UserProtocols_2022-02-09']
+    protocol_file_folder = "./Siemens_Force"
+    # lookup table keys of the pivot
+    para_key_list = ["Range", "kVp", "Qref mAs", "Pitch", "Kernel", "Slice Thickness (mm)"]
+    # series kinds of the pivot, e.g., {"scan"} for the main scans only; None for all the series
+    series_kind_set = None
+    # whether to put the snapshots side by side, one column per parameter and snapshot
+    bool_pivot_by_snapshot = False
+    # csv file, or Excel file (.xlsx) of one pivot sheet
+    output_pivot_path = "\\prot_fleet_pivot.csv"
+    # persistent parsing cache, see cache_prot_dict_list.py
+    prot_cache_path = "\\prot_cache\\"
+    # number of worker processes, one per CPU core if None, 1 for one protocol at a time in this process
+    worker_num = None
+    ######################################################################################################
+
+    prot_fleet_pivot, failed_prot_list = build_prot_fleet_pivot({snapshot_name: protocol_file_folder + "\\" + snapshot_name for snapshot_name in snapshot_name_list},
+                                                                para_key_list,
+                                                                functools.partial(get_prot_dict_list_BeforeAfter, prot_cache_folder=protocol_file_folder + prot_cache_path),
+                                                                series_kind_set=series_kind_set,
+                                                                suffix_list=['.Adult', '.Child'],
+                                                                worker_num=worker_num)
+
+    print("\nPivot of", len(prot_fleet_pivot), "series of", prot_fleet_pivot.index.droplevel(["series_kind", "series_index"]).nunique(), "protocols,",
+          len(failed_prot_list), "failed")
+    for snapshot_name, prot_rel_path, error in failed_prot_list:
+        print("\nFailed:", snapshot_name, prot_rel_path)
+        print(error)
+
+    if bool_pivot_by_snapshot:
+        prot_fleet_pivot = pivot_prot_fleet_by_snapshot(prot_fleet_pivot)
+
+    store_prot_fleet_pivot(prot_fleet_pivot, protocol_file_folder + output_pivot_path)
@@ -0,0 +1,200 @@
+# Filename: prot_catalog.py
+"""Summary: local SQLite catalog of the parsing results of the protocol snapshots, one row per protocol file, per
+series and per parameter, with indexes on the parameter keys and values, so that the whole fleet can be queried at
+once, e.g., which protocols use kernel Br40 at 120 kVp across all the snapshots, instead of opening every json or Excel
+file. Each snapshot is updated incrementally: only its new or changed protocol files are parsed and loaded again.
+
+
+"""
+
+import sqlite3
+import traceback
+
+# version of the catalog tables, to be increased when they change, so that an older catalog is rebuilt; 2: typed
+# parameter values
+prot_catalog_version = 2
+
+prot_catalog_schema = """
+CREATE TABLE IF NOT EXISTS protocol (
+    protocol_id INTEGER PRIMARY KEY,
+    snapshot_name TEXT NOT NULL,
+    prot_rel_path TEXT NOT NULL,
+    prot_path TEXT,
+    size INTEGER,
+    mtime REAL,
+    parser_id TEXT,
+    UNIQUE (snapshot_name, prot_rel_path)
+);
+CREATE TABLE IF NOT EXISTS series (
+    series_id INTEGER PRIMARY KEY,
+    protocol_id INTEGER NOT NULL REFERENCES protocol (protocol_id) ON DELETE CASCADE,
+    series_index INTEGER NOT NULL,
+    UNIQUE (protocol_id, series_index)
+);
+CREATE TABLE IF NOT EXISTS parameter (
+    series_id INTEGER NOT NULL REFERENCES series (series_id) ON DELETE CASCADE,
+    para_index INTEGER NOT NULL,
+    para_key TEXT NOT NULL,
+    para_value,
+    PRIMARY KEY (series_id, para_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS parameter_key_value_index ON parameter (para_key, para_value);
+"""
+
+def get_catalog_para_value(para_value):
+    """:returns: the parameter value as stored in the catalog, as is, but an int too large for SQLite, stored as its text"""
+
+    if isinstance(para_value, int) and not -2**63 <= para_value < 2**63:
+        return str(para_value)
+    return para_value
+
+def open_prot_catalog(prot_catalog_path):
+    """Open the catalog database, creating its tables if it is new, and dropping them first if they are of an older
+    prot_catalog_version.
+
+    :param prot_catalog_path: path of the SQLite database file
+    :returns: sqlite3.Connection, to be closed by the caller
+
+    """
+
+    conn = sqlite3.connect(prot_catalog_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+
+    if conn.execute("PRAGMA user_version").fetchone()[0] != prot_catalog_version:
+        with conn:
+            conn.executescript("DROP TABLE IF EXISTS parameter; DROP TABLE IF EXISTS series; DROP TABLE IF EXISTS protocol;")
+    conn.executescript(prot_catalog_schema)
+    conn.execute("PRAGMA user_version = " + str(prot_catalog_version))
+
+    return conn
+
+def upsert_prot_catalog(conn, snapshot_name, prot_rel_path, prot_dict_list, prot_info=None, parser_id=None):
+    """Load the parsing result of a protocol file into the catalog, replacing the one stored before, if any. The caller
+    commits.
+
+    :param conn: connection from open_prot_catalog()
+    :param snapshot_name: name of the snapshot, e.g., "UserProtocols_2020-06"
+    :param prot_rel_path: path of the protocol file relative to the snapshot folder
+    :param prot_dict_list: list of dict, each dict being a scan or recon series
+    :param prot_info: optional, the entry of the protocol file in the snapshot index, {"path", "size", "mtime"}, see
+    index_prot_snapshot.build_prot_snapshot_index()
+    :param parser_id: optional, id of the parsing, e.g., the hash of the lookup tables
+    :returns: protocol_id of the protocol in the catalog
+
+    """
+
+    prot_info = prot_info or {}
+    conn.execute("INSERT INTO protocol (snapshot_name, prot_rel_path, prot_path, size, mtime, parser_id) VALUES (?, ?, ?, ?, ?, ?) "
+                 "ON CONFLICT (snapshot_name, prot_rel_path) DO UPDATE SET "
+                 "prot_path = excluded.prot_path, size = excluded.size, mtime = excluded.mtime, parser_id = excluded.parser_id",
+                 (snapshot_name, prot_rel_path, prot_info.get("path"), prot_info.get("size"), prot_info.get("mtime"), parser_id))
+    protocol_id = conn.execute("SELECT protocol_id FROM protocol WHERE snapshot_name = ? AND prot_rel_path = ?",
+                               (snapshot_name, prot_rel_path)).fetchone()[0]
+
+    # the series of the parameters are deleted with them
+    conn.execute("DELETE FROM series WHERE protocol_id = ?", (protocol_id,))
+
+    for series_index, prot_dict in enumerate(prot_dict_list):
+        series_id = conn.execute("INSERT INTO series (protocol_id, series_index) VALUES (?, ?)",
+                                 (protocol_id, series_index)).lastrowid
+        conn.executemany("INSERT INTO parameter (series_id, para_index, para_key, para_value) VALUES (?, ?, ?, ?)",
+                         [(series_id, para_index, para_key, get_catalog_para_value(para_value))
+                          for para_index, (para_key, para_value) in enumerate(prot_dict.items())])
+
+    return protocol_id
+
+def update_snapshot_prot_catalog(conn, snapshot_name, prot_snapshot_index, get_prot_dict_list, parser_id=None):
+    """Update the catalog with a protocol snapshot, in one transaction: the protocol files which are new, or whose
+    size, modification time or parser_id changed since they were loaded, are parsed and loaded again; the protocols no
+    longer in the snapshot are deleted. A protocol file that fails to parse is reported and does not stop the others.
+
+    :param conn: connection from open_prot_catalog()
+    :param snapshot_name: name of the snapshot, e.g., "UserProtocols_2020-06"
+    :param prot_snapshot_index: index of the snapshot folder, from index_prot_snapshot.build_prot_snapshot_index()
+    :param get_prot_dict_list: function parsing a protocol file, called as get_prot_dict_list(prot_rel_path, path),
+    and returning its list of dict, each dict being a scan or recon series
+    :param parser_id: optional, id of the parsing, e.g., the hash of the lookup tables: the protocols loaded with another
+    one are parsed again
+    :returns: dict, {"loaded": relative paths of the protocols (re)loaded, "unchanged": number of the protocols not
+    parsed again, "deleted": relative paths of the protocols deleted, "failed": list of (relative path, traceback)}
+
+    """
+
+    update_result = {"loaded": [], "unchanged": 0, "deleted": [], "failed": []}
+
+    stored_prot_dict = {row[0]: row[1:] for row in conn.execute("SELECT prot_rel_path, size, mtime, parser_id FROM protocol WHERE snapshot_name = ?",
+                                                                (snapshot_name,))}
+
+    with conn:
+        for prot_rel_path, prot_info in prot_snapshot_index.items():
+            if stored_prot_dict.get(prot_rel_path) == (prot_info["size"], prot_info["mtime"], parser_id):
+                update_result["unchanged"] += 1
+                continue
+            try:
+                prot_dict_list = get_prot_dict_list(prot_rel_path, prot_info["path"])
+            except Exception:
+                update_result["failed"].append((prot_rel_path, traceback.format_exc()))
+                continue
+            upsert_prot_catalog(conn, snapshot_name, prot_rel_path, prot_dict_list, prot_info=prot_info, parser_id=parser_id)
+            update_result["loaded"].append(prot_rel_path)
+
+        for prot_rel_path in stored_prot_dict:
+            if prot_rel_path not in prot_snapshot_index:
+                conn.execute("DELETE FROM protocol WHERE snapshot_name = ? AND prot_rel_path = ?", (snapshot_name, prot_rel_path))
+                update_result["deleted"].append(prot_rel_path)
+
+    return update_result
+
+def query_prot_catalog(conn, para_value_dict, snapshot_name_list=None):
+    """Find the series having all the given parameter values, e.g., {"Kernel": "Br40", "kVp": 120}. The values are
+    compared as stored, i.e., typed as they appear in the Excel files (see normalize_para_value.py): numbers match
+    numbers (120 matches 120.0), strings match strings.
+
+    :param conn: connection from open_prot_catalog()
+    :param para_value_dict: dict, {parameter key: value}
+    :param snapshot_name_list: optional, only the series of these snapshots; all the snapshots if None
+    :returns: list of (snapshot name, relative path of the protocol file, series index), sorted
+
+    """
+
+    sql = "SELECT p.snapshot_name, p.prot_rel_path, s.series_index FROM series s JOIN protocol p ON p.protocol_id = s.protocol_id WHERE 1"
+    sql_para_list = []
+    for para_key, para_value in para_value_dict.items():
+        sql += " AND s.series_id IN (SELECT series_id FROM parameter WHERE para_key = ? AND para_value = ?)"
+        sql_para_list += [para_key, para_value]
+    if snapshot_name_list is not None:
+        sql += " AND p.snapshot_name IN (" + ", ".join("?" * len(snapshot_name_list)) + ")"
+        sql_para_list += list(snapshot_name_list)
+    sql += " ORDER BY p.snapshot_name, p.prot_rel_path, s.series_index"
+
+    return conn.execute(sql, sql_para_list).fetchall()
+
+def load_prot_dict_list_from_catalog(conn, snapshot_name, prot_rel_path):
+    """Read back the parsing result of a protocol file from the catalog.
+
+    :param conn: connection from open_prot_catalog()
+    :param snapshot_name: name of the snapshot
+    :param prot_rel_path: path of the protocol file relative to the snapshot folder
+    :returns: list of dict, each dict being a scan or recon series, in their original order, or None if it is not in the
+    catalog
+
+    """
+
+    row = conn.execute("SELECT protocol_id FROM protocol WHERE snapshot_name = ? AND prot_rel_path = ?",
+                       (snapshot_name, prot_rel_path)).fetchone()
+    if row is None:
+        return None
+
+    prot_dict_list = []
+    series_id = None
+    for row_series_id, para_key, para_value in conn.execute("SELECT s.series_id, a.para_key, a.para_value FROM series s "
+                                                            "LEFT JOIN parameter a ON a.series_id = s.series_id "
+                                                            "WHERE s.protocol_id = ? ORDER BY s.series_index, a.para_index",
+                                                            (row[0],)):
+        if row_series_id != series_id:
+            series_id = row_series_id
+            prot_dict_list.append({})
+        if para_key is not None:
+            prot_dict_list[-1][para_key] = para_value
+
+    return prot_dict_list
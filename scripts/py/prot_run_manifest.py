@@ -0,0 +1,105 @@
+# Filename: prot_run_manifest.py
+"""Summary: run manifest of a batch conversion of protocol pairs, recording for each pair the content hashes of its
+protocol files, its output paths and its status, so that a run stopped halfway, or run again on new exports, only
+converts the pairs which failed, are new, or whose protocol files changed, and leaves the valid outputs alone. The
+manifest is saved as a json file along the run, and is only valid for the same run id, i.e., the same lookup tables
+and options of the outputs.
+
+
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+# version of the manifest file, to be increased when its entries change, so that an older manifest is ignored
+prot_run_manifest_version = 1
+
+def get_run_id(run_option_dict):
+    """Id of the options of a run which change its outputs, e.g., the lookup table hash, the snapshot names and the
+    layout of the Excel files: the manifest of a run with other options is ignored.
+
+    :param run_option_dict: dict of the options, json serializable
+    :returns: hex string of the sha256 of the options
+
+    """
+
+    return hashlib.sha256(json.dumps(run_option_dict, sort_keys=True, default=str).encode()).hexdigest()
+
+def load_prot_run_manifest(manifest_path, run_id):
+    """Load the entries of the manifest of the previous runs.
+
+    :param manifest_path: path of the manifest json file
+    :param run_id: id of this run, from get_run_id()
+    :returns: dict, {relative path of the protocol file: entry, see get_prot_run_entry()}, empty if there is no
+    manifest, or if it is unreadable, of another prot_run_manifest_version or of another run id
+
+    """
+
+    try:
+        with open(manifest_path, 'r') as fp:
+            prot_run_manifest = json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+    if prot_run_manifest.get("version") != prot_run_manifest_version or prot_run_manifest.get("run_id") != run_id:
+        return {}
+
+    return prot_run_manifest["prot_entry_dict"]
+
+def store_prot_run_manifest(manifest_path, run_id, prot_entry_dict):
+    """Save the manifest. The json file is written aside and then renamed, so that an interrupted run never leaves a
+    partial manifest behind.
+
+    :param manifest_path: path of the manifest json file
+    :param run_id: id of this run, from get_run_id()
+    :param prot_entry_dict: dict, {relative path of the protocol file: entry, see get_prot_run_entry()}
+    :returns: N/A
+
+    """
+
+    manifest_folder = os.path.dirname(os.path.abspath(manifest_path))
+    os.makedirs(manifest_folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=manifest_folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as fp:
+            json.dump({"version": prot_run_manifest_version, "run_id": run_id, "prot_entry_dict": prot_entry_dict}, fp)
+        os.replace(tmp_path, manifest_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def get_prot_run_entry(input_hash_list, output_path_list, status, prot_change_state=None):
+    """Entry of a protocol pair in the manifest.
+
+    :param input_hash_list: content hashes of the protocol files of the pair, from cache_prot_dict_list.get_file_hash()
+    :param output_path_list: paths of the files written for the pair, e.g., its json and Excel files
+    :param status: "success" or "failure"
+    :param prot_change_state: "identical", "equivalent" or "changed", None if failure
+    :returns: dict, {"input_hash_list", "output_path_list", "status", "prot_change_state"}
+
+    """
+
+    return {"input_hash_list": list(input_hash_list),
+            "output_path_list": list(output_path_list),
+            "status": status,
+            "prot_change_state": prot_change_state}
+
+def is_prot_run_current(prot_run_entry, input_hash_list, output_path_list):
+    """Whether the outputs of a protocol pair in the manifest are still valid, i.e., its conversion succeeded, its
+    protocol files did not change since, its outputs are those the run would write now, and all its output files are
+    still there.
+
+    :param prot_run_entry: entry of the pair in the manifest, None if not found
+    :param input_hash_list: content hashes of the protocol files of the pair now
+    :param output_path_list: paths of the files the run would write now for the pair, as recorded in the entry
+    :returns: bool
+
+    """
+
+    return (prot_run_entry is not None
+            and prot_run_entry["status"] == "success"
+            and prot_run_entry["input_hash_list"] == list(input_hash_list)
+            and prot_run_entry["output_path_list"] == list(output_path_list)
+            and all([os.path.exists(output_path) for output_path in prot_run_entry["output_path_list"]]))
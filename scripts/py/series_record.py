@@ -0,0 +1,87 @@
+# Filename: series_record.py
+"""Summary: compact record of one parsed series (localizer, monitoring, scan, recon or bolus series), with its kind, ids
+and parameter values in the lookup table order, instead of a pandas Series per series. The records of the same lookup
+table share one tuple of parameter keys, so each record only holds its values. pandas is only needed to export records
+as a DataFrame, with series_record_list_to_data_frame().
+
+
+"""
+
+# tuples of parameter keys shared by the records, {key tuple: the same key tuple}
+key_tuple_registry = {}
+
+class SeriesRecord(object):
+    """One parsed series, read like a read-only dict of its parameters, e.g., record["Kernel"], record.get("kVp"),
+    record.items(). The values are the ones of the dict it was made from, at the time it was made.
+
+    """
+
+    __slots__ = ("series_kind", "series_id", "key_tuple", "value_tuple")
+
+    def __init__(self, series_kind, para_dict, series_id=()):
+        """
+        :param series_kind: kind of the series, e.g., "topo", "monitoring", "scan", "recon" or "bolus"
+        :param para_dict: dict, {parameter key: value}, in the lookup table order
+        :param series_id: tuple of the ids of the series in its protocol, e.g., (EntryNo, ReconJob) for Siemens
+
+        """
+
+        key_tuple = tuple(para_dict)
+        self.series_kind = series_kind
+        self.series_id = series_id
+        self.key_tuple = key_tuple_registry.setdefault(key_tuple, key_tuple)
+        self.value_tuple = tuple(para_dict.values())
+
+    def __len__(self):
+        return len(self.key_tuple)
+
+    def __iter__(self):
+        return iter(self.key_tuple)
+
+    def __contains__(self, key):
+        return key in self.key_tuple
+
+    def __getitem__(self, key):
+        try:
+            return self.value_tuple[self.key_tuple.index(key)]
+        except ValueError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self.key_tuple else default
+
+    def keys(self):
+        return self.key_tuple
+
+    def values(self):
+        return self.value_tuple
+
+    def items(self):
+        return zip(self.key_tuple, self.value_tuple)
+
+    def to_dict(self):
+        """:returns: dict, {parameter key: value}, in the lookup table order"""
+
+        return dict(zip(self.key_tuple, self.value_tuple))
+
+    def __repr__(self):
+        return "SeriesRecord(" + repr(self.series_kind) + ", " + repr(self.to_dict()) + ", series_id=" + repr(self.series_id) + ")"
+
+    def __str__(self):
+        # one line per parameter, as a printed pandas Series
+        key_width = max([len(str(key)) for key in self.key_tuple], default=0)
+        return "\n".join(str(key).ljust(key_width) + "    " + str(value) for (key, value) in self.items())
+
+def series_record_list_to_data_frame(series_record_list):
+    """Export series records as a pandas DataFrame, one row per series, with the series kind and ids.
+
+    :param series_record_list: list of SeriesRecord
+    :returns: pandas.DataFrame, with the columns "series_kind", "series_id", then the parameters in their first order
+
+    """
+
+    # imported here, not with the module, so that the converters do not load pandas (slow to import) in each process
+    import pandas as pd
+
+    return pd.DataFrame([dict(series_kind=series_record.series_kind, series_id=series_record.series_id, **series_record.to_dict())
+                         for series_record in series_record_list])
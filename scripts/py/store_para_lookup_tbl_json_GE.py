@@ -15,6 +15,7 @@ Structure of the
 import json
 
 topo_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_GE_Optima", {"para_xpath": "^groupType",
+                                                                        "para_type": "str",
                                                                         "in_group": True,
                                                                         "in_recon": False}),
 
@@ -34,11 +35,13 @@ topo_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_GE_Optima", {"para_xp
                    #                                                       "in_group": "True"}),
                    
                    "Series Description": ("get_para_from_indiv_prot_xml_GE_Optima", {"para_xpath": "^seriesDescriptionRecon",
+                                                                                     "para_type": "str",
                                                                                      "in_group": True,
                                                                                      "in_recon": False})
                    }
 
 scan_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_GE_Optima", {"para_xpath": "^seriesDescriptionRecon",
+                                                                        "para_type": "str",
                                                                         "in_group": True,
                                                                         "in_recon": False}),
                    # "Scan Mode": ("calculate_scan_para_Siemens_Force", {}),
@@ -143,6 +146,7 @@ scan_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_GE_Optima", {"para_xp
                    }
 
 recon_lookup_tbl = {"Series Description": ("get_para_from_indiv_prot_xml_GE_Optima", {"para_xpath": "^seriesDescriptionRecon",
+                                                                                      "para_type": "str",
                                                                                       "in_group": True,
                                                                                       "in_recon": True}),
                     
@@ -155,6 +159,7 @@ recon_lookup_tbl = {"Series Description": ("get_para_from_indiv_prot_xml_GE_Opti
                                                                                         "in_recon": True}),
                     
                     "Kernel": ("get_para_from_indiv_prot_xml_GE_Optima", {"para_xpath": "^algorithm",
+                                                                          "para_type": "str",
                                                                           "in_group": True,
                                                                           "in_recon": True}),
                     
@@ -241,6 +246,7 @@ recon_lookup_tbl = {"Series Description": ("get_para_from_indiv_prot_xml_GE_Opti
 
 # for pre-monitoring and monitoring scans
 monitoring_scan_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_Siemens_Force", {"para_xpath": ".//RangeName",
+                                                                                       "para_type": "str",
                                                                                        "entry_node_xpath": ".//MlModeEntryType",
                                                                                        "entry_node_id_attrib": "@EntryNo",
                                                                                        "sub_node_xpath": "./MlModeScanType"}),
@@ -324,6 +330,7 @@ monitoring_scan_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_Siemens_Fo
                               }
 
 de_scan_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_Siemens_Force", {"para_xpath": ".//RangeName",
+                                                                               "para_type": "str",
                                                                                "entry_node_xpath": ".//MlModeEntryType",
                                                                                "entry_node_id_attrib": "@EntryNo",
                                                                                "sub_node_xpath": "./MlModeScanType"}),
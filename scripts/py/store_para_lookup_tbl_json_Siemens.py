@@ -13,8 +13,10 @@ Structure of the
 # KV, MAS, FILTER(?)
 
 import json
+from lookup_tbl_v2 import convert_lookup_tbl_to_v2
 
 topo_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_Siemens_Force", {"para_xpath": ".//RangeName",
+                                                                            "para_type": "str",
                                                                             "entry_node_xpath": ".//MlModeEntryType",
                                                                             "entry_node_id_attrib": "@EntryNo",
                                                                             "sub_node_xpath": "./MlModeScanType"}),
@@ -34,11 +36,13 @@ topo_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_Siemens_Force", {"par
                                                                          "entry_node_id_attrib": "@EntryNo",
                                                                          "sub_node_xpath": "./MlModeScanType"}),
                    "Kernel": ("get_para_from_indiv_prot_xml_Siemens_Force", {"para_xpath": ".//Kernel",
+                                                                             "para_type": "str",
                                                                              "entry_node_xpath": ".//MlModeEntryType",
                                                                              "entry_node_id_attrib": "@EntryNo",
                                                                              "sub_node_xpath": "./MlModeReconType",
                                                                              "sub_node_id_attrib": "@ReconJob"}),
                    "Series Description": ("get_para_from_indiv_prot_xml_Siemens_Force", {"para_xpath": ".//SeriesDescription",
+                                                                                         "para_type": "str",
                                                                                          "entry_node_xpath": ".//MlModeEntryType",
                                                                                          "entry_node_id_attrib": "@EntryNo",
                                                                                          "sub_node_xpath": "./MlModeReconType",
@@ -46,6 +50,7 @@ topo_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_Siemens_Force", {"par
                    }
 
 scan_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_Siemens_Force", {"para_xpath": ".//RangeName",
+                                                                            "para_type": "str",
                                                                             "entry_node_xpath": ".//MlModeEntryType",
                                                                             "entry_node_id_attrib": "@EntryNo",
                                                                             "sub_node_xpath": "./MlModeScanType"}),
@@ -131,6 +136,7 @@ scan_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_Siemens_Force", {"par
                    }
 
 scan_AB_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_Siemens_Force", {"para_xpath": ".//RangeName",
+                                                                               "para_type": "str",
                                                                             "entry_node_xpath": ".//MlModeEntryType",
                                                                             "entry_node_id_attrib": "@EntryNo",
                                                                             "sub_node_xpath": "./MlModeScanType"}),
@@ -246,6 +252,7 @@ scan_AB_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_Siemens_Force", {"
                    }
 
 recon_lookup_tbl = {"Series Description": ("get_para_from_indiv_prot_xml_Siemens_Force", {"para_xpath": ".//SeriesDescription",
+                                                                                          "para_type": "str",
                                                                                           "entry_node_xpath": ".//MlModeEntryType",
                                                                                           "entry_node_id_attrib": "@EntryNo",
                                                                                           "sub_node_xpath": "./MlModeReconType",
@@ -261,11 +268,13 @@ recon_lookup_tbl = {"Series Description": ("get_para_from_indiv_prot_xml_Siemens
                                                                                             "sub_node_xpath": "./MlModeReconType",
                                                                                             "sub_node_id_attrib": "@ReconJob"}),
                     "Kernel": ("get_para_from_indiv_prot_xml_Siemens_Force", {"para_xpath": ".//Kernel",
+                                                                              "para_type": "str",
                                                                               "entry_node_xpath": ".//MlModeEntryType",
                                                                               "entry_node_id_attrib": "@EntryNo",
                                                                               "sub_node_xpath": "./MlModeReconType",
                                                                               "sub_node_id_attrib": "@ReconJob"}),
                     "Window Name": ("get_para_from_indiv_prot_xml_Siemens_Force", {"para_xpath": ".//Window",
+                                                                                   "para_type": "str",
                                                                                    "entry_node_xpath": ".//MlModeEntryType",
                                                                                    "entry_node_id_attrib": "@EntryNo",
                                                                                    "sub_node_xpath": "./MlModeReconType",
@@ -354,6 +363,7 @@ recon_lookup_tbl = {"Series Description": ("get_para_from_indiv_prot_xml_Siemens
 
 # for pre-monitoring and monitoring scans
 monitoring_C_scan_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_Siemens_Force", {"para_xpath": ".//RangeName",
+                                                                                         "para_type": "str",
                                                                                        "entry_node_xpath": ".//MlModeEntryType",
                                                                                        "entry_node_id_attrib": "@EntryNo",
                                                                                        "sub_node_xpath": "./MlModeScanType"}),
@@ -435,6 +445,7 @@ monitoring_C_scan_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_Siemens_
                                                                                              "entry_node_id_attrib": "@EntryNo",
                                                                                              "sub_node_xpath": "./MlModeScanType"}),
                               "Kernel": ("get_para_from_indiv_prot_xml_Siemens_Force", {"para_xpath": ".//Kernel",
+                                                                                        "para_type": "str",
                                                                                         "entry_node_xpath": ".//MlModeEntryType",
                                                                                         "entry_node_id_attrib": "@EntryNo",
                                                                                         "sub_node_xpath": "./MlModeReconType"}),
@@ -460,6 +471,7 @@ monitoring_C_scan_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_Siemens_
                               }
 
 monitoring_scan_lookup_tbl = {"Range": ("get_para_from_indiv_prot_xml_Siemens_Force", {"para_xpath": ".//RangeName",
+                                                                                       "para_type": "str",
                                                                                        "entry_node_xpath": ".//MlModeEntryType",
                                                                                        "entry_node_id_attrib": "@EntryNo",
                                                                                        "sub_node_xpath": "./MlModeScanType"}),
@@ -606,31 +618,31 @@ bolus_lookup_tbl = {"Auto Trigger": ("get_para_from_indiv_prot_xml_Siemens_Force
                     }
 
 # save lookup tables into json
-# save lookup tables to json files
+# save lookup tables to json files, in the compact v2 format (see lookup_tbl_v2.py)
 print("saved topo_lookup_tbl to ./para_lookup_tbl/Siemens/topo_lookup_tbl.json")
 with open('./para_lookup_tbl/Siemens/topo_lookup_tbl.json', 'w') as fp:
-    json.dump(topo_lookup_tbl, fp, indent=4)
+    json.dump(convert_lookup_tbl_to_v2(topo_lookup_tbl), fp, indent=4)
 
 print("saved scan_lookup_tbl to ./para_lookup_tbl/Siemens/scan_lookup_tbl.json")
 with open('./para_lookup_tbl/Siemens/scan_lookup_tbl.json', 'w') as fp:
-    json.dump(scan_lookup_tbl, fp, indent=4)
+    json.dump(convert_lookup_tbl_to_v2(scan_lookup_tbl), fp, indent=4)
 
 print("saved scan_AB_lookup_tbl to ./para_lookup_tbl/Siemens/scan_AB_lookup_tbl.json")
 with open('./para_lookup_tbl/Siemens/scan_AB_lookup_tbl.json', 'w') as fp:
-    json.dump(scan_AB_lookup_tbl, fp, indent=4)
+    json.dump(convert_lookup_tbl_to_v2(scan_AB_lookup_tbl), fp, indent=4)
 
 print("saved recon_lookup_tbl to ./para_lookup_tbl/Siemens/recon_lookup_tbl.json")
 with open('./para_lookup_tbl/Siemens/recon_lookup_tbl.json', 'w') as fp:
-    json.dump(recon_lookup_tbl, fp, indent=4)
+    json.dump(convert_lookup_tbl_to_v2(recon_lookup_tbl), fp, indent=4)
 
 print("saved monitoring_C_scan_lookup_tbl to ./para_lookup_tbl/Siemens/monitoring_C_scan_lookup_tbl.json")
 with open('./para_lookup_tbl/Siemens/monitoring_C_scan_lookup_tbl.json', 'w') as fp:
-    json.dump(monitoring_C_scan_lookup_tbl, fp, indent=4)
+    json.dump(convert_lookup_tbl_to_v2(monitoring_C_scan_lookup_tbl), fp, indent=4)
     
 print("saved monitoring_scan_lookup_tbl to ./para_lookup_tbl/Siemens/monitoring_scan_lookup_tbl.json")
 with open('./para_lookup_tbl/Siemens/monitoring_scan_lookup_tbl.json', 'w') as fp:
-    json.dump(monitoring_C_scan_lookup_tbl, fp, indent=4)
+    json.dump(convert_lookup_tbl_to_v2(monitoring_C_scan_lookup_tbl), fp, indent=4)
 
 print("saved bolus_lookup_tbl to ./para_lookup_tbl/Siemens/bolus_lookup_tbl.json")
 with open('./para_lookup_tbl/Siemens/bolus_lookup_tbl.json', 'w') as fp:
-    json.dump(bolus_lookup_tbl, fp, indent=4)
+    json.dump(convert_lookup_tbl_to_v2(bolus_lookup_tbl), fp, indent=4)
@@ -0,0 +1,193 @@
+# Filename: store_prot_pair_dict_list.py
+"""Summary: store and load the intermediate parsing result of a protocol pair (the list of per-series dicts of each
+protocol), either as the indented json file or, if pyarrow is installed, as a columnar Arrow IPC file (*.arrow), with
+one row per series and one typed column per parameter. The Arrow file is memory-mapped when read, so one parameter can be
+read from many files without parsing them, e.g., with read_para_column_arrow()
+
+
+"""
+
+import json
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+# extension of the intermediate files stored in the Arrow IPC format, any other one is stored as json
+arrow_ext = ".arrow"
+
+# columns of the Arrow file which are not parameters
+prot_index_column = "_prot_index"
+prot_name_column = "_prot_name"
+series_index_column = "_series_index"
+key_list_id_column = "_key_list_id"
+
+def get_arrow_column(value_list):
+    """Get the Arrow column of a parameter, typed after its values (see normalize_para_value.py): int64 if they are all
+    int, float64 if they are all float, string if they are all str, or, if they are mixed, the json text of each value.
+
+    :param value_list: values of the parameter, one per row, None where there is none
+    :returns: tuple (pyarrow.Array, whether it holds json texts)
+
+    """
+
+    value_type_set = {type(value) for value in value_list if value is not None}
+
+    if value_type_set <= {str}:
+        return pa.array(value_list, type=pa.string()), False
+    if value_type_set == {float}:
+        return pa.array(value_list, type=pa.float64()), False
+    if value_type_set == {int} and all(value is None or -2**63 <= value < 2**63 for value in value_list):
+        return pa.array(value_list, type=pa.int64()), False
+
+    return pa.array([None if value is None else json.dumps(value) for value in value_list], type=pa.string()), True
+
+def decode_arrow_column(value_list, bool_json):
+    """:returns: the values of a column from get_arrow_column(), decoded from json if it holds json texts"""
+
+    if not bool_json:
+        return value_list
+    return [None if value is None else json.loads(value) for value in value_list]
+
+def write_prot_pair_dict_list_arrow(prot_pair_dict_list, output_arrow_path, target_prot_name_list=None):
+    """Write the intermediate parsing result as an Arrow IPC file: one row per series of each protocol, with its
+    protocol index/name and series index, and one column per parameter key, typed by get_arrow_column(). The key order of each series is
+    kept (as the id of its key list, in the schema metadata), so that it is read back as the same dicts.
+
+    :param prot_pair_dict_list: list of the protocols, each a list of dict, each dict being a scan or recon series with
+    int, float, str (or None) values
+    :param output_arrow_path: path of the Arrow file to write
+    :param target_prot_name_list: optional, names of the protocols, stored in the _prot_name column
+    :returns: N/A
+
+    """
+
+    if pa is None:
+        raise ImportError("the Arrow intermediate format is selected, but pyarrow is not installed")
+
+    key_list_list = []
+    key_list_id_dict = {}
+    para_key_dict = {}
+    row_list = []
+
+    for i, prot_dict_list in enumerate(prot_pair_dict_list):
+        for j, prot_dict in enumerate(prot_dict_list):
+            key_tuple = tuple(prot_dict)
+            if key_tuple not in key_list_id_dict:
+                key_list_id_dict[key_tuple] = len(key_list_list)
+                key_list_list.append(list(key_tuple))
+                para_key_dict.update(dict.fromkeys(key_tuple))
+            row_list.append((i, j, key_list_id_dict[key_tuple], prot_dict))
+
+    column_dict = {prot_index_column: pa.array([row[0] for row in row_list], type=pa.int32()),
+                   prot_name_column: pa.array([target_prot_name_list[row[0]] if target_prot_name_list else None for row in row_list], type=pa.string()),
+                   series_index_column: pa.array([row[1] for row in row_list], type=pa.int32()),
+                   key_list_id_column: pa.array([row[2] for row in row_list], type=pa.int32())}
+    json_column_list = []
+    for para_key in para_key_dict:
+        column_dict[para_key], bool_json = get_arrow_column([row[3].get(para_key) for row in row_list])
+        if bool_json:
+            json_column_list.append(para_key)
+
+    metadata = {"prot_num": len(prot_pair_dict_list),
+                "key_list_list": key_list_list,
+                "json_column_list": json_column_list}
+    table = pa.table(column_dict).replace_schema_metadata({"prot_pair_dict_list": json.dumps(metadata)})
+
+    with pa.OSFile(output_arrow_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+def read_prot_pair_dict_list_arrow(input_arrow_path):
+    """Read back the intermediate parsing result written by write_prot_pair_dict_list_arrow().
+
+    :param input_arrow_path: path of the Arrow file
+    :returns: list of the protocols, each a list of dict, the same as the json file gives
+
+    """
+
+    if pa is None:
+        raise ImportError("reading an Arrow intermediate file needs pyarrow, which is not installed")
+
+    with pa.memory_map(input_arrow_path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+        metadata = json.loads(table.schema.metadata[b"prot_pair_dict_list"])
+        column_dict = {name: decode_arrow_column(table.column(name).to_pylist(), name in metadata["json_column_list"]) for name in table.column_names}
+
+    prot_pair_dict_list = [[] for i in range(metadata["prot_num"])]
+    for r, (i, key_list_id) in enumerate(zip(column_dict[prot_index_column], column_dict[key_list_id_column])):
+        prot_pair_dict_list[i].append({key: column_dict[key][r] for key in metadata["key_list_list"][key_list_id]})
+
+    return prot_pair_dict_list
+
+def read_para_column_arrow(input_arrow_path_list, para_key):
+    """Read one parameter from many Arrow intermediate files, e.g., the kernel of every series of a whole snapshot. Each
+    file is memory-mapped and only the columns needed are read; no file is parsed as a whole.
+
+    :param input_arrow_path_list: paths of the Arrow files
+    :param para_key: key of the parameter, e.g., "Kernel"
+    :returns: list of (path, protocol name, protocol index, series index, value), for the series having this parameter
+
+    """
+
+    if pa is None:
+        raise ImportError("reading an Arrow intermediate file needs pyarrow, which is not installed")
+
+    para_list = []
+    for input_arrow_path in input_arrow_path_list:
+        with pa.memory_map(input_arrow_path, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            metadata = json.loads(reader.schema.metadata[b"prot_pair_dict_list"])
+            if para_key not in reader.schema.names:
+                continue
+            bool_has_key_list = [para_key in key_list for key_list in metadata["key_list_list"]]
+            for k in range(reader.num_record_batches):
+                batch = reader.get_batch(k)
+                for prot_name, i, j, key_list_id, value in zip(batch.column(prot_name_column).to_pylist(),
+                                                               batch.column(prot_index_column).to_pylist(),
+                                                               batch.column(series_index_column).to_pylist(),
+                                                               batch.column(key_list_id_column).to_pylist(),
+                                                               decode_arrow_column(batch.column(para_key).to_pylist(),
+                                                                                   para_key in metadata["json_column_list"])):
+                    if bool_has_key_list[key_list_id]:
+                        para_list.append((input_arrow_path, prot_name, i, j, value))
+
+    return para_list
+
+def store_prot_pair_dict_list(prot_pair_dict_list, output_path, target_prot_name_list=None):
+    """Store the intermediate parsing result, in the Arrow format if output_path ends with arrow_ext, as the indented
+    json file otherwise.
+
+    :param prot_pair_dict_list: list of the protocols, each a list of dict, each dict being a scan or recon series
+    :param output_path: path of the intermediate file
+    :param target_prot_name_list: optional, names of the protocols, stored in the Arrow file
+    :returns: N/A
+
+    """
+
+    if os.path.splitext(output_path)[1] == arrow_ext:
+        write_prot_pair_dict_list_arrow(prot_pair_dict_list, output_path, target_prot_name_list)
+    else:
+        with open(output_path, "w") as output:
+            json.dump(prot_pair_dict_list, output, indent=4)
+
+def load_prot_pair_dict_list(input_path):
+    """Load the intermediate parsing result stored by store_prot_pair_dict_list().
+
+    :param input_path: path of the intermediate file, Arrow if it ends with arrow_ext, json otherwise, or the parsing
+    result itself (e.g., returned by a converter in the same process), which is returned as is
+    :returns: list of the protocols, each a list of dict, each dict being a scan or recon series
+
+    """
+
+    if isinstance(input_path, list):
+        return input_path
+
+    if os.path.splitext(input_path)[1] == arrow_ext:
+        return read_prot_pair_dict_list_arrow(input_path)
+
+    with open(input_path, "r") as input:
+        return json.load(input)